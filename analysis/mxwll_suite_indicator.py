@@ -1,179 +1,446 @@
 # analysis/mxwll_suite_indicator.py
 
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go  # Essential for Plotly figures
-from ta.volatility import AverageTrueRange
 import warnings
 from datetime import datetime, timedelta
+from dataclasses import dataclass
+from typing import NamedTuple, Optional
 
-def mxwll_suite_indicator(df, ticker, params):
+
+class FairValueGaps(NamedTuple):
     """
-    Generates a Plotly figure based on the mxwll suite indicator analysis and provides summary statistics.
+    Fair Value Gaps of one direction as parallel arrays.
+
+    Attributes:
+        index (np.ndarray): Positional index of the bar that opened each gap.
+        bottom (np.ndarray): Lower bound of each gap.
+        top (np.ndarray): Upper bound of each gap.
+    """
+    index: np.ndarray
+    bottom: np.ndarray
+    top: np.ndarray
+
+
+def identify_fvg(df, contract_violated=False, close_only=False):
+    """
+    Identifies Fair Value Gaps (FVG) with shifted NumPy arrays instead of a per-bar loop.
+
+    A bullish gap opens at bar i when High[i-1] < Low[i] and spans (High[i-1], Low[i]);
+    a bearish gap opens when Low[i-1] > High[i] and spans (High[i], Low[i-1]).
 
     Args:
-        df (pd.DataFrame): DataFrame containing stock data.
-        ticker (str): Stock ticker symbol.
-        params (dict): Dictionary of analysis parameters.
+        df (pd.DataFrame): DataFrame with 'High', 'Low' and 'Close' columns.
+        contract_violated (bool): Shrink partially filled gaps to their unfilled part and drop fully filled ones.
+        close_only (bool): Measure fills with closes instead of wicks, and drop gaps that a close has filled.
 
     Returns:
-        tuple:
-            - plotly.graph_objects.Figure: The generated Plotly figure.
-            - dict: Summary statistics for the analysis, including AOI metrics.
+        tuple: (FairValueGaps for bullish gaps, FairValueGaps for bearish gaps)
     """
-    # Suppress warnings for cleaner output
-    warnings.filterwarnings("ignore")
-    
-    # === Derived Parameters Based on Data Frequency ===
-    
-    if params['data_frequency'] == '15m':
-        atr_window = 14  # ATR window
-        aoi_length = 50  # AOE window
-        session_enabled = True
-        session_times = {
-            'New York': {'start': '09:30', 'end': '16:00'},
-            'Asia': {'start': '20:00', 'end': '02:00'},
-            'London': {'start': '03:00', 'end': '11:30'}
-        }
-    elif params['data_frequency'] == '4h':
-        atr_window = 14
-        aoi_length = 50
-        session_enabled = True
-        session_times = {
-            'New York': {'start': '09:30', 'end': '16:00'},
-            'Asia': {'start': '20:00', 'end': '02:00'},
-            'London': {'start': '03:00', 'end': '11:30'}
+    high = df['High'].to_numpy(dtype='float64')
+    low = df['Low'].to_numpy(dtype='float64')
+    n = len(high)
+    if n < 2:
+        empty = FairValueGaps(np.empty(0, dtype='int64'), np.empty(0), np.empty(0))
+        return empty, empty
+
+    up_idx = np.flatnonzero(high[:-1] < low[1:]) + 1
+    down_idx = np.flatnonzero(low[:-1] > high[1:]) + 1
+    up_bottom, up_top = high[up_idx - 1], low[up_idx]
+    down_bottom, down_top = high[down_idx], low[down_idx - 1]
+
+    if contract_violated or close_only:
+        # Lowest / highest price reached after each bar (suffix running min / max, excluding the bar itself)
+        fill_low = df['Close'].to_numpy(dtype='float64') if close_only else low
+        fill_high = df['Close'].to_numpy(dtype='float64') if close_only else high
+        future_min = np.append(np.minimum.accumulate(fill_low[::-1])[::-1][1:], np.inf)
+        future_max = np.append(np.maximum.accumulate(fill_high[::-1])[::-1][1:], -np.inf)
+
+        up_reach = future_min[up_idx]
+        keep_up = up_reach > up_bottom
+        down_reach = future_max[down_idx]
+        keep_down = down_reach < down_top
+
+        if contract_violated:
+            up_top = np.minimum(up_top, up_reach)
+            down_bottom = np.maximum(down_bottom, down_reach)
+
+        up_idx, up_bottom, up_top = up_idx[keep_up], up_bottom[keep_up], up_top[keep_up]
+        down_idx, down_bottom, down_top = down_idx[keep_down], down_bottom[keep_down], down_top[keep_down]
+
+    return FairValueGaps(up_idx, up_bottom, up_top), FairValueGaps(down_idx, down_bottom, down_top)
+
+
+# Session windows used for intraday data frequencies
+SESSION_TIMES = {
+    'New York': {'start': '09:30', 'end': '16:00'},
+    'Asia': {'start': '20:00', 'end': '02:00'},
+    'London': {'start': '03:00', 'end': '11:30'}
+}
+
+VOLUME_ACTIVITY_LABELS = np.array(["Very Low", "Low", "Average", "High", "Very High"])
+
+
+def frequency_settings(data_frequency):
+    """
+    Returns the derived parameters for a data frequency.
+
+    Args:
+        data_frequency (str): One of '15m', '4h' or '1D'.
+
+    Returns:
+        tuple: (atr_window, aoi_length, session_enabled, session_times)
+    """
+    if data_frequency in ('15m', '4h'):
+        return 14, 50, True, SESSION_TIMES
+    elif data_frequency == '1D':
+        return 14, 50, False, {}  # Sessions are not time-based for daily data
+    raise ValueError("Invalid data_frequency. Choose from '15m', '4h', or '1D'.")
+
+
+@dataclass
+class MxwllResult:
+    """
+    Array-backed output of compute_mxwll. Positions index into `index`.
+    """
+    index: pd.DatetimeIndex
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    swing_highs: np.ndarray
+    swing_lows: np.ndarray
+    internal_swing_highs: np.ndarray
+    internal_swing_lows: np.ndarray
+    fvg_up: FairValueGaps
+    fvg_down: FairValueGaps
+    volume_activity: np.ndarray
+    atr: Optional[np.ndarray] = None
+    aoi_start: Optional[int] = None
+    aoi_high: Optional[float] = None  # Top of the high AOI box
+    aoi_high_base: Optional[float] = None  # Bottom of the high AOI box
+    aoi_low: Optional[float] = None  # Bottom of the low AOI box
+    aoi_low_base: Optional[float] = None  # Top of the low AOI box
+
+    @property
+    def main_line(self):
+        """
+        The line from the latest swing low to the latest swing high, as (x1, y1, x2, y2), or None.
+        """
+        if len(self.swing_highs) == 0 or len(self.swing_lows) == 0:
+            return None
+        low_pos, high_pos = self.swing_lows[-1], self.swing_highs[-1]
+        return self.index[low_pos], self.low[low_pos], self.index[high_pos], self.high[high_pos]
+
+    def to_summary(self, ticker):
+        """
+        Builds the AOI summary dictionary shown in the comparison tables.
+
+        Args:
+            ticker (str): Stock ticker symbol.
+
+        Returns:
+            dict: Summary statistics, with None values when no AOI is available.
+        """
+        summary_data = {
+            'Ticker': ticker,
+            'Highest AOI (Red)': None,
+            'Lowest AOI (Green)': None,
+            'Difference (Last Candle Bottom to AOI Top)': None,
+            'Difference (Last Candle Upper to AOI Bottom)': None,
+            'Percentage (Bottom to AOI Top)': None,
+            'Percentage (Upper to AOI Bottom)': None
         }
-    elif params['data_frequency'] == '1D':
-        atr_window = 14
-        aoi_length = 50
-        session_enabled = False  # Sessions are not time-based for daily data
-        session_times = {}
+        if self.aoi_high is None or self.aoi_low is None:
+            return summary_data
+
+        try:
+            # Last Candle (excluding wicks)
+            last_candle_bottom = min(self.open[-1], self.close[-1])
+            last_candle_upper = max(self.open[-1], self.close[-1])
+
+            # Differences
+            difference_bottom_to_AOI_top = self.aoi_high - last_candle_bottom
+            difference_upper_to_AOI_bottom = last_candle_upper - self.aoi_low
+
+            # Percentages
+            percentage_diff_bottom_to_AOI_top = (difference_bottom_to_AOI_top / self.aoi_high) * 100 if self.aoi_high != 0 else None
+            percentage_diff_upper_to_AOI_bottom = (difference_upper_to_AOI_bottom / self.aoi_low) * 100 if self.aoi_low != 0 else None
+
+            summary_data.update({
+                'Highest AOI (Red)': round(self.aoi_high, 2),
+                'Lowest AOI (Green)': round(self.aoi_low, 2),
+                'Difference (Last Candle Bottom to AOI Top)': round(difference_bottom_to_AOI_top, 2),
+                'Difference (Last Candle Upper to AOI Bottom)': round(difference_upper_to_AOI_bottom, 2),
+                'Percentage (Bottom to AOI Top)': round(percentage_diff_bottom_to_AOI_top, 2) if percentage_diff_bottom_to_AOI_top is not None else None,
+                'Percentage (Upper to AOI Bottom)': round(percentage_diff_upper_to_AOI_bottom, 2) if percentage_diff_upper_to_AOI_bottom is not None else None
+            })
+        except Exception as e:
+            print(f"Error in summary calculations: {e}")
+        return summary_data
+
+
+def average_true_range(high, low, close, window=14):
+    """
+    Wilder's Average True Range, equal to ta.volatility.AverageTrueRange but without its per-bar loop.
+
+    Returns:
+        np.ndarray: ATR values (zero before the first full window).
+
+    Raises:
+        ValueError: If there are fewer bars than the window.
+    """
+    if len(close) < window:
+        raise ValueError(f"ATR needs at least {window} bars, got {len(close)}.")
+
+    prev_close = np.concatenate(([np.nan], close[:-1]))
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+    # Seed with the mean of the first window, then smooth with alpha = 1 / window
+    smoothed = true_range[window - 1:].copy()
+    smoothed[0] = true_range[:window].mean()
+    atr = np.zeros(len(close))
+    atr[window - 1:] = pd.Series(smoothed).ewm(alpha=1 / window, adjust=False).mean().to_numpy()
+    return atr
+
+
+def calculate_pivots(high, low, sensitivity):
+    """
+    Vectorized pivot calculation. Identifies swing highs and lows based on the specified sensitivity.
+
+    Returns:
+        tuple: (positions of swing highs, positions of swing lows)
+    """
+    window = 2 * sensitivity + 1
+    rolling_max = pd.Series(high).rolling(window=window, center=True).max().to_numpy()
+    rolling_min = pd.Series(low).rolling(window=window, center=True).min().to_numpy()
+    return np.flatnonzero(high == rolling_max), np.flatnonzero(low == rolling_min)
+
+
+def volume_activity(volume):
+    """
+    Categorizes volume into activity levels based on the 10/33/50/66/90% quantiles.
+    """
+    volume = pd.Series(volume, dtype='float64')
+    thresholds = volume.quantile([0.1, 0.33, 0.5, 0.66]).to_numpy()
+    return VOLUME_ACTIVITY_LABELS[np.searchsorted(thresholds, volume.to_numpy(), side='left')]
+
+
+def compute_mxwll(df, params):
+    """
+    Computes the mxwll suite indicator (pivots, FVGs, ATR/AOI and volume activity) without
+    building any Plotly objects and without modifying the input frame.
+
+    Args:
+        df (pd.DataFrame): DataFrame containing stock data indexed by date.
+        params (dict): Dictionary of analysis parameters.
+
+    Returns:
+        MxwllResult: The computed indicator values.
+    """
+    atr_window, aoi_length, _, _ = frequency_settings(params['data_frequency'])
+
+    high = df['High'].to_numpy(dtype='float64')
+    low = df['Low'].to_numpy(dtype='float64')
+
+    # === Pivots ===
+    swing_highs, swing_lows = calculate_pivots(high, low, params['external_sensitivity'])
+    if params['show_internals']:
+        internal_swing_highs, internal_swing_lows = calculate_pivots(high, low, params['internal_sensitivity'])
     else:
-        raise ValueError("Invalid data_frequency. Choose from '15m', '4h', or '1D'.")
-    
+        internal_swing_highs, internal_swing_lows = np.empty(0, dtype='int64'), np.empty(0, dtype='int64')
+
+    # === Fair Value Gaps ===
+    fvg_up, fvg_down = identify_fvg(df,
+                                    contract_violated=params.get('contract_violated_fvg', False),
+                                    close_only=params.get('close_only_fvg', False))
+
+    result = MxwllResult(
+        index=df.index,
+        open=df['Open'].to_numpy(dtype='float64'),
+        high=high,
+        low=low,
+        close=df['Close'].to_numpy(dtype='float64'),
+        swing_highs=swing_highs,
+        swing_lows=swing_lows,
+        internal_swing_highs=internal_swing_highs,
+        internal_swing_lows=internal_swing_lows,
+        fvg_up=fvg_up,
+        fvg_down=fvg_down,
+        volume_activity=volume_activity(df['Volume']),
+    )
+
+    # === Area of Interest (AOI) ===
+    if params['show_aoe']:
+        try:
+            result.atr = average_true_range(high, low, result.close, window=atr_window)
+
+            aoi_start = max(len(df) - aoi_length, 0)
+            max_aoi_high = max(high[aoi_start:].max(), result.open[aoi_start:].max())
+            min_aoi_low = min(low[aoi_start:].min(), result.open[aoi_start:].min())
+
+            result.aoi_start = aoi_start
+            result.aoi_high, result.aoi_high_base = max_aoi_high * 1.01, max_aoi_high
+            result.aoi_low, result.aoi_low_base = min_aoi_low * 0.99, min_aoi_low
+        except Exception as e:
+            print(f"Error computing AOE: {e}")
+
+    return result
+
+
+def _session_status(latest_time, session_times):
+    """
+    Returns the current session name and the time until the next session starts.
+    """
+    current_session = "Dead Zone"
+    time_until_change = "N/A"
+    session_names = list(session_times.keys())
+
+    for session, props in session_times.items():
+        start_time = datetime.strptime(props['start'], '%H:%M').time()
+        end_time = datetime.strptime(props['end'], '%H:%M').time()
+        if start_time <= latest_time.time() <= end_time:
+            current_session = session
+
+            # Next session is the following session in the list
+            next_session = session_names[(session_names.index(session) + 1) % len(session_names)]
+            next_start_time = datetime.strptime(session_times[next_session]['start'], '%H:%M').time()
+            next_start_datetime = datetime.combine(latest_time.date(), next_start_time)
+            if next_start_time <= latest_time.time():
+                next_start_datetime += timedelta(days=1)
+            time_diff = next_start_datetime - latest_time
+            hours, remainder = divmod(int(time_diff.total_seconds()), 3600)
+            minutes, _ = divmod(remainder, 60)
+            time_until_change = f"{hours}h {minutes}m"
+            break
+
+    return current_session, time_until_change
+
+
+def _box_path(x0, x1, y0, y1):
+    """
+    Builds the x/y arrays of a single path drawing one closed rectangle per element,
+    separated by None so a fill='toself' trace fills every box independently.
+    """
+    count = len(x0)
+    x_path = np.empty((count, 6), dtype=object)
+    y_path = np.empty((count, 6), dtype=object)
+    x0, x1 = np.asarray(x0, dtype=object), np.asarray(x1, dtype=object)
+    x_path[:, 0], x_path[:, 1], x_path[:, 2], x_path[:, 3], x_path[:, 4] = x0, x1, x1, x0, x0
+    y_path[:, 0], y_path[:, 1], y_path[:, 2], y_path[:, 3], y_path[:, 4] = y0, y0, y1, y1, y0
+    x_path[:, 5] = None
+    y_path[:, 5] = None
+    return x_path.ravel(), y_path.ravel()
+
+
+def render_mxwll(result, ticker, params):
+    """
+    Builds the Plotly figure for a computed mxwll suite indicator.
+
+    Args:
+        result (MxwllResult): Output of compute_mxwll.
+        ticker (str): Stock ticker symbol.
+        params (dict): Dictionary of analysis parameters.
+
+    Returns:
+        plotly.graph_objects.Figure: The generated Plotly figure.
+    """
+    _, _, session_enabled, session_times = frequency_settings(params['data_frequency'])
+    index = result.index
+
     # === Session Colors ===
     session_colors = {
         'New York': params['bear_color'],  # Bear Color (Red)
         'Asia': params['bull_color'],      # Bull Color (Green)
         'London': params['fvg_color']      # FVG Color
     }
-    
-    # === Helper Functions ===
-    
-    def calculate_pivots_vectorized(df, sensitivity):
-        """
-        Vectorized pivot calculation for enhanced performance.
-        Identifies swing highs and lows based on the specified sensitivity.
-        """
-        # Swing Highs
-        rolling_max = df['High'].rolling(window=2*sensitivity+1, center=True).max()
-        swing_highs = df[df['High'] == rolling_max].index.to_list()
-        
-        # Swing Lows
-        rolling_min = df['Low'].rolling(window=2*sensitivity+1, center=True).min()
-        swing_lows = df[df['Low'] == rolling_min].index.to_list()
-        
-        return swing_highs, swing_lows
-    
-    def identify_fvg(df):
-        """
-        Identifies Fair Value Gaps (FVG) in the data.
-        """
-        fvg_up = []
-        fvg_down = []
-        for i in range(1, len(df)):
-            prev_high = df['High'].iloc[i-1]
-            prev_low = df['Low'].iloc[i-1]
-            current_high = df['High'].iloc[i]
-            current_low = df['Low'].iloc[i]
-            if prev_high < current_low:
-                fvg_up.append({'x0': df.index[i], 'y0': prev_high, 'x1': df.index[i], 'y1': current_low})
-            if prev_low > current_high:
-                fvg_down.append({'x0': df.index[i], 'y0': current_high, 'x1': df.index[i], 'y1': prev_low})
-        return fvg_up, fvg_down
-    
-    def plot_fibonacci_levels(fig, last_high, last_low):
-        """
-        Plots Fibonacci retracement levels based on the latest swing high and low.
-        """
-        fib_diff = last_high - last_low
-        for level, color in zip(params['fib_levels'], params['fib_colors']):
-            if level == 0.5 and not params['show_fib5']:
+
+    fig = go.Figure()
+
+    # --- Plot Fair Value Gaps (FVG) as one filled path per direction, beneath the candles ---
+    if params['show_fvg']:
+        for gaps, name in ((result.fvg_up, 'FVG Up'), (result.fvg_down, 'FVG Down')):
+            if len(gaps.index) == 0:
                 continue
-            fib_level = last_low + fib_diff * level
-            fig.add_hline(y=fib_level, line=dict(color=color, dash='dash'), 
-                          annotation_text=f'Fib {level}', annotation_position="top left")
-    
-    def draw_aoe(fig, df):
-        """
-        Draws the Area of Interest (AOE) boxes based on ATR and recent price action.
-        Returns the highest and lowest points of the AOI.
-        """
-        atr_indicator = AverageTrueRange(high=df['High'], low=df['Low'], close=df['Close'], window=atr_window)
-        df['ATR'] = atr_indicator.average_true_range()
-        
-        # Define AOE window
-        aoi = df.iloc[-aoi_length:]
-        max_aoi_high = max(aoi['High'].max(), aoi['Open'].iloc[-aoi_length:].max())
-        min_aoi_low = min(aoi['Low'].min(), aoi['Open'].iloc[-aoi_length:].min())
-        atr_latest = df['ATR'].iloc[-1]
-        
-        # High AOE Box
-        high_aoe_y0 = max_aoi_high * 1.01
-        high_aoe_y1 = max_aoi_high
-        high_aoe_x0 = aoi.index[0]
-        high_aoe_x1 = aoi.index[-1]
-        
-        fig.add_shape(type="rect",
-                      x0=high_aoe_x0,
-                      y0=high_aoe_y0,
-                      x1=high_aoe_x1,
-                      y1=high_aoe_y1,
-                      fillcolor=params['bear_color'],
-                      opacity=0.2,
-                      line=dict(width=0),
-                      layer='below',
+            x_path, y_path = _box_path(index[gaps.index - 1], index[gaps.index], gaps.bottom, gaps.top)
+            fig.add_trace(go.Scatter(
+                x=x_path,
+                y=y_path,
+                mode='lines',
+                fill='toself',
+                fillcolor=params['fvg_color'],
+                opacity=params['fvg_transparency'] / 100,
+                line=dict(width=0),
+                hoverinfo='skip',
+                name=name,
+                showlegend=False
+            ))
+
+    # --- Plot Candlestick ---
+    fig.add_trace(go.Candlestick(
+        x=index,
+        open=result.open,
+        high=result.high,
+        low=result.low,
+        close=result.close,
+        name='Price',
+        increasing_line_color='green',
+        decreasing_line_color='red'
+    ))
+
+    # --- Plot Swing Points (one trace per category) ---
+    swing_traces = []
+    if params['show_hhlh']:
+        swing_traces.append((result.swing_highs[-params['swing_order_blocks']:], result.high,
+                             'Swing High', 'HH', 'bottom center', params['bear_color'], 10, 'triangle-up'))
+    if params['show_hlll']:
+        swing_traces.append((result.swing_lows[-params['swing_order_blocks']:], result.low,
+                             'Swing Low', 'LL', 'top center', params['bull_color'], 10, 'triangle-down'))
+    if params['show_internals']:
+        swing_traces.append((result.internal_swing_highs, result.high,
+                             'Internal Swing High', None, None, params['bear_color'], 6, 'triangle-up'))
+        swing_traces.append((result.internal_swing_lows, result.low,
+                             'Internal Swing Low', None, None, params['bull_color'], 6, 'triangle-down'))
+
+    for positions, prices, name, label, text_position, color, size, symbol in swing_traces:
+        if len(positions) == 0:
+            continue
+        fig.add_trace(go.Scatter(
+            x=index[positions],
+            y=prices[positions],
+            mode='markers+text' if label else 'markers',
+            marker=dict(color=color, size=size, symbol=symbol),
+            text=[label] * len(positions) if label else None,
+            textposition=text_position,
+            name=name,
+            showlegend=False  # Remove from legend to avoid repetition
+        ))
+
+    # --- Draw Area of Interest (AOE) ---
+    if params['show_aoe'] and result.aoi_high is not None:
+        aoi_x0, aoi_x1 = index[result.aoi_start], index[-1]
+        fig.add_shape(type="rect", x0=aoi_x0, y0=result.aoi_high, x1=aoi_x1, y1=result.aoi_high_base,
+                      fillcolor=params['bear_color'], opacity=0.2, line=dict(width=0), layer='below',
                       name='High AOE')
-        
-        # Low AOE Box
-        low_aoe_y0 = min_aoi_low
-        low_aoe_y1 = min_aoi_low * 0.99
-        low_aoe_x0 = aoi.index[0]
-        low_aoe_x1 = aoi.index[-1]
-        
-        fig.add_shape(type="rect",
-                      x0=low_aoe_x0,
-                      y0=low_aoe_y0,
-                      x1=low_aoe_x1,
-                      y1=low_aoe_y1,
-                      fillcolor=params['bull_color'],
-                      opacity=0.2,
-                      line=dict(width=0),
-                      layer='below',
+        fig.add_shape(type="rect", x0=aoi_x0, y0=result.aoi_low_base, x1=aoi_x1, y1=result.aoi_low,
+                      fillcolor=params['bull_color'], opacity=0.2, line=dict(width=0), layer='below',
                       name='Low AOE')
-        
-        # Return AOI points for summary
-        return high_aoe_y0, low_aoe_y1
-    
-    def highlight_sessions(fig, df):
-        """
-        Highlights trading sessions (New York, Asia, London) on the chart.
-        Applicable only for intra-day data frequencies.
-        """
-        if not session_enabled:
-            return
-        
+
+    # --- Highlight Trading Sessions ---
+    if session_enabled:
+        last_day = index[-1].normalize()
         for session, props in session_times.items():
             start_time = datetime.strptime(props['start'], '%H:%M').time()
             end_time = datetime.strptime(props['end'], '%H:%M').time()
-            
-            for date in df.index.normalize().unique():
+
+            for date in index.normalize().unique():
                 start_datetime = datetime.combine(date, start_time)
                 end_datetime = datetime.combine(date, end_time)
                 # Handle sessions that span over midnight
                 if end_datetime <= start_datetime:
                     end_datetime += timedelta(days=1)
-                
+
                 fig.add_vrect(
                     x0=start_datetime,
                     x1=end_datetime,
@@ -181,325 +448,59 @@ def mxwll_suite_indicator(df, ticker, params):
                     opacity=params['transparency'],
                     layer="below",
                     line_width=0,
-                    annotation_text=session if (date == df.index[-1].normalize()) else "",
+                    annotation_text=session if (date == last_day) else "",
                     annotation_position="top left",
                     annotation_font_size=10,
                     annotation_font_color="white",
                     name=session
                 )
-    
-    def volume_activity(df):
-        """
-        Categorizes volume into different activity levels based on quantiles.
-        """
-        vol_perc1 = df['Volume'].quantile(0.1)
-        vol_perc2 = df['Volume'].quantile(0.33)
-        vol_perc3 = df['Volume'].quantile(0.5)
-        vol_perc4 = df['Volume'].quantile(0.66)
-        vol_perc5 = df['Volume'].quantile(0.9)
-        
-        def categorize_volume(vol):
-            if vol <= vol_perc1:
-                return "Very Low"
-            elif vol <= vol_perc2:
-                return "Low"
-            elif vol <= vol_perc3:
-                return "Average"
-            elif vol <= vol_perc4:
-                return "High"
-            else:
-                return "Very High"
-        
-        df['VolumeActivity'] = df['Volume'].apply(categorize_volume)
-        return df
-    
-    def add_volume_annotation(fig, df):
-        """
-        Adds a volume activity annotation to the latest data point.
-        """
-        latest = df.iloc[-1]
-        latest_time = latest.name
-        latest_volume_activity = latest['VolumeActivity']
-        
-        current_session = "Dead Zone"
-        time_until_change = "N/A"
-        
-        if params['data_frequency'] in ['15m', '4h']:
-            # Determine current session based on the latest timestamp
-            for session, props in session_times.items():
-                start_time = datetime.strptime(props['start'], '%H:%M').time()
-                end_time = datetime.strptime(props['end'], '%H:%M').time()
-                if start_time <= latest_time.time() <= end_time:
-                    current_session = session
-                    break
-            
-            # Calculate time until next session change
-            def calculate_time_until_change(current_time):
-                for session, props in session_times.items():
-                    start_time = datetime.strptime(props['start'], '%H:%M').time()
-                    end_time = datetime.strptime(props['end'], '%H:%M').time()
-                    if start_time <= current_time.time() <= end_time:
-                        # Next session is the following session in the list
-                        session_names = list(session_times.keys())
-                        current_index = session_names.index(session)
-                        next_session = session_names[(current_index + 1) % len(session_names)]
-                        next_start_str = session_times[next_session]['start']
-                        next_start_time = datetime.strptime(next_start_str, '%H:%M').time()
-                        next_start_datetime = datetime.combine(current_time.date(), next_start_time)
-                        if next_start_time <= current_time.time():
-                            next_start_datetime += timedelta(days=1)
-                        time_diff = next_start_datetime - current_time
-                        hours, remainder = divmod(int(time_diff.total_seconds()), 3600)
-                        minutes, _ = divmod(remainder, 60)
-                        return f"{hours}h {minutes}m"
-                return "N/A"
-            
-            time_until_change = calculate_time_until_change(latest_time)
-        else:
-            # For daily data, sessions are not time-based
-            current_session = "Dead Zone"
-        
-        annotation_text = f"""
-        Session: {current_session}<br>
-        Session Close: {time_until_change}<br>
-        Volume Activity: {latest_volume_activity}
-        """
-        
-        fig.add_annotation(
-            x=latest_time,
-            y=latest['High'],
-            text=annotation_text,
-            showarrow=True,
-            arrowhead=1,
-            align="left",
-            bgcolor="rgba(0,0,0,0.5)",
-            font=dict(color="white")
-        )
-    
-    def draw_main_line(fig, big_upper, big_lower):
-        """
-        Draws the main line connecting the latest swing high and low.
-        """
-        if not big_upper or not big_lower:
-            return None
-        
-        # Get the latest swing high and low
-        latest_swing_high = big_upper[-1]
-        latest_swing_low = big_lower[-1]
-        
-        # Define main line based on the latest swing points
-        main_line = {
-            'x1': latest_swing_low,
-            'y1': df.loc[latest_swing_low, 'Low'],
-            'x2': latest_swing_high,
-            'y2': df.loc[latest_swing_high, 'High']
-        }
-        
+
+    # --- Draw Main Line (Connecting Latest Swing Points) ---
+    main_line = result.main_line
+    if main_line:
+        x1, y1, x2, y2 = main_line
         fig.add_trace(go.Scatter(
-            x=[main_line['x1'], main_line['x2']],
-            y=[main_line['y1'], main_line['y2']],
+            x=[x1, x2],
+            y=[y1, y2],
             mode='lines',
             line=dict(color='blue', dash='dash'),
             name='Main Line'
         ))
-        
-        return main_line
-    
-    # === Calculate Pivots ===
-    big_upper, big_lower = calculate_pivots_vectorized(df, params['external_sensitivity'])
-    if params['show_internals']:
-        small_upper, small_lower = calculate_pivots_vectorized(df, params['internal_sensitivity'])
-    else:
-        small_upper, small_lower = [], []
-    
-    # === Identify FVG ===
-    fvg_up, fvg_down = identify_fvg(df)
-    
-    # === Volume Activity ===
-    df = volume_activity(df)
-    
-    # === Create Plotly Figure ===
-    fig = go.Figure()
-    
-    # --- Plot Candlestick ---
-    fig.add_trace(go.Candlestick(
-        x=df.index,
-        open=df['Open'],
-        high=df['High'],
-        low=df['Low'],
-        close=df['Close'],
-        name='Price',
-        increasing_line_color='green',
-        decreasing_line_color='red'
-    ))
-    
-    # --- Plot Swing Highs ---
-    for swing_time in big_upper[-params['swing_order_blocks']:]:
-        try:
-            swing_price = df.loc[swing_time, 'High']
-        except KeyError:
-            continue
-        label_text = 'HH'
-        if params['show_hhlh']:
-            fig.add_trace(go.Scatter(
-                x=[swing_time],
-                y=[swing_price],
-                mode='markers+text',
-                marker=dict(color=params['bear_color'], size=10, symbol='triangle-up'),
-                text=[label_text],
-                textposition='bottom center',
-                name='Swing High',
-                showlegend=False  # Remove from legend to avoid repetition
-            ))
-    
-    # --- Plot Swing Lows ---
-    for swing_time in big_lower[-params['swing_order_blocks']:]:
-        try:
-            swing_price = df.loc[swing_time, 'Low']
-        except KeyError:
-            continue
-        label_text = 'LL'
-        if params['show_hlll']:
-            fig.add_trace(go.Scatter(
-                x=[swing_time],
-                y=[swing_price],
-                mode='markers+text',
-                marker=dict(color=params['bull_color'], size=10, symbol='triangle-down'),
-                text=[label_text],
-                textposition='top center',
-                name='Swing Low',
-                showlegend=False  # Remove from legend to avoid repetition
-            ))
-    
-    # --- Plot Internal Swing Highs ---
-    if params['show_internals']:
-        for swing_time in small_upper:
-            try:
-                swing_price = df.loc[swing_time, 'High']
-            except KeyError:
-                continue
-            fig.add_trace(go.Scatter(
-                x=[swing_time],
-                y=[swing_price],
-                mode='markers',
-                marker=dict(color=params['bear_color'], size=6, symbol='triangle-up'),
-                name='Internal Swing High',
-                showlegend=False  # Remove from legend to avoid repetition
-            ))
-    
-    # --- Plot Internal Swing Lows ---
-    if params['show_internals']:
-        for swing_time in small_lower:
-            try:
-                swing_price = df.loc[swing_time, 'Low']
-            except KeyError:
-                continue
-            fig.add_trace(go.Scatter(
-                x=[swing_time],
-                y=[swing_price],
-                mode='markers',
-                marker=dict(color=params['bull_color'], size=6, symbol='triangle-down'),
-                name='Internal Swing Low',
-                showlegend=False  # Remove from legend to avoid repetition
-            ))
-    
-    # --- Plot Fair Value Gaps (FVG) ---
-    if params['show_fvg']:
-        for gap in fvg_up:
-            fig.add_shape(type="rect",
-                          x0=gap['x0'],
-                          y0=gap['y0'],
-                          x1=gap['x1'],
-                          y1=gap['y1'],
-                          fillcolor=params['fvg_color'],
-                          opacity=params['fvg_transparency'] / 100,
-                          line=dict(width=0),
-                          layer='below',
-                          name='FVG Up')
-        for gap in fvg_down:
-            fig.add_shape(type="rect",
-                          x0=gap['x0'],
-                          y0=gap['y0'],
-                          x1=gap['x1'],
-                          y1=gap['y1'],
-                          fillcolor=params['fvg_color'],
-                          opacity=params['fvg_transparency'] / 100,
-                          line=dict(width=0),
-                          layer='below',
-                          name='FVG Down')
-    
-    # --- Draw Area of Interest (AOE) ---
-    if params['show_aoe']:
-        try:
-            high_aoi_y0, low_aoi_y1 = draw_aoe(fig, df)
-        except Exception as e:
-            high_aoi_y0, low_aoi_y1 = None, None
-            print(f"Error drawing AOE: {e}")
-    else:
-        high_aoi_y0, low_aoi_y1 = None, None
-    
-    # --- Highlight Trading Sessions ---
-    highlight_sessions(fig, df)
-    
-    # --- Draw Main Line (Connecting Latest Swing Points) ---
-    main_line = draw_main_line(fig, big_upper, big_lower)
-    
-    # --- Draw Fibonacci Levels ---
-    if main_line and params['show_fibs']:
-        plot_fibonacci_levels(fig, main_line['y1'], main_line['y2'])
-    
+
+        # --- Draw Fibonacci Levels ---
+        if params['show_fibs']:
+            fib_diff = y1 - y2
+            for level, color in zip(params['fib_levels'], params['fib_colors']):
+                if level == 0.5 and not params['show_fib5']:
+                    continue
+                fig.add_hline(y=y2 + fib_diff * level, line=dict(color=color, dash='dash'),
+                              annotation_text=f'Fib {level}', annotation_position="top left")
+
     # --- Add Volume Activity Annotation ---
-    add_volume_annotation(fig, df)
-    
-    # === Summary Calculations ===
-    summary_data = {}
-    if params['show_aoe'] and high_aoi_y0 is not None and low_aoi_y1 is not None:
-        try:
-            # Last Candle (excluding wicks)
-            last_candle = df.iloc[-1]
-            last_candle_bottom = min(last_candle['Open'], last_candle['Close'])
-            last_candle_upper = max(last_candle['Open'], last_candle['Close'])
-            
-            # Differences
-            difference_bottom_to_AOI_top = high_aoi_y0 - last_candle_bottom
-            difference_upper_to_AOI_bottom = last_candle_upper - low_aoi_y1
-            
-            # Percentages
-            percentage_diff_bottom_to_AOI_top = (difference_bottom_to_AOI_top / high_aoi_y0) * 100 if high_aoi_y0 != 0 else None
-            percentage_diff_upper_to_AOI_bottom = (difference_upper_to_AOI_bottom / low_aoi_y1) * 100 if low_aoi_y1 != 0 else None
-            
-            # Populate summary data
-            summary_data = {
-                'Ticker': ticker,
-                'Highest AOI (Red)': round(high_aoi_y0, 2),
-                'Lowest AOI (Green)': round(low_aoi_y1, 2),
-                'Difference (Last Candle Bottom to AOI Top)': round(difference_bottom_to_AOI_top, 2),
-                'Difference (Last Candle Upper to AOI Bottom)': round(difference_upper_to_AOI_bottom, 2),
-                'Percentage (Bottom to AOI Top)': round(percentage_diff_bottom_to_AOI_top, 2) if percentage_diff_bottom_to_AOI_top is not None else None,
-                'Percentage (Upper to AOI Bottom)': round(percentage_diff_upper_to_AOI_bottom, 2) if percentage_diff_upper_to_AOI_bottom is not None else None
-            }
-        except Exception as e:
-            print(f"Error in summary calculations: {e}")
-            summary_data = {
-                'Ticker': ticker,
-                'Highest AOI (Red)': None,
-                'Lowest AOI (Green)': None,
-                'Difference (Last Candle Bottom to AOI Top)': None,
-                'Difference (Last Candle Upper to AOI Bottom)': None,
-                'Percentage (Bottom to AOI Top)': None,
-                'Percentage (Upper to AOI Bottom)': None
-            }
+    latest_time = index[-1]
+    if params['data_frequency'] in ['15m', '4h']:
+        current_session, time_until_change = _session_status(latest_time, session_times)
     else:
-        summary_data = {
-            'Ticker': ticker,
-            'Highest AOI (Red)': None,
-            'Lowest AOI (Green)': None,
-            'Difference (Last Candle Bottom to AOI Top)': None,
-            'Difference (Last Candle Upper to AOI Bottom)': None,
-            'Percentage (Bottom to AOI Top)': None,
-            'Percentage (Upper to AOI Bottom)': None
-        }
-    
+        # For daily data, sessions are not time-based
+        current_session, time_until_change = "Dead Zone", "N/A"
+
+    annotation_text = f"""
+        Session: {current_session}<br>
+        Session Close: {time_until_change}<br>
+        Volume Activity: {result.volume_activity[-1]}
+        """
+
+    fig.add_annotation(
+        x=latest_time,
+        y=result.high[-1],
+        text=annotation_text,
+        showarrow=True,
+        arrowhead=1,
+        align="left",
+        bgcolor="rgba(0,0,0,0.5)",
+        font=dict(color="white")
+    )
+
     # --- Final Layout Adjustments ---
     fig.update_layout(
         title=f'AOI for {ticker}',
@@ -509,12 +510,33 @@ def mxwll_suite_indicator(df, ticker, params):
         margin=dict(l=50, r=50, t=50, b=50),
         hovermode='x unified'
     )
-    
+
     # --- Remove Separate Small Charts for Zooming ---
     fig.update_xaxes(rangeslider_visible=False)
-    
-    # --- Remove Repeated Legends ---
+
     # Since showlegend=False for individual traces, only the main 'Price' and 'Main Line' legends will appear
     fig.update_layout(showlegend=True)
-    
-    return fig, summary_data
+
+    return fig
+
+
+def mxwll_suite_indicator(df, ticker, params):
+    """
+    Generates a Plotly figure based on the mxwll suite indicator analysis and provides summary statistics.
+    Headless callers (e.g. screeners) should use compute_mxwll directly and skip the figure.
+
+    Args:
+        df (pd.DataFrame): DataFrame containing stock data.
+        ticker (str): Stock ticker symbol.
+        params (dict): Dictionary of analysis parameters.
+
+    Returns:
+        tuple:
+            - plotly.graph_objects.Figure: The generated Plotly figure.
+            - dict: Summary statistics for the analysis, including AOI metrics.
+    """
+    # Suppress warnings for cleaner output
+    warnings.filterwarnings("ignore")
+
+    result = compute_mxwll(df, params)
+    return render_mxwll(result, ticker, params), result.to_summary(ticker)
@@ -0,0 +1,192 @@
+# analysis/screener.py
+
+import os
+import math
+import logging
+import sqlite3
+import warnings
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from analysis.mxwll_suite_indicator import compute_mxwll
+
+
+PRICE_COLUMNS = ["Open", "High", "Low", "Close", "Change", "Change (%)", "Volume"]
+
+
+def compute_comparison_metrics(df, summary, ticker, listed_in="Unknown"):
+    """
+    Computes the stop-loss / take-profit comparison metrics for one analysed ticker.
+
+    Args:
+        df (pd.DataFrame): Price data used for the analysis.
+        summary (dict): Summary returned by the mxwll indicator ('Highest AOI (Red)', 'Lowest AOI (Green)').
+        ticker (str): Stock ticker symbol.
+        listed_in (str): Index the ticker is listed in.
+
+    Returns:
+        dict or None: Comparison metrics, or None if the ticker does not meet the calculation criteria.
+
+    Raises:
+        ValueError: If the low AOI is zero, so the distance cannot be calculated.
+    """
+    high_aoi = summary.get('Highest AOI (Red)')
+    low_aoi = summary.get('Lowest AOI (Green)')
+    last_close = df['Close'].iloc[-1]
+
+    if low_aoi == 0:
+        raise ValueError(f"Low AOI for ticker '{ticker}' is zero, cannot calculate distance.")
+
+    # Calculate Potential Profit (%) based on High_AOI
+    potential_profit = ((high_aoi - last_close) / high_aoi) * 100 if high_aoi else None
+
+    # Calculate Volatility
+    volatility = df['Close'].pct_change().std() * np.sqrt(252)  # Annualized volatility
+
+    # Calculate Distance from Close to Low AOI (Percentage)
+    distance_percentage = ((last_close - low_aoi) / low_aoi) * 100 if low_aoi else None
+
+    # Calculate Range (TP - SL)
+    range_value = high_aoi - low_aoi if high_aoi and low_aoi else None
+
+    if potential_profit is None or distance_percentage is None or range_value is None:
+        return None
+
+    return {
+        'Ticker': ticker,
+        'SL': round(low_aoi, 2),
+        'TP': round(high_aoi, 2),
+        'Close': round(last_close, 2),
+        'Dist (%)': round(distance_percentage, 2),  # Percentage distance
+        'Range': round(range_value, 2),  # Range between TP and SL
+        'Profit (%)': round(potential_profit, 2),
+        'Vol': df['Volume'].iloc[-1],
+        'Volatility': round(volatility, 2),
+        'Listed_in': listed_in  # Include listed_in
+    }
+
+
+def get_database_path(conn):
+    """
+    Returns the file path of the main database of a connection ('' for in-memory databases).
+    """
+    return conn.execute("PRAGMA database_list;").fetchone()[2]
+
+
+def _listed_in_by_symbol(conn, tickers):
+    """
+    Returns a mapping of symbol -> first listed index for the given tickers with one query.
+    """
+    placeholders = ', '.join('?' * len(tickers))
+    rows = conn.execute(
+        f'SELECT SYMBOL, INDEX_NAME FROM IndexMembership WHERE SYMBOL IN ({placeholders}) ORDER BY rowid;', tickers
+    ).fetchall()
+    listed_in = {}
+    for symbol, index_name in rows:
+        if index_name and symbol not in listed_in:
+            listed_in[symbol] = index_name
+    return listed_in
+
+
+def _screen_chunk(db_path, tickers, start, end, params):
+    """
+    Worker: loads a chunk of tickers from the database and runs the indicator without building figures.
+
+    Returns:
+        dict: {'summaries': list, 'metrics': list, 'errors': list}
+    """
+    from utils.db_manager import load_tickers_data  # Imported in the worker process
+
+    warnings.filterwarnings("ignore")
+    result = {'summaries': [], 'metrics': [], 'errors': []}
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        frames = load_tickers_data(conn, tickers, start, end)
+        listed_in = _listed_in_by_symbol(conn, tickers)
+    except sqlite3.Error as e:
+        result['errors'].append(f"Failed to load {len(tickers)} tickers: {e}")
+        return result
+    finally:
+        conn.close()
+
+    for ticker in tickers:
+        df = frames.get(ticker)
+        if df is None or df.empty:
+            result['errors'].append(f"No data available for ticker '{ticker}' in the selected period.")
+            continue
+
+        # Drop NaN and infinite rows, as the interactive analysis does
+        df = df.dropna(subset=PRICE_COLUMNS)
+        df = df[np.isfinite(df[PRICE_COLUMNS]).all(axis=1)]
+        if df.empty:
+            result['errors'].append(f"All data for ticker '{ticker}' was dropped due to NaN or infinite values.")
+            continue
+
+        try:
+            summary = compute_mxwll(df, params).to_summary(ticker)
+            result['summaries'].append(summary)
+            if params['show_aoe']:
+                metrics = compute_comparison_metrics(df, summary, ticker, listed_in.get(ticker, "Unknown"))
+                if metrics is not None:
+                    result['metrics'].append(metrics)
+        except Exception as e:
+            result['errors'].append(f"Error during analysis for ticker '{ticker}': {e}")
+
+    return result
+
+
+def run_screener(db_path, tickers, start, end, params, max_workers=None, chunk_size=None, progress_callback=None):
+    """
+    Runs the mxwll indicator headlessly over many tickers with a process pool.
+    Each worker reads its chunk of tickers from the database and returns only summary dicts.
+
+    Args:
+        db_path (str): Path to the SQLite database file.
+        tickers (list): Ticker symbols to screen.
+        start (str or datetime): First date of the analysis window.
+        end (str or datetime): Last date of the analysis window.
+        params (dict): Dictionary of analysis parameters.
+        max_workers (int, optional): Number of worker processes. Defaults to the CPU count.
+        chunk_size (int, optional): Tickers per work unit. Defaults to about four chunks per worker.
+        progress_callback (callable, optional): Called as progress_callback(done, total) after each chunk.
+
+    Returns:
+        dict: {'summaries': list, 'metrics': list, 'errors': list}
+    """
+    summary = {'summaries': [], 'metrics': [], 'errors': []}
+    tickers = list(dict.fromkeys(tickers))
+    if not tickers:
+        return summary
+    if not db_path or db_path == ':memory:':
+        summary['errors'].append("The screener needs a database file; in-memory databases are not supported.")
+        return summary
+
+    max_workers = max_workers or os.cpu_count() or 1
+    chunk_size = chunk_size or max(1, math.ceil(len(tickers) / (max_workers * 4)))
+    chunks = [tickers[i:i + chunk_size] for i in range(0, len(tickers), chunk_size)]
+    max_workers = min(max_workers, len(chunks))
+
+    start = pd.Timestamp(start).strftime('%Y-%m-%d')
+    end = pd.Timestamp(end).strftime('%Y-%m-%d')
+    logging.info(f"Screening {len(tickers)} tickers in {len(chunks)} chunks over {max_workers} processes.")
+
+    # 'spawn' keeps workers independent of the parent's threads (Streamlit) and open connections
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        futures = [executor.submit(_screen_chunk, db_path, chunk, start, end, params) for chunk in chunks]
+        for done, future in enumerate(as_completed(futures), start=1):
+            try:
+                chunk_result = future.result()
+                for key in summary:
+                    summary[key].extend(chunk_result[key])
+            except Exception as e:
+                summary['errors'].append(f"Screener worker failed: {e}")
+                logging.exception(summary['errors'][-1])
+            if progress_callback:
+                progress_callback(done, len(futures))
+
+    logging.info(f"Screened {len(summary['summaries'])} tickers with {len(summary['errors'])} errors.")
+    return summary
@@ -6,19 +6,29 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 import logging
 from utils.db_manager import (
-    get_unique_tickers_from_db, 
-    get_all_portfolios, 
-    get_tickers_by_group,
-    get_all_indexes,
-    get_tickers_by_index
+    load_tickers_data,
+    indicator_params_hash,
+    get_cached_indicator,
+    store_cached_indicator
+)
+from utils.price_cache import read_ticker_cache
+from utils.app_cache import (
+    cached_unique_tickers,
+    cached_all_portfolios,
+    cached_tickers_by_group,
+    cached_all_indexes,
+    cached_tickers_by_index,
+    cached_latest_dates
 )
 from analysis.mxwll_suite_indicator import mxwll_suite_indicator
+from analysis.screener import run_screener, compute_comparison_metrics, get_database_path
 
 def analyze_tickers(conn):
     st.header("🔍 Analyze Tickers")
-    tickers = get_unique_tickers_from_db(conn)
+    tickers = cached_unique_tickers(conn)
     if not tickers:
         st.warning("No tickers available for analysis. Please add tickers first.")
         logging.warning("No tickers available for analysis.")
@@ -36,7 +46,7 @@ def analyze_tickers(conn):
     if analysis_type == "All Tickers":
         selected_tickers = st.multiselect("Select Tickers for Analysis", tickers, default=tickers)
     elif analysis_type == "By Portfolio":
-        portfolios = get_all_portfolios(conn)
+        portfolios = cached_all_portfolios(conn)
         if portfolios:
             portfolio_names = [portfolio['Name'] for portfolio in portfolios]
             selected_portfolio = st.selectbox("Select a Portfolio", portfolio_names)
@@ -73,7 +83,7 @@ def analyze_tickers(conn):
 
         group_identifier = group_mapping.get(selected_group)
         if group_identifier:
-            selected_tickers = get_tickers_by_group(conn, group_identifier)
+            selected_tickers = cached_tickers_by_group(conn, group_identifier)
 
             # # Debugging Output: Show fetched tickers
             # # st.write(f"🔍 **Fetched Tickers for '{selected_group}':**")
@@ -99,10 +109,10 @@ def analyze_tickers(conn):
             return
     elif analysis_type == "By Index":
         # Fetch all indexes
-        indexes = get_all_indexes(conn)
+        indexes = cached_all_indexes(conn)
         if indexes:
             selected_index = st.selectbox("Select an Index", indexes)
-            selected_tickers = get_tickers_by_index(conn, selected_index)
+            selected_tickers = cached_tickers_by_index(conn, selected_index)
 
             # # Debugging Output: Show fetched index tickers
             # # st.write(f"🔍 **Fetched Tickers for Index '{selected_index}':**")
@@ -175,187 +185,173 @@ def analyze_tickers(conn):
 
     # Removed "Set Filters for Analysis" as per your request
 
+    # Define analysis parameters (use your original params)
+    analysis_params = {
+        "bull_color": '#14D990',
+        "bear_color": '#F24968',
+        "show_internals": True,
+        "internal_sensitivity": 3,  # Options: 3, 5, 8
+        "internal_structure": "All",  # Options: "All", "BoS", "CHoCH"
+        "show_externals": True,
+        "external_sensitivity": 25,  # Options: 10, 25, 50
+        "external_structure": "All",  # Options: "All", "BoS", "CHoCH"
+        "show_order_blocks": True,
+        "swing_order_blocks": 10,
+        "show_hhlh": True,
+        "show_hlll": True,
+        "show_aoe": True,
+        "show_prev_day_high": True,
+        "show_prev_day_labels": True,
+        "show_4h_high": True,
+        "show_4h_labels": True,
+        "show_fvg": True,
+        "contract_violated_fvg": False,
+        "close_only_fvg": False,
+        "fvg_color": '#F2B807',
+        "fvg_transparency": 80,  # Percentage
+        "show_fibs": True,
+        "show_fib236": True,
+        "show_fib382": True,
+        "show_fib5": True,
+        "show_fib618": True,
+        "show_fib786": True,
+        "fib_levels": [0.236, 0.382, 0.5, 0.618, 0.786],
+        "fib_colors": ['gray', 'lime', 'yellow', 'orange', 'red'],
+        "transparency": 0.98,  # For session highlighting
+        "data_frequency": '1D'  # Adjust as needed
+    }
+
+    # Headless mode runs the indicator in worker processes and only builds the comparison tables
+    headless_scan = st.checkbox(
+        "⚡ Headless scan (comparison tables only, no charts)",
+        value=False,
+        help="Screens the selected tickers in parallel worker processes without drawing a chart per ticker."
+    )
+
     # Button to perform analysis
     if st.button("Run Analysis"):
-        for ticker in selected_tickers:
-            st.subheader(f"📊 Analysis for {ticker}")
-
-            # Fetch data from database within the selected date range
-            query = 'SELECT * FROM Ticker WHERE Ticker = ? AND Date BETWEEN ? AND ? ORDER BY Date ASC;'
+        if headless_scan:
+            progress_bar = st.progress(0)
+
+            def update_scan_progress(done, total):
+                progress_bar.progress(done / total)
+
+            with st.spinner(f"Screening {len(selected_tickers)} tickers..."):
+                scan = run_screener(get_database_path(conn), selected_tickers, start_date, end_date,
+                                    analysis_params, progress_callback=update_scan_progress)
+            summary_list = scan['summaries']
+            comparison_metrics = scan['metrics']
+            st.success(f"Screened {len(summary_list)} of {len(selected_tickers)} tickers.")
+            if scan['errors']:
+                with st.expander(f"⚠️ {len(scan['errors'])} tickers could not be screened"):
+                    for error in scan['errors']:
+                        st.write(error)
+        else:
+            # Latest stored date per ticker, used to reject stale price cache files
+            latest_dates = cached_latest_dates(conn)
             cursor = conn.cursor()
-            cursor.execute(query, (ticker, start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")))
-            fetched_data = cursor.fetchall()
-            columns = [description[0] for description in cursor.description]
-
-            if not fetched_data:
-                st.warning(f"No data available for ticker '{ticker}' in the selected period.")
-                logging.warning(f"No data available for ticker '{ticker}' between {start_date.date()} and {end_date.date()}.")
-                continue
-
-            # Convert fetched data to list of dictionaries
-            data = [dict(zip(columns, row)) for row in fetched_data]
-
-            # Convert to DataFrame for analysis
-            df = pd.DataFrame(data)
-
-            # Convert 'Date' column to datetime and set as index
-            df['Date'] = pd.to_datetime(df['Date'])
-            df.set_index('Date', inplace=True)
-
-            # Enforce correct dtypes
-            try:
-                df = df.astype({
-                    "Open": "float64",
-                    "High": "float64",
-                    "Low": "float64",
-                    "Close": "float64",
-                    "Change": "float64",
-                    "Change (%)": "float64",
-                    "Volume": "int64"
-                })
-            except Exception as e:
-                st.error(f"Data type conversion error for ticker '{ticker}': {e}")
-                logging.error(f"Data type conversion error for ticker '{ticker}': {e}")
-                continue
-
-            # Ensure all necessary columns are present and correct
-            required_columns = ["Open", "High", "Low", "Close", "Change", "Change (%)", "Volume"]
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            if missing_columns:
-                st.error(f"Missing columns in data: {missing_columns}")
-                logging.error(f"Missing columns for ticker '{ticker}': {missing_columns}")
-                continue
-
-            # Check for any NaN or infinite values
-            if df[required_columns].isnull().any().any():
-                st.warning("Data contains NaN values. These will be dropped before analysis.")
-                logging.warning(f"Data for ticker '{ticker}' contains NaN values.")
-                df.dropna(subset=required_columns, inplace=True)
-
-            if not np.isfinite(df[required_columns]).all().all():
-                st.warning("Data contains infinite values. These will be dropped before analysis.")
-                logging.warning(f"Data for ticker '{ticker}' contains infinite values.")
-                df = df[np.isfinite(df[required_columns]).all(axis=1)]
-
-            if df.empty:
-                st.warning(f"All data for ticker '{ticker}' was dropped due to NaN or infinite values.")
-                logging.warning(f"All data for ticker '{ticker}' was dropped due to NaN or infinite values.")
-                continue
-
-            # Define analysis parameters (use your original params)
-            analysis_params = {
-                "bull_color": '#14D990',
-                "bear_color": '#F24968',
-                "show_internals": True,
-                "internal_sensitivity": 3,  # Options: 3, 5, 8
-                "internal_structure": "All",  # Options: "All", "BoS", "CHoCH"
-                "show_externals": True,
-                "external_sensitivity": 25,  # Options: 10, 25, 50
-                "external_structure": "All",  # Options: "All", "BoS", "CHoCH"
-                "show_order_blocks": True,
-                "swing_order_blocks": 10,
-                "show_hhlh": True,
-                "show_hlll": True,
-                "show_aoe": True,
-                "show_prev_day_high": True,
-                "show_prev_day_labels": True,
-                "show_4h_high": True,
-                "show_4h_labels": True,
-                "show_fvg": True,
-                "contract_violated_fvg": False,
-                "close_only_fvg": False,
-                "fvg_color": '#F2B807',
-                "fvg_transparency": 80,  # Percentage
-                "show_fibs": True,
-                "show_fib236": True,
-                "show_fib382": True,
-                "show_fib5": True,
-                "show_fib618": True,
-                "show_fib786": True,
-                "fib_levels": [0.236, 0.382, 0.5, 0.618, 0.786],
-                "fib_colors": ['gray', 'lime', 'yellow', 'orange', 'red'],
-                "transparency": 0.98,  # For session highlighting
-                "data_frequency": '1D'  # Adjust as needed
-            }
-
-            # Perform analysis with a spinner
-            with st.spinner(f"Performing analysis for '{ticker}'..."):
-                try:
-                    fig, summary = mxwll_suite_indicator(df, ticker, analysis_params)
-
-                    # Validate that fig is a Plotly figure
-                    if not isinstance(fig, go.Figure):
-                        st.error(f"Generated figure for ticker '{ticker}' is invalid.")
-                        logging.error(f"Generated figure for ticker '{ticker}' is invalid.")
-                        continue
-
-                    # Determine which index the ticker belongs to (if any)
-                    cursor.execute('SELECT "LISTED_IN" FROM MarketWatch WHERE SYMBOL = ? LIMIT 1;', (ticker,))
-                    result = cursor.fetchone()
-                    listed_in = result[0] if result and result[0] else "Unknown"
-
-                    # Customize figure based on 'LISTED_IN'
-                    if analysis_type == "By Index":
-                        fig.update_layout(title=f"{ticker} - {listed_in}")
-
-                    # Display the figure
-                    st.plotly_chart(fig, use_container_width=True)
-                    st.success(f"Analysis for ticker '{ticker}' completed successfully.")
-                    logging.info(f"Analysis for ticker '{ticker}' completed successfully.")
-
-                    # --- Real-Time High_AOI and Potential Profit Calculation ---
-
-                    # Calculate AOI based on the analysis parameters
-                    if analysis_params['show_aoe']:
-                        try:
-                            # Assuming 'summary' contains 'Highest AOI (Red)' and 'Lowest AOI (Green)'
-                            high_aoi = summary.get('Highest AOI (Red)')
-                            low_aoi = summary.get('Lowest AOI (Green)')
-                            last_close = df['Close'].iloc[-1]
-
-                            if low_aoi == 0:
-                                st.error(f"Low AOI for ticker '{ticker}' is zero, cannot calculate distance.")
-                                logging.error(f"Low AOI for ticker '{ticker}' is zero, cannot calculate distance.")
+            params_hash = indicator_params_hash(analysis_params)
+
+            # Read from the memory-mapped price cache, then load every miss with one batched query
+            ticker_frames = {}
+            for ticker in selected_tickers:
+                cached = read_ticker_cache(ticker, start_date, end_date, expected_last_date=latest_dates.get(ticker))
+                if cached is not None:
+                    ticker_frames[ticker] = cached
+            cache_misses = [ticker for ticker in selected_tickers if ticker not in ticker_frames]
+            if cache_misses:
+                ticker_frames.update(load_tickers_data(conn, cache_misses, start_date, end_date))
+
+            for ticker in selected_tickers:
+                st.subheader(f"📊 Analysis for {ticker}")
+
+                df = ticker_frames.get(ticker)
+                if df is None or df.empty:
+                    st.warning(f"No data available for ticker '{ticker}' in the selected period.")
+                    logging.warning(f"No data available for ticker '{ticker}' between {start_date.date()} and {end_date.date()}.")
+                    continue
+
+                # Ensure all necessary columns are present and correct
+                required_columns = ["Open", "High", "Low", "Close", "Change", "Change (%)", "Volume"]
+                missing_columns = [col for col in required_columns if col not in df.columns]
+                if missing_columns:
+                    st.error(f"Missing columns in data: {missing_columns}")
+                    logging.error(f"Missing columns for ticker '{ticker}': {missing_columns}")
+                    continue
+
+                # Check for any NaN or infinite values
+                if df[required_columns].isnull().any().any():
+                    st.warning("Data contains NaN values. These will be dropped before analysis.")
+                    logging.warning(f"Data for ticker '{ticker}' contains NaN values.")
+                    df.dropna(subset=required_columns, inplace=True)
+
+                if not np.isfinite(df[required_columns]).all().all():
+                    st.warning("Data contains infinite values. These will be dropped before analysis.")
+                    logging.warning(f"Data for ticker '{ticker}' contains infinite values.")
+                    df = df[np.isfinite(df[required_columns]).all(axis=1)]
+
+                if df.empty:
+                    st.warning(f"All data for ticker '{ticker}' was dropped due to NaN or infinite values.")
+                    logging.warning(f"All data for ticker '{ticker}' was dropped due to NaN or infinite values.")
+                    continue
+
+                # Perform analysis with a spinner
+                with st.spinner(f"Performing analysis for '{ticker}'..."):
+                    try:
+                        # Reuse the stored result when neither the bar window nor the params changed
+                        first_bar, last_bar = df.index[0].strftime('%Y-%m-%d'), df.index[-1].strftime('%Y-%m-%d')
+                        cached_result = get_cached_indicator(conn, ticker, params_hash, first_bar, last_bar)
+                        if cached_result and cached_result['figure']:
+                            fig, summary = pio.from_json(cached_result['figure']), cached_result['summary']
+                            logging.info(f"Using cached analysis for ticker '{ticker}'.")
+                        else:
+                            fig, summary = mxwll_suite_indicator(df, ticker, analysis_params)
+                            store_cached_indicator(conn, ticker, params_hash, first_bar, last_bar,
+                                                   summary, figure_json=fig.to_json())
+
+                        # Validate that fig is a Plotly figure
+                        if not isinstance(fig, go.Figure):
+                            st.error(f"Generated figure for ticker '{ticker}' is invalid.")
+                            logging.error(f"Generated figure for ticker '{ticker}' is invalid.")
+                            continue
+
+                        # Determine which index the ticker belongs to (if any)
+                        cursor.execute('SELECT INDEX_NAME FROM IndexMembership WHERE SYMBOL = ? ORDER BY rowid LIMIT 1;', (ticker,))
+                        result = cursor.fetchone()
+                        listed_in = result[0] if result and result[0] else "Unknown"
+
+                        # Customize figure based on 'LISTED_IN'
+                        if analysis_type == "By Index":
+                            fig.update_layout(title=f"{ticker} - {listed_in}")
+
+                        # Display the figure
+                        st.plotly_chart(fig, use_container_width=True)
+                        st.success(f"Analysis for ticker '{ticker}' completed successfully.")
+                        logging.info(f"Analysis for ticker '{ticker}' completed successfully.")
+
+                        # --- Real-Time High_AOI and Potential Profit Calculation ---
+
+                        # Calculate AOI based on the analysis parameters
+                        if analysis_params['show_aoe']:
+                            try:
+                                metrics = compute_comparison_metrics(df, summary, ticker, listed_in)
+                                if metrics is not None:
+                                    comparison_metrics.append(metrics)
+                                else:
+                                    logging.info(f"Ticker '{ticker}' does not meet the profit calculation criteria.")
+                            except ValueError as e:
+                                st.error(str(e))
+                                logging.error(str(e))
                                 continue
-
-                            # Calculate Potential Profit (%) based on High_AOI
-                            potential_profit = ((high_aoi - last_close) / high_aoi) * 100 if high_aoi else None
-
-                            # Calculate Volatility
-                            df['Return'] = df['Close'].pct_change()
-                            volatility = df['Return'].std() * np.sqrt(252)  # Annualized volatility
-
-                            # Calculate Distance from Close to Low AOI (Percentage)
-                            distance_percentage = ((last_close - low_aoi) / low_aoi) * 100 if low_aoi else None
-
-                            # Calculate Range (TP - SL)
-                            range_value = high_aoi - low_aoi if high_aoi and low_aoi else None
-
-                            # Append to comparison metrics if calculation was successful
-                            if (potential_profit is not None) and (distance_percentage is not None) and (range_value is not None):
-                                comparison_metrics.append({
-                                    'Ticker': ticker,
-                                    'SL': round(low_aoi, 2),
-                                    'TP': round(high_aoi, 2),
-                                    'Close': round(last_close, 2),
-                                    'Dist (%)': round(distance_percentage, 2),  # Percentage distance
-                                    'Range': round(range_value, 2),  # Range between TP and SL
-                                    'Profit (%)': round(potential_profit, 2),
-                                    'Vol': df['Volume'].iloc[-1],
-                                    'Volatility': round(volatility, 2),
-                                    'Listed_in': listed_in  # Include listed_in
-                                })
-                            else:
-                                logging.info(f"Ticker '{ticker}' does not meet the profit calculation criteria.")
-                        except Exception as e:
-                            st.error(f"Error calculating AOI, Potential Profit, or Volatility for '{ticker}': {e}")
-                            logging.error(f"Error calculating AOI, Potential Profit, or Volatility for '{ticker}': {e}")
-
-                    # Append summary data to the list
-                    summary_list.append(summary)
-                except Exception as e:
-                    st.error(f"An error occurred during analysis for ticker '{ticker}': {e}")
-                    logging.error(f"Error during analysis for ticker '{ticker}': {e}")
+                            except Exception as e:
+                                st.error(f"Error calculating AOI, Potential Profit, or Volatility for '{ticker}': {e}")
+                                logging.error(f"Error calculating AOI, Potential Profit, or Volatility for '{ticker}': {e}")
+
+                        # Append summary data to the list
+                        summary_list.append(summary)
+                    except Exception as e:
+                        st.error(f"An error occurred during analysis for ticker '{ticker}': {e}")
+                        logging.error(f"Error during analysis for ticker '{ticker}': {e}")
 
         # --- Remove "📊 Potential Profit Data" Table ---
         # Removed as per your request
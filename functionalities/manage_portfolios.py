@@ -3,13 +3,12 @@
 import streamlit as st
 import logging
 from utils.db_manager import (
-    get_all_portfolios,
     delete_portfolio,
-    get_unique_tickers_from_db,
     get_portfolio_by_name,
     create_portfolio,
     update_portfolio
 )
+from utils.app_cache import cached_all_portfolios, cached_unique_tickers, clear_portfolio_cache
 import pandas as pd
 
 def manage_portfolios(conn):
@@ -36,7 +35,7 @@ def manage_portfolios(conn):
 
 def delete_existing_portfolio(conn):
     st.subheader("🗑️ Delete Portfolio")
-    portfolios = get_all_portfolios(conn)
+    portfolios = cached_all_portfolios(conn)
 
     if portfolios:
         portfolio_names = [portfolio['Name'] for portfolio in portfolios]
@@ -53,6 +52,7 @@ def delete_existing_portfolio(conn):
                 if confirm:
                     success = delete_portfolio(conn, portfolio['Portfolio_ID'])
                     if success:
+                        clear_portfolio_cache()
                         st.success(f"✅ Portfolio '{selected_portfolio_name}' deleted successfully.")
                         logging.info(f"Portfolio '{selected_portfolio_name}' deleted successfully.")
                         
@@ -73,7 +73,7 @@ def create_new_portfolio(conn):
     max_tickers = 50  # Maximum number of tickers allowed in a portfolio
 
     # Fetch all unique symbols from the Ticker table for validation
-    all_symbols = get_unique_tickers_from_db(conn)  # Ensure this fetches the correct tickers
+    all_symbols = cached_unique_tickers(conn)  # Ensure this fetches the correct tickers
 
     # Initialize form counter
     if 'portfolio_form_counter' not in st.session_state:
@@ -141,6 +141,7 @@ def create_new_portfolio(conn):
             # Create Portfolio
             success = create_portfolio(conn, portfolio_name, added_symbols)
             if success:
+                clear_portfolio_cache()
                 st.success(f"✅ Portfolio '{portfolio_name}' created successfully with {len(added_symbols)} tickers.")
                 logging.info(f"Portfolio '{portfolio_name}' created with tickers: {added_symbols}.")
 
@@ -157,7 +158,7 @@ def create_new_portfolio(conn):
 
 def view_portfolios(conn):
     st.subheader("📋 View Portfolios")
-    portfolios = get_all_portfolios(conn)
+    portfolios = cached_all_portfolios(conn)
     if portfolios:
         for portfolio in portfolios:
             st.markdown(f"### **{portfolio['Name']}**")
@@ -169,7 +170,7 @@ def view_portfolios(conn):
 
 def update_existing_portfolio(conn):
     st.subheader("🔄 Update Portfolio")
-    portfolios = get_all_portfolios(conn)
+    portfolios = cached_all_portfolios(conn)
 
     if portfolios:
         portfolio_names = [portfolio['Name'] for portfolio in portfolios]
@@ -196,7 +197,7 @@ def update_existing_portfolio(conn):
 
                 for symbol in unique_new_bulk_symbols:
                     if symbol not in updated_symbols:
-                        if symbol in get_unique_tickers_from_db(conn):
+                        if symbol in cached_unique_tickers(conn):
                             updated_symbols.append(symbol)
                         else:
                             non_existent_symbols.append(symbol)
@@ -206,6 +207,7 @@ def update_existing_portfolio(conn):
                 # Update Portfolio
                 success = update_portfolio(conn, portfolio['Portfolio_ID'], new_name=new_name, new_stocks=updated_symbols)
                 if success:
+                    clear_portfolio_cache()
                     st.success(f"✅ Portfolio '{selected_portfolio_name}' updated successfully.")
                     logging.info(f"Portfolio '{selected_portfolio_name}' updated successfully to '{new_name}' with tickers: {updated_symbols}.")
 
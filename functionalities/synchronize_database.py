@@ -13,6 +13,19 @@ from utils.db_manager import (
     get_last_five_working_days,
     synchronize_database  # Ensure this function is implemented
 )
+from utils.app_cache import clear_db_caches
+from utils.helpers import get_trading_days
+from utils.sync_jobs import (
+    start_sync_job,
+    resume_sync_job,
+    get_sync_job,
+    get_latest_sync_job,
+    mark_interrupted_jobs,
+    JOB_STATUS_RUNNING,
+    JOB_STATUS_COMPLETED,
+    JOB_STATUS_INTERRUPTED
+)
+from analysis.screener import get_database_path
 from datetime import datetime, timedelta
 
 # Configure logging with UTF-8 encoding to handle emojis
@@ -47,6 +60,94 @@ def is_past_five_pm():
     logger.debug(f"Current time in Asia/Karachi: {current_time.strftime('%Y-%m-%d %H:%M:%S')}")
     return current_time.hour >= 17
 
+def render_sync_job_status(db_path, job_id):
+    """
+    Shows the progress of a background sync job. While the job runs, the panel re-renders
+    itself every two seconds as a fragment, without rerunning the rest of the page.
+
+    Args:
+        db_path (str): Path to the SQLite database file.
+        job_id (int): The job to show.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        job = get_sync_job(conn, job_id)
+    finally:
+        conn.close()
+    if job is None:
+        return
+
+    total = max(job['total'], 1)
+    st.progress(min(job['processed'] / total, 1.0))
+    if job['status'] == JOB_STATUS_RUNNING:
+        st.info(f"⏳ Sync job {job_id}: {job['processed']}/{job['total']} dates processed "
+                f"({len(job['dates'])} requested).")
+        return
+
+    if job['status'] == JOB_STATUS_COMPLETED:
+        st.success(f"✅ Sync job {job_id}: {job['message']}")
+    elif job['status'] == JOB_STATUS_INTERRUPTED:
+        st.warning(f"⚠️ Sync job {job_id}: {job['message']}")
+    else:
+        st.error(f"❌ Sync job {job_id}: {job['message']}")
+
+    # Cached ticker lists and latest dates are stale once the job has written new days;
+    # the full rerun also re-enables the job buttons
+    if st.session_state.get('sync_job_caches_cleared') != job_id:
+        st.session_state['sync_job_caches_cleared'] = job_id
+        clear_db_caches()
+        st.rerun()
+
+
+def sync_jobs_ui(conn, missing_dates):
+    """
+    Streamlit UI for syncing several dates at once in a background job.
+
+    Args:
+        conn (sqlite3.Connection): SQLite database connection.
+        missing_dates (list): Missing dates in 'YYYY-MM-DD' format.
+    """
+    st.markdown("### 🚀 Sync Several Dates in the Background")
+    db_path = get_database_path(conn)
+    if not db_path:
+        st.info("Background sync jobs need a database file.")
+        return
+
+    mark_interrupted_jobs(conn)
+    latest_job = get_latest_sync_job(conn)
+    job_running = latest_job is not None and latest_job['status'] == JOB_STATUS_RUNNING
+
+    today = datetime.today()
+    date_range = st.date_input(
+        "Date range to synchronize",
+        value=(today - timedelta(days=7), today - timedelta(days=1)),
+        min_value=datetime(2000, 1, 1),
+        max_value=today,
+        key="sync_job_range"
+    )
+
+    refetch = st.checkbox("Re-fetch dates already marked as synchronized", value=False, key="sync_job_refetch",
+                          help="By default the range skips dates SyncLog has already finished.")
+
+    col1, col2, col3 = st.columns(3)
+    job_id = None
+    # Missing dates have no Ticker rows, so any SyncLog checkpoint they have is ignored
+    if col1.button(f"Sync all {len(missing_dates)} missing dates", disabled=job_running or not missing_dates):
+        job_id = start_sync_job(db_path, missing_dates, resume=False)
+    if col2.button("Sync selected range", disabled=job_running or len(date_range) != 2):
+        job_id = start_sync_job(db_path, get_trading_days(date_range[0], date_range[1]), resume=not refetch)
+    can_resume = latest_job is not None and not job_running and latest_job['status'] != JOB_STATUS_COMPLETED
+    if col3.button("Resume last job", disabled=not can_resume):
+        job_id = resume_sync_job(db_path, latest_job['job_id'])
+
+    if job_id is not None:
+        logger.info(f"Started background sync job {job_id}.")
+        st.rerun()  # Re-render the buttons and the status panel for the new job
+    if latest_job is not None:
+        run_every = "2s" if job_running else None
+        st.fragment(run_every=run_every)(render_sync_job_status)(db_path, latest_job['job_id'])
+
+
 def synchronize_database_ui(conn):
     """
     Streamlit UI for synchronizing the database.
@@ -63,6 +164,12 @@ def synchronize_database_ui(conn):
         st.subheader("📅 Full Synchronization")
         st.write("This will perform a complete synchronization of the database, updating all tables.")
 
+        incremental = st.checkbox(
+            "Incremental ticker sync (only fetch dates missing per ticker)",
+            value=True,
+            help="Uncheck to clear the Ticker table and re-download every ticker's full history."
+        )
+
         if st.button("Start Full Synchronization", key="full_sync_button"):
             try:
                 # Initialize progress bar and status text
@@ -80,7 +187,9 @@ def synchronize_database_ui(conn):
                 with st.spinner('Full synchronization in progress...'):
                     # Call the existing synchronize_database function with the correct date
                     # Ensure that 'synchronize_database' is properly implemented in db_manager.py
-                    summary = synchronize_database(conn, date_to_sync, progress_bar, status_text, log_container)
+                    summary = synchronize_database(conn, date_to_sync, progress_bar, status_text, log_container,
+                                                   incremental=incremental)
+                clear_db_caches()  # Ticker lists, indexes and latest dates may have changed
 
                 st.success("✅ Full synchronization has completed. Check the summary below for details.")
                 logger.info("Full synchronization completed.")
@@ -102,27 +211,20 @@ def synchronize_database_ui(conn):
                     else:
                         st.error(summary.get('market_watch', {}).get('message', "No data available."))
 
-                    # Existing Tickers Data
-                    st.markdown("#### Existing Tickers Data")
-                    if summary.get('old_tickers') and summary['old_tickers']['success']:
-                        st.success(summary['old_tickers']['message'])
-                        if summary['old_tickers'].get('errors'):
-                            st.warning(f"⚠️ Encountered errors with {len(summary['old_tickers']['errors'])} tickers.")
-                            for error in summary['old_tickers']['errors']:
-                                st.write(error)
-                    else:
-                        st.error(summary.get('old_tickers', {}).get('message', "No data available."))
-
-                    # New Tickers Data
-                    st.markdown("#### New Tickers Data")
-                    if summary.get('new_tickers') and summary['new_tickers']['success']:
-                        st.success(summary['new_tickers']['message'])
-                        if summary['new_tickers'].get('errors'):
-                            st.warning(f"⚠️ Encountered errors with {len(summary['new_tickers']['errors'])} new tickers.")
-                            for error in summary['new_tickers']['errors']:
-                                st.write(error)
+                    # Tickers Data
+                    st.markdown("#### Tickers Data")
+                    tickers_summary = summary.get('tickers', {})
+                    if tickers_summary.get('records_added') or tickers_summary.get('success'):
+                        if tickers_summary.get('success'):
+                            st.success(tickers_summary['message'])
+                        else:
+                            st.warning(tickers_summary['message'])
+                        if tickers_summary.get('errors'):
+                            with st.expander(f"⚠️ {len(tickers_summary['errors'])} ticker errors"):
+                                for error in tickers_summary['errors']:
+                                    st.write(error)
                     else:
-                        st.error(summary.get('new_tickers', {}).get('message', "No data available."))
+                        st.error(tickers_summary.get('message') or "No data available.")
                 else:
                     st.warning("⚠️ No synchronization summary available.")
 
@@ -176,6 +278,7 @@ def synchronize_database_ui(conn):
                         status_text=st.empty(),
                         log_container=st.container()
                     )
+                clear_db_caches()
 
                 # Display summary
                 if summary['success']:
@@ -206,6 +309,7 @@ def synchronize_database_ui(conn):
                                 status_text=status_text,
                                 log_container=log_container
                             )
+                        clear_db_caches()
 
                         # Display summary
                         if summary['success']:
@@ -218,6 +322,8 @@ def synchronize_database_ui(conn):
                 st.success("✅ All data up-to-date for the last five working days.")
                 st.write("✅ All data up-to-date for the last five working days.")
 
+            sync_jobs_ui(conn, missing_dates)
+
         except Exception as e:
             logger.exception(f"Unexpected error in Partial Sync UI: {e}")
             st.error(f"An unexpected error occurred: {e}")
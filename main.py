@@ -8,7 +8,7 @@ from functionalities.synchronize_database import synchronize_database_ui
 # Removed import for add_new_ticker
 from functionalities.analyze_tickers import analyze_tickers
 from functionalities.manage_portfolios import manage_portfolios
-from utils.db_manager import initialize_db_and_tables
+from utils.app_cache import open_connection
 from utils.logger import setup_logging
 
 # Initialize logging
@@ -25,28 +25,29 @@ st.set_page_config(
 # Title of the App
 st.title("📈 PSX Scanner")
 
-# Initialize database
-conn = initialize_db_and_tables()
+# Connection for this run only, closed below; tables and migrations are set up once per process, not on every rerun
+conn = open_connection()
 
 if conn is None:
     st.error("Failed to connect to the database. Please check the logs.")
     logger.error("Database connection failed.")
     st.stop()
 
-# Sidebar for navigation
-st.sidebar.header("Menu")
-app_mode = st.sidebar.selectbox("Choose the Scanner mode",
-    ["Synchronize Database", "Analyze Tickers", "Manage Portfolios"])  # Removed "Add New Ticker"
-
-
-# removed add ticker
-# Import functionality modules based on user selection
-if app_mode == "Synchronize Database":
-    synchronize_database_ui(conn)
-elif app_mode == "Analyze Tickers":
-    analyze_tickers(conn)
-elif app_mode == "Manage Portfolios":
-    manage_portfolios(conn)
-
-# Close the connection when done
-conn.close()
+try:
+    # Sidebar for navigation
+    st.sidebar.header("Menu")
+    app_mode = st.sidebar.selectbox("Choose the Scanner mode",
+        ["Synchronize Database", "Analyze Tickers", "Manage Portfolios"])  # Removed "Add New Ticker"
+
+
+    # removed add ticker
+    # Import functionality modules based on user selection
+    if app_mode == "Synchronize Database":
+        synchronize_database_ui(conn)
+    elif app_mode == "Analyze Tickers":
+        analyze_tickers(conn)
+    elif app_mode == "Manage Portfolios":
+        manage_portfolios(conn)
+finally:
+    # Also runs when st.rerun() or st.stop() ends the run early
+    conn.close()
@@ -0,0 +1,136 @@
+# tests/benchmark_html_parsing.py
+#
+# Compares the lxml and BeautifulSoup backends of utils.html_parsing on PSX-style pages.
+#
+#   python -m tests.benchmark_html_parsing                       # synthetic fixtures
+#   python -m tests.benchmark_html_parsing page1.html page2.html # saved pages
+#
+# Synthetic fixtures mirror the markup of the market-watch, listings and historical pages
+# and are written to tests/data/html/ so later runs parse exactly the same input.
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.html_parsing import read_table_rows, LXML_AVAILABLE  # noqa: E402
+from utils.data_fetcher import parse_html_to_df  # noqa: E402
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'html')
+
+
+def _market_watch_page(rows, rng):
+    body = []
+    for i in range(rows):
+        ldcp = rng.uniform(5, 500)
+        change = rng.uniform(-5, 5)
+        body.append(
+            f'<tr><td data-search="S{i:04d}"><a class="tbl__symbol" href="/company/S{i:04d}">'
+            f'<strong>S{i:04d}</strong></a></td><td>08{i % 40:02d}</td>'
+            f'<td><div class="tag">KSE100</div></td>'
+            + ''.join(f'<td class="right" data-order="{v:.2f}">{v:,.2f}</td>'
+                      for v in (ldcp, ldcp, ldcp + 2, ldcp - 2, ldcp + change, change))
+            + f'<td class="right">{change / ldcp * 100:.2f}%</td>'
+            f'<td class="right">{rng.randint(0, 5_000_000):,}</td></tr>'
+        )
+    return ('<html><body><table class="tbl"><thead><tr><th>SYMBOL</th><th>SECTOR</th><th>LISTED IN</th>'
+            '<th>LDCP</th><th>OPEN</th><th>HIGH</th><th>LOW</th><th>CURRENT</th><th>CHANGE</th>'
+            '<th>CHANGE (%)</th><th>VOLUME</th></tr></thead><tbody>' + ''.join(body) + '</tbody></table></body></html>')
+
+
+def _listings_page(rows, rng):
+    body = []
+    for i in range(rows):
+        tags = ''.join(f'<div class="tag">{name}</div>' for name in rng.sample(['KSE100', 'KSE30', 'KMI30', 'ALLSHR'], 2))
+        body.append(
+            f'<tr><td>S{i:04d}</td><td>Company {i} Limited</td><td>Sector {i % 35}</td><td>CDS</td>'
+            f'<td>{rng.randint(1_000_000, 900_000_000):,}</td><td>{rng.randint(100_000, 90_000_000):,}</td>'
+            f'<td>{tags}</td></tr>'
+        )
+    return ('<table class="tbl"><thead><tr><th>SYMBOL</th><th>NAME</th><th>SECTOR</th><th>CLEARING TYPE</th>'
+            '<th>SHARES</th><th>FREE FLOAT</th><th>LISTED IN</th></tr></thead><tbody>' + ''.join(body) + '</tbody></table>')
+
+
+def _historical_page(rows, rng):
+    body = []
+    for i in range(rows):
+        ldcp = rng.uniform(5, 500)
+        close = ldcp + rng.uniform(-5, 5)
+        body.append(
+            f'<tr><td>S{i:04d}</td>'
+            + ''.join(f'<td>{v:,.2f}</td>' for v in (ldcp, ldcp, max(ldcp, close) + 1, min(ldcp, close) - 1, close,
+                                                     close - ldcp, (close - ldcp) / ldcp * 100))
+            + f'<td>{rng.randint(0, 5_000_000):,}</td></tr>'
+        )
+    return ('<table class="tbl"><thead><tr><th>SYMBOL</th><th>LDCP</th><th>OPEN</th><th>HIGH</th><th>LOW</th>'
+            '<th>CLOSE</th><th>CHANGE</th><th>CHANGE (%)</th><th>VOLUME</th></tr></thead><tbody>'
+            + ''.join(body) + '</tbody></table>')
+
+
+def ensure_fixtures(rows=600, seed=7):
+    """
+    Writes the synthetic fixture pages once and returns their paths.
+    """
+    rng = random.Random(seed)
+    builders = {
+        'market_watch.html': _market_watch_page,
+        'listings.html': _listings_page,
+        'historical.html': _historical_page,
+    }
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    paths = []
+    for name, build in builders.items():
+        path = os.path.join(FIXTURE_DIR, name)
+        if not os.path.exists(path):
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(build(rows, rng))
+        paths.append(path)
+    return paths
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the HTML table parser backends.")
+    parser.add_argument('pages', nargs='*', help="Saved HTML pages (defaults to synthetic fixtures).")
+    parser.add_argument('--repeat', type=int, default=5, help="Runs per backend; the best time is reported.")
+    args = parser.parse_args()
+
+    if not LXML_AVAILABLE:
+        print("lxml is not installed; only the BeautifulSoup backend is available.")
+        return
+
+    pages = args.pages or ensure_fixtures()
+    print(f"{'page':<22}{'rows':>6}{'bs4 (ms)':>12}{'lxml (ms)':>12}{'speedup':>10}  parse_html_to_df")
+    for path in pages:
+        with open(path, 'r', encoding='utf-8') as f:
+            html = f.read()
+
+        # Both backends must agree before their timings mean anything
+        bs4_result = read_table_rows(html, tag_columns=[2, 6], backend='bs4')
+        lxml_result = read_table_rows(html, tag_columns=[2, 6], backend='lxml')
+        if bs4_result != lxml_result:
+            print(f"{os.path.basename(path)}: backends disagree, skipping.")
+            continue
+
+        bs4_time = best_of(lambda: read_table_rows(html, backend='bs4'), args.repeat)
+        lxml_time = best_of(lambda: read_table_rows(html, backend='lxml'), args.repeat)
+        df_bs4 = best_of(lambda: parse_html_to_df(html, backend='bs4'), args.repeat)
+        df_lxml = best_of(lambda: parse_html_to_df(html, backend='lxml'), args.repeat)
+
+        print(f"{os.path.basename(path):<22}{len(lxml_result[1]):>6}{bs4_time * 1000:>12.1f}{lxml_time * 1000:>12.1f}"
+              f"{bs4_time / lxml_time:>9.1f}x  {df_bs4 * 1000:.1f} -> {df_lxml * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# tests/benchmark_market_watch_merge.py
+#
+# Times utils.db_manager.build_market_watch_rows (one pass over symbol-keyed indexes) against the previous
+# per-record merge on synthetic universes of growing size, to show that it scales linearly.
+#
+#   python -m tests.benchmark_market_watch_merge                  # 625 .. 5,000 symbols
+#   python -m tests.benchmark_market_watch_merge --sizes 1000 8000
+#
+# The synthetic universe mirrors the fetchers' output: market watch records with a comma-separated
+# LISTED_IN and suffixed symbols, defaulters (some absent from the market) and PSX constituents.
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.db_manager import build_market_watch_rows, strip_symbol_suffix  # noqa: E402
+
+INDEXES = ['KSE100', 'KSE30', 'KMI30', 'ALLSHR', 'KMIALLSHR', 'BKTI', 'OGTI', 'PSXDIV20']
+
+
+def synthetic_universe(symbols, seed=7):
+    """
+    Returns (market_data, defaulters_data, psx_data) for a universe of the given size.
+    """
+    rng = random.Random(seed)
+    market_data, psx_data = [], []
+    for i in range(symbols):
+        symbol = f"S{i:05d}"
+        ldcp = rng.uniform(5, 500)
+        market_data.append({
+            'SYMBOL': symbol + rng.choice(['', '', '', '', 'XD', 'XB']),
+            'SECTOR': f"Sector {i % 35}",
+            'LISTED_IN': ','.join(rng.sample(INDEXES, rng.randint(1, 5))),
+            'LDCP': ldcp, 'OPEN': ldcp, 'HIGH': ldcp + 2, 'LOW': ldcp - 2, 'CURRENT': ldcp + 1,
+            'CHANGE': 1.0, 'CHANGE (%)': round(100 / ldcp, 2), 'VOLUME': rng.randint(1, 5_000_000),
+        })
+        if i % 3:
+            psx_data.append({
+                'SYMBOL': symbol, 'ISIN': f"PK{i:010d}", 'COMPANY': f"Company {i} Limited", 'PRICE': ldcp,
+                'IDX_WT': rng.uniform(0, 5), 'FF_BASED_SHARES': rng.randint(1, 10**8),
+                'FF_BASED_MCAP': rng.uniform(1e6, 1e10), 'ORD_SHARES': rng.randint(1, 10**9),
+                'ORD_SHARES_MCAP': rng.uniform(1e6, 1e11), 'VOLUME': rng.randint(1, 10**6),
+            })
+    # About 8% defaulters, a quarter of them no longer in the market watch
+    defaulters_data = [{'SYMBOL': f"S{i:05d}", 'DEFAULTING CLAUSE': '5.11.1(a)'} for i in range(0, symbols, 16)]
+    defaulters_data += [{'SYMBOL': f"D{i:05d}", 'DEFAULTING CLAUSE': '5.11.1(b)'} for i in range(symbols // 50)]
+    return market_data, defaulters_data, psx_data
+
+
+def legacy_build_rows(market_data, defaulters_data, psx_data):
+    """
+    The previous per-record merge: a dict walk per field and, per defaulter, a membership test
+    against a freshly built list of every market symbol (quadratic in the universe size).
+    """
+    defaulters_dict = {d['SYMBOL']: d for d in defaulters_data} if defaulters_data else {}
+    psx_dict = {d['SYMBOL']: d for d in psx_data} if psx_data else {}
+    psx_fields = ['ISIN', 'COMPANY', 'PRICE', 'IDX_WT', 'FF_BASED_SHARES', 'FF_BASED_MCAP', 'ORD_SHARES', 'ORD_SHARES_MCAP']
+    rows = []
+    for record in market_data:
+        base_symbol, suffix = strip_symbol_suffix(record.get('SYMBOL'))
+        prices = [round(float(record[f]), 2) if record.get(f) else None
+                  for f in ('LDCP', 'OPEN', 'HIGH', 'LOW', 'CURRENT', 'CHANGE', 'CHANGE (%)')]
+        volume = int(record['VOLUME']) if record.get('VOLUME') else None
+        clause = defaulters_dict.get(base_symbol, {}).get('DEFAULTING CLAUSE')
+        psx = [psx_dict.get(base_symbol, {}).get(f) for f in psx_fields]
+        for index in (record.get('LISTED_IN').split(',') if record.get('LISTED_IN') else []):
+            rows.append((base_symbol, psx[0], psx[1], record.get('SECTOR'), index.strip(), *prices, volume,
+                         clause is not None, clause, *psx[2:], suffix))
+    for symbol, defaulter in defaulters_dict.items():
+        if symbol not in [record.get('SYMBOL') for record in market_data]:
+            base_symbol, suffix = strip_symbol_suffix(symbol)
+            psx = [psx_dict.get(symbol, {}).get(f) for f in psx_fields]
+            rows.append((base_symbol, psx[0], psx[1], None, 'DEFAULT', *[None] * 8, True,
+                         defaulter['DEFAULTING CLAUSE'], *psx[2:], suffix))
+    return rows
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the market watch merge.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[625, 1250, 2500, 5000],
+                        help="Universe sizes (number of symbols).")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per size; the best time is reported.")
+    args = parser.parse_args()
+
+    print(f"{'symbols':>8}{'rows':>8}{'legacy (ms)':>14}{'joined (ms)':>14}{'us/symbol':>12}{'speedup':>10}")
+    for size in args.sizes:
+        sources = synthetic_universe(size)
+
+        # Both merges must agree before their timings mean anything
+        if build_market_watch_rows(*sources) != legacy_build_rows(*sources):
+            print(f"{size:>8}  merges disagree, skipping.")
+            continue
+
+        rows = len(build_market_watch_rows(*sources))
+        legacy_time = best_of(lambda: legacy_build_rows(*sources), args.repeat)
+        joined_time = best_of(lambda: build_market_watch_rows(*sources), args.repeat)
+        print(f"{size:>8}{rows:>8}{legacy_time * 1000:>14.1f}{joined_time * 1000:>14.1f}"
+              f"{joined_time / size * 1e6:>12.1f}{legacy_time / joined_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# utils/app_cache.py
+
+import logging
+import sqlite3
+
+import streamlit as st
+
+from utils.db_manager import (
+    initialize_db_and_tables,
+    get_unique_tickers_from_db,
+    get_all_portfolios,
+    get_all_indexes,
+    get_tickers_by_index,
+    get_tickers_by_group,
+    get_latest_dates_by_ticker
+)
+
+DEFAULT_DB_PATH = 'data/tick_data.db'
+
+# How long cached query results live before being re-read, in seconds
+TICKER_LIST_TTL = 600
+PORTFOLIO_TTL = 300
+MARKET_WATCH_TTL = 300
+
+@st.cache_resource(show_spinner=False)
+def _prepare_database(db_path):
+    """
+    Creates the tables and applies schema migrations once per process, instead of on every rerun.
+    """
+    conn = initialize_db_and_tables(db_path)
+    if conn is None:
+        # Raising keeps the failure out of the resource cache, so the next rerun retries
+        raise sqlite3.OperationalError(f"Could not open database at {db_path}.")
+    conn.close()
+    logging.info(f"Database ready at {db_path}.")
+    return db_path
+
+
+def open_connection(db_path=DEFAULT_DB_PATH):
+    """
+    Opens a new SQLite connection for one script run; the caller closes it when the run ends.
+
+    Transaction state belongs to a connection, so connections are never shared: Streamlit runs each
+    rerun in its own thread, and a commit or rollback in one session must not end another's work.
+    Opening a connection is cheap; only the one-time database setup is cached across runs.
+
+    Args:
+        db_path (str): Path to the SQLite database file.
+
+    Returns:
+        sqlite3.Connection or None: The connection, or None if the database could not be initialized.
+    """
+    try:
+        _prepare_database(db_path)
+        return sqlite3.connect(db_path)
+    except sqlite3.Error as e:
+        logging.error(f"Database connection failed: {e}")
+        return None
+
+
+# ---- Cached reads (the leading underscore keeps the connection out of the cache key) ---- #
+
+@st.cache_data(ttl=TICKER_LIST_TTL, show_spinner=False)
+def cached_unique_tickers(_conn):
+    return get_unique_tickers_from_db(_conn)
+
+
+@st.cache_data(ttl=TICKER_LIST_TTL, show_spinner=False)
+def cached_latest_dates(_conn):
+    return get_latest_dates_by_ticker(_conn)
+
+
+@st.cache_data(ttl=PORTFOLIO_TTL, show_spinner=False)
+def cached_all_portfolios(_conn):
+    return get_all_portfolios(_conn)
+
+
+@st.cache_data(ttl=MARKET_WATCH_TTL, show_spinner=False)
+def cached_all_indexes(_conn):
+    return get_all_indexes(_conn)
+
+
+@st.cache_data(ttl=MARKET_WATCH_TTL, show_spinner=False)
+def cached_tickers_by_index(_conn, index_name):
+    return get_tickers_by_index(_conn, index_name)
+
+
+@st.cache_data(ttl=MARKET_WATCH_TTL, show_spinner=False)
+def cached_tickers_by_group(_conn, group_type):
+    return get_tickers_by_group(_conn, group_type)
+
+
+def clear_portfolio_cache():
+    """
+    Drops cached portfolio reads; call after creating, updating or deleting a portfolio.
+    """
+    cached_all_portfolios.clear()
+
+
+def clear_db_caches():
+    """
+    Drops every cached DB read; call after a synchronization completes.
+    """
+    for cached_read in (cached_unique_tickers, cached_latest_dates, cached_all_portfolios,
+                        cached_all_indexes, cached_tickers_by_index, cached_tickers_by_group):
+        cached_read.clear()
+    logging.info("Cleared cached database reads.")
@@ -3,7 +3,6 @@
 import requests
 import json
 import logging
-from bs4 import BeautifulSoup
 import re
 import pandas as pd
 from datetime import datetime, timedelta
@@ -11,21 +10,40 @@ from io import StringIO
 from io import BytesIO
 import aiohttp
 import asyncio
+import random
 
 # testing this script
 # from logger import setup_logging
 
 # when running main.py
 from utils.logger import setup_logging
+from utils.http_client import get_client
+from utils.html_parsing import read_table_rows, rows_to_frame, convert_numeric_columns
+from utils.helpers import clean_numeric_series
 
 
 setup_logging()
 logger = logging.getLogger(__name__)
 
 
-# Base URLs for PSX data files
-BASE_OFF_MARKET_CSV_URL = "https://dps.psx.com.pk/download/omts/{}.csv"
-PSX_CONSTITUENT_URL = "https://dps.psx.com.pk/download/indhist/{}.xls"
+# PSX paths, resolved against the HTTP client's base URL (https://dps.psx.com.pk)
+BASE_OFF_MARKET_CSV_URL = "/download/omts/{}.csv"
+PSX_CONSTITUENT_URL = "/download/indhist/{}.xls"
+MARKET_WATCH_PATH = "/market-watch"
+DEFAULTERS_PATH = "/listings-table/main/dc"
+LISTINGS_PATH = "/listings-table/main/nc"
+HISTORICAL_PATH = "/historical"
+
+# Positional columns of the PSX HTML tables
+MARKET_WATCH_COLUMNS = ['SYMBOL', 'SECTOR', 'LISTED_IN', 'LDCP', 'OPEN', 'HIGH', 'LOW',
+                        'CURRENT', 'CHANGE', 'CHANGE (%)', 'VOLUME']
+LISTINGS_COLUMNS = ['SYMBOL', 'NAME', 'SECTOR', 'CLEARING TYPE', 'SHARES', 'FREE FLOAT', 'LISTED_IN']
+DEFAULTERS_COLUMNS = ['SYMBOL', 'NAME', 'SECTOR', 'DEFAULTING CLAUSE', 'CLEARING TYPE',
+                      'SHARES', 'FREE FLOAT', 'LISTED_IN']
+
+# Investors Lounge price history endpoint
+INVESTORS_LOUNGE_HOST = "www.investorslounge.com"
+INVESTORS_LOUNGE_URL = f"https://{INVESTORS_LOUNGE_HOST}/Default/SendPostRequest"
 
 
 # Data from the PDF parsed into a dictionary
@@ -170,9 +188,9 @@ SECTOR_MAPPING = {
 
 
 
-def get_stock_data(ticker, date_from, date_to):
+def _stock_data_request(ticker, date_from, date_to):
     """
-    Fetches stock data from the Investors Lounge API for a given ticker and date range.
+    Builds the headers and JSON payload for an Investors Lounge price history request.
 
     Args:
         ticker (str): The stock ticker symbol.
@@ -180,10 +198,8 @@ def get_stock_data(ticker, date_from, date_to):
         date_to (str): End date in 'DD MMM YYYY' format.
 
     Returns:
-        list: A list of dictionaries containing stock data.
+        tuple: (headers, payload) dictionaries.
     """
-    url = "https://www.investorslounge.com/Default/SendPostRequest"
-
     headers = {
         "Accept": "*/*",
         "Accept-Language": "en-US,en;q=0.9,ps;q=0.8",
@@ -209,8 +225,26 @@ def get_stock_data(ticker, date_from, date_to):
         })
     }
 
+    return headers, payload
+
+
+def get_stock_data(ticker, date_from, date_to):
+    """
+    Fetches stock data from the Investors Lounge API for a given ticker and date range.
+
+    Args:
+        ticker (str): The stock ticker symbol.
+        date_from (str): Start date in 'DD MMM YYYY' format.
+        date_to (str): End date in 'DD MMM YYYY' format.
+
+    Returns:
+        list: A list of dictionaries containing stock data.
+    """
+    url = INVESTORS_LOUNGE_URL
+    headers, payload = _stock_data_request(ticker, date_from, date_to)
+
     try:
-        response = requests.post(url, headers=headers, json=payload, timeout=60)
+        response = get_client().post(url, endpoint='investors_lounge', headers=headers, json=payload)
         response.raise_for_status()
     except requests.exceptions.RequestException as e:
         logging.error(f"HTTP Request failed for ticker '{ticker}': {e}")
@@ -236,95 +270,156 @@ def get_stock_data(ticker, date_from, date_to):
 
 
 
-# # for partial ticker sync
-# async def async_get_stock_data(session, ticker, date_from, date_to):
-#     """
-#     Asynchronously fetches stock data from the Investors Lounge API for a given ticker and date range.
-
-#     Args:
-#         session (aiohttp.ClientSession): The aiohttp session to use for the request.
-#         ticker (str): The stock ticker symbol.
-#         date_from (str): Start date in 'DD MMM YYYY' format.
-#         date_to (str): End date in 'DD MMM YYYY' format.
-
-#     Returns:
-#         list: List of stock data dictionaries or None if failed.
-#     """
-#     url = "https://www.investorslounge.com/Default/SendPostRequest"
-
-#     headers = {
-#         "Accept": "*/*",
-#         "Accept-Language": "en-US,en;q=0.9,ps;q=0.8",
-#         "Content-Type": "application/json; charset=UTF-8",
-#         "Priority": "u=1, i",
-#         "Sec-CH-UA": "\"Google Chrome\";v=\"129\", \"Not=A?Brand\";v=\"8\", \"Chromium\";v=\"129\"",
-#         "Sec-CH-UA-Mobile": "?0",
-#         "Sec-CH-UA-Platform": "\"Windows\"",
-#         "Sec-Fetch-Dest": "empty",
-#         "Sec-Fetch-Mode": "cors",
-#         "Sec-Fetch-Site": "same-origin",
-#         "X-Requested-With": "XMLHttpRequest"
-#     }
-
-#     payload = {
-#         "url": "PriceHistory/GetPriceHistoryCompanyWise",
-#         "data": json.dumps({
-#             "company": ticker,
-#             "sort": "0",
-#             "DateFrom": date_from,
-#             "DateTo": date_to,
-#             "key": ""
-#         })
-#     }
-
-#     try:
-#         async with session.post(url, headers=headers, json=payload, timeout=60) as response:
-#             response.raise_for_status()
-#             data = await response.json()
-#             if not isinstance(data, list):
-#                 logging.error(f"Unexpected JSON structure for ticker '{ticker}': Expected a list of records.")
-#                 return None
-#             logging.info(f"Retrieved {len(data)} records for ticker '{ticker}'.")
-#             return data
-#     except aiohttp.ClientError as e:
-#         logging.error(f"HTTP Request failed for ticker '{ticker}': {e}")
-#         return None
-#     except json.JSONDecodeError:
-#         logging.error(f"Failed to parse JSON response for ticker '{ticker}'.")
-#         return None
-    
+# ---- Async Investors Lounge fetch engine (used by the full sync) ---- #
 
+class HostRateLimiter:
+    """
+    Spaces out request start times per host so that no single host receives more
+    than `rate_per_host` requests per second, regardless of how many requests are in flight.
+    """
 
+    def __init__(self, rate_per_host=8.0):
+        self.interval = 1.0 / rate_per_host if rate_per_host else 0.0
+        self._next_slot = {}
+        self._lock = asyncio.Lock()
 
+    async def wait(self, host):
+        """
+        Waits until the next request slot for the given host is available.
 
-# async def fetch_all_tickers_data(tickers, date_from, date_to):
-#     """
-#     Asynchronously fetches stock data for all tickers.
+        Args:
+            host (str): Host name the request is about to be sent to.
+        """
+        if not self.interval:
+            return
+
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
 
-#     Args:
-#         tickers (list): List of ticker symbols.
-#         date_from (str): Start date in 'DD MMM YYYY' format.
-#         date_to (str): End date in 'DD MMM YYYY' format.
+        delay = slot - now
+        if delay > 0:
+            await asyncio.sleep(delay)
 
-#     Returns:
-#         dict: Dictionary with ticker symbols as keys and their data as values.
-#     """
-#     async with aiohttp.ClientSession() as session:
-#         tasks = []
-#         for ticker in tickers:
-#             task = asyncio.ensure_future(async_get_stock_data(session, ticker, date_from, date_to))
-#             tasks.append((ticker, task))
 
-#         results = await asyncio.gather(*[task for _, task in tasks], return_exceptions=True)
+async def async_get_stock_data(session, ticker, date_from, date_to, rate_limiter=None, max_retries=3, backoff_base=1.0):
+    """
+    Asynchronously fetches stock data from the Investors Lounge API for a given ticker and date range.
+    Transient failures (connection errors, timeouts, HTTP 429 and 5xx) are retried with exponential backoff.
+
+    Args:
+        session (aiohttp.ClientSession): The shared aiohttp session to use for the request.
+        ticker (str): The stock ticker symbol.
+        date_from (str): Start date in 'DD MMM YYYY' format.
+        date_to (str): End date in 'DD MMM YYYY' format.
+        rate_limiter (HostRateLimiter, optional): Per-host rate limiter shared by all requests.
+        max_retries (int): Number of retries after the first attempt.
+        backoff_base (float): Base delay in seconds for the exponential backoff.
+
+    Returns:
+        list: List of stock data dictionaries or None if failed.
+    """
+    headers, payload = _stock_data_request(ticker, date_from, date_to)
+
+    for attempt in range(max_retries + 1):
+        try:
+            if rate_limiter:
+                await rate_limiter.wait(INVESTORS_LOUNGE_HOST)
+
+            async with session.post(INVESTORS_LOUNGE_URL, headers=headers, json=payload) as response:
+                if response.status == 429 or response.status >= 500:
+                    raise aiohttp.ClientResponseError(
+                        response.request_info, response.history,
+                        status=response.status, message=response.reason
+                    )
+                if response.status >= 400:
+                    logging.error(f"HTTP Request failed for ticker '{ticker}': status {response.status}")
+                    return None
+
+                data = await response.json(content_type=None)
+                if not isinstance(data, list):
+                    logging.error(f"Unexpected JSON structure for ticker '{ticker}': Expected a list of records.")
+                    return None
+                logging.info(f"Retrieved {len(data)} records for ticker '{ticker}'.")
+                return data
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if attempt == max_retries:
+                logging.error(f"HTTP Request failed for ticker '{ticker}' after {max_retries + 1} attempts: {e}")
+                return None
+            delay = backoff_base * (2 ** attempt) + random.uniform(0, backoff_base)
+            logging.warning(f"Request for ticker '{ticker}' failed ({e}). Retrying in {delay:.1f}s "
+                            f"(attempt {attempt + 1}/{max_retries}).")
+            await asyncio.sleep(delay)
+        except json.JSONDecodeError:
+            logging.error(f"Failed to parse JSON response for ticker '{ticker}'.")
+            return None
+
+    return None
 
-#         ticker_data = {}
-#         for (ticker, _), result in zip(tasks, results):
-#             if isinstance(result, Exception):
-#                 logging.error(f"Exception occurred while fetching data for ticker '{ticker}': {result}")
-#                 ticker_data[ticker] = None
-#             else:
-#                 ticker_data[ticker] = result
-#         return ticker_data
+
+async def stream_stock_data(ticker_windows, max_concurrency=16, rate_per_host=8.0, max_retries=3, request_timeout=60):
+    """
+    Fetches stock data for many tickers concurrently over one shared connection pool and
+    yields the results as they complete, so the caller can write them with a single writer.
+
+    Args:
+        ticker_windows (list): List of (ticker, date_from, date_to) tuples, dates in 'DD MMM YYYY' format.
+        max_concurrency (int): Maximum number of requests in flight at once.
+        rate_per_host (float): Maximum number of requests started per second per host.
+        max_retries (int): Number of retries per ticker for transient failures.
+        request_timeout (int): Total timeout in seconds for a single request.
+
+    Yields:
+        tuple: (ticker, data) where data is a list of stock data dictionaries or None if failed.
+    """
+    connector = aiohttp.TCPConnector(limit=max_concurrency, limit_per_host=max_concurrency, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=request_timeout)
+    rate_limiter = HostRateLimiter(rate_per_host)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+
+        async def fetch_one(ticker, date_from, date_to):
+            async with semaphore:
+                try:
+                    data = await async_get_stock_data(
+                        session, ticker, date_from, date_to,
+                        rate_limiter=rate_limiter, max_retries=max_retries
+                    )
+                except Exception as e:
+                    logging.error(f"Exception occurred while fetching data for ticker '{ticker}': {e}")
+                    data = None
+            return ticker, data
+
+        tasks = [asyncio.ensure_future(fetch_one(*window)) for window in ticker_windows]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+async def fetch_all_tickers_data(tickers, date_from, date_to, **kwargs):
+    """
+    Asynchronously fetches stock data for all tickers over the same date range.
+
+    Args:
+        tickers (list): List of ticker symbols.
+        date_from (str): Start date in 'DD MMM YYYY' format.
+        date_to (str): End date in 'DD MMM YYYY' format.
+        **kwargs: Passed through to stream_stock_data (max_concurrency, rate_per_host, ...).
+
+    Returns:
+        dict: Dictionary with ticker symbols as keys and their data as values.
+    """
+    ticker_windows = [(ticker, date_from, date_to) for ticker in tickers]
+    ticker_data = {}
+    async for ticker, data in stream_stock_data(ticker_windows, **kwargs):
+        ticker_data[ticker] = data
+    return ticker_data
 
 
 
@@ -342,40 +437,23 @@ def fetch_kse_market_watch():
         list: List of dictionaries containing market watch data.
     """
     try:
-        # URL for the market watch page
-        url = "https://dps.psx.com.pk/market-watch"
-        
-        # Fetch the page
-        response = requests.get(url, timeout=60)
+        # Fetch the market watch page
+        response = get_client().get(MARKET_WATCH_PATH, endpoint='market_watch', conditional=True)
         response.raise_for_status()
         
-        # Parse the HTML content
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Find the table containing market data
-        table = soup.find('table', {'class': 'tbl'})
-        
-        # Process each row of the table
-        processed_data = []
-        rows = table.find('tbody').find_all('tr')
-        for row in rows:
-            columns = row.find_all('td')
-            if len(columns) >= 11:  # Ensure there are enough columns
-                processed_item = {
-                    'SYMBOL': columns[0].text.strip(),
-                    'SECTOR': SECTOR_MAPPING.get(columns[1].text.strip(), 'Unknown'),
-                    'LISTED_IN': columns[2].text.strip(),
-                    'LDCP': float(columns[3].text.strip().replace(',', '')),
-                    'OPEN': float(columns[4].text.strip().replace(',', '')),
-                    'HIGH': float(columns[5].text.strip().replace(',', '')),
-                    'LOW': float(columns[6].text.strip().replace(',', '')),
-                    'CURRENT': float(columns[7].text.strip().replace(',', '')),
-                    'CHANGE': round(float(columns[8].text.strip().replace(',', '')), 2),  # Round to 2 decimal points
-                    'CHANGE (%)': round(float(columns[9].text.strip().replace('%', '').replace(',', '')), 2),  # Round to 2 decimal points
-                    'VOLUME': int(columns[10].text.strip().replace(',', '')),
-                }
-                processed_data.append(processed_item)
-        
+        # Parse the market data table and convert the price columns in bulk
+        _, rows = read_table_rows(response.text)
+        frame = rows_to_frame(rows, MARKET_WATCH_COLUMNS)  # Rows with fewer than 11 cells are skipped
+        frame = convert_numeric_columns(
+            frame,
+            float_columns=['LDCP', 'OPEN', 'HIGH', 'LOW', 'CURRENT', 'CHANGE', 'CHANGE (%)'],
+            int_columns=['VOLUME'],
+            label='market watch',
+        )
+        frame['SECTOR'] = frame['SECTOR'].map(SECTOR_MAPPING).fillna('Unknown')
+        frame[['CHANGE', 'CHANGE (%)']] = frame[['CHANGE', 'CHANGE (%)']].round(2)  # Round to 2 decimal points
+
+        processed_data = frame.to_dict(orient='records')
         logging.info(f"Fetched and processed {len(processed_data)} market watch records.")
         return processed_data
 
@@ -397,39 +475,17 @@ def get_defaulters_list():
     Returns:
         list: A list of dictionaries, each containing stock symbol, defaulting clause, and other details.
     """
-    url = "https://dps.psx.com.pk/listings-table/main/dc"
     try:
-        response = requests.get(url, timeout=60)
+        response = get_client().get(DEFAULTERS_PATH, endpoint='defaulters', conditional=True)
         response.raise_for_status()
     except requests.exceptions.RequestException as e:
         logging.error(f"HTTP Request failed for defaulters list: {e}")
         return None
 
-    soup = BeautifulSoup(response.text, 'html.parser')
-    table = soup.find('table', {'class': 'tbl'})
-
-    defaulters_data = []
-    for row in table.find('tbody').find_all('tr'):
-        cols = row.find_all('td')
-        symbol = cols[0].text.strip()
-        name = cols[1].text.strip()
-        sector = cols[2].text.strip()
-        defaulting_clause = cols[3].text.strip()
-        clearing_type = cols[4].text.strip()
-        shares = int(cols[5].text.strip().replace(',', ''))
-        free_float = int(cols[6].text.strip().replace(',', ''))
-        listed_in = [tag.text.strip() for tag in cols[7].find_all('div', class_='tag')]
-
-        defaulters_data.append({
-            'SYMBOL': symbol,
-            'NAME': name,
-            'SECTOR': sector,
-            'DEFAULTING CLAUSE': defaulting_clause,
-            'CLEARING TYPE': clearing_type,
-            'SHARES': shares,
-            'FREE FLOAT': free_float,
-            'LISTED_IN': listed_in,
-        })
+    _, rows = read_table_rows(response.text, tag_columns=[7])
+    frame = rows_to_frame(rows, DEFAULTERS_COLUMNS)
+    frame = convert_numeric_columns(frame, int_columns=['SHARES', 'FREE FLOAT'], label='defaulters')
+    defaulters_data = frame.to_dict(orient='records')
 
     logging.info(f"Retrieved {len(defaulters_data)} records from defaulters list.")
     return defaulters_data
@@ -507,37 +563,17 @@ def get_listings_data():
     Returns:
         list: A list of dictionaries, each containing stock symbol and other details.
     """
-    url = "https://dps.psx.com.pk/listings-table/main/nc"
     try:
-        response = requests.get(url, timeout=60)
+        response = get_client().get(LISTINGS_PATH, endpoint='listings', conditional=True)
         response.raise_for_status()
     except requests.exceptions.RequestException as e:
         logging.error(f"HTTP Request failed for listings data: {e}")
         return None
 
-    soup = BeautifulSoup(response.text, 'html.parser')
-    table = soup.find('table', {'class': 'tbl'})
-
-    listings_data = []
-    for row in table.find('tbody').find_all('tr'):
-        cols = row.find_all('td')
-        symbol = cols[0].text.strip()
-        name = cols[1].text.strip()
-        sector = cols[2].text.strip()
-        clearing_type = cols[3].text.strip()
-        shares = int(cols[4].text.strip().replace(',', ''))
-        free_float = int(cols[5].text.strip().replace(',', ''))
-        listed_in = [tag.text.strip() for tag in cols[6].find_all('div', class_='tag')]
-
-        listings_data.append({
-            'SYMBOL': symbol,
-            'NAME': name,
-            'SECTOR': sector,
-            'CLEARING TYPE': clearing_type,
-            'SHARES': shares,
-            'FREE FLOAT': free_float,
-            'LISTED_IN': listed_in,
-        })
+    _, rows = read_table_rows(response.text, tag_columns=[6])
+    frame = rows_to_frame(rows, LISTINGS_COLUMNS)
+    frame = convert_numeric_columns(frame, int_columns=['SHARES', 'FREE FLOAT'], label='listings')
+    listings_data = frame.to_dict(orient='records')
 
     logging.info(f"Retrieved {len(listings_data)} records from listings data.")
     return listings_data
@@ -549,106 +585,116 @@ def get_listings_data():
 
 
 
-def fetch_psx_transaction_data(date):
+# Section marker line separating broker-to-broker from institution-to-institution transactions
+OFF_MARKET_SECTION_MARKER = "CROSS ,TRANSACTIONS, BETWEEN, CLIENT TO ,CLIENT & FINANCIAL, INSTITUTIONS"
+OFF_MARKET_COLUMNS = ['Date', 'Settlement Date', 'Member Code', 'Symbol Code', 'Company', 'Turnover', 'Rate', 'Value']
+
+
+def fetch_psx_transaction_csv(date):
     """
-    Fetches and processes PSX broker-to-broker (B2B) and institution-to-institution (I2I) transactions for a given date.
+    Downloads the PSX off-market transactions CSV for a given date.
 
     Args:
         date (str): The date in 'YYYY-MM-DD' format.
 
     Returns:
-        DataFrame: A single pandas DataFrame containing both B2B and I2I transactions with an additional 'Transaction_Type' field.
+        str or None: The CSV text, or None if the download failed.
     """
-    # Step 1: Construct URL based on the date provided
-    # Step 1: Construct the URL using the provided date
-    url = BASE_OFF_MARKET_CSV_URL.format(date)
+    client = get_client()
+    url = client.url(BASE_OFF_MARKET_CSV_URL.format(date))
     logging.info(f"Fetching PSX CSV data from {url}")
-    
-    # Step 2: Fetch the CSV data from the URL
     try:
-        response = requests.get(url)
+        response = client.get(url, endpoint='omts_csv', cache_date=date)
         response.raise_for_status()
-        csv_data = response.text
         logging.info("CSV data fetched successfully.")
+        return response.text
     except requests.RequestException as e:
         logging.error(f"Failed to fetch CSV data: {e}")
         return None
 
-    # Step 3: Split the CSV data into 'Broker to Broker Transactions' and 'Institution to Institution Transactions' sections
-    split_marker = "CROSS ,TRANSACTIONS, BETWEEN, CLIENT TO ,CLIENT & FINANCIAL, INSTITUTIONS"
-    sections = csv_data.split(split_marker)
-    
-    if len(sections) != 2:
-        logging.error("Data format not recognized. Unable to split sections.")
-        return None
-    
-    broker_to_broker_section = sections[0].strip()
-    institution_to_institution_section = sections[1].strip()
 
-    # Define a helper function to parse each section
-    def parse_section(section, transaction_type):
-        """
-        Parses a CSV section and returns a cleaned DataFrame.
+def iter_psx_transaction_chunks(csv_data, chunksize=5000):
+    """
+    Parses the off-market transactions CSV in chunks, in a single pass over the text.
+    Rows before the section marker are broker-to-broker (B2B), rows after it institution-to-institution (I2I).
 
-        Args:
-            section (str): The CSV section as a string.
-            transaction_type (str): The type of transaction ('B2B' or 'I2I').
+    Args:
+        csv_data (str): The CSV text returned by fetch_psx_transaction_csv.
+        chunksize (int): Number of CSV lines parsed per chunk.
 
-        Returns:
-            DataFrame: Cleaned DataFrame with appropriate columns.
-        """
-        data = StringIO(section)
-        # Read all rows without skipping to handle multiple headers
-        df = pd.read_csv(data, names=columns, skip_blank_lines=True)
-        
-        # Remove any rows where 'Date' is not a valid date
-        df = df[pd.to_datetime(df['Date'], format='%d-%b-%y', errors='coerce').notnull()]
-        
-        # Convert 'Date' and 'Settlement Date' to 'YYYY-MM-DD' format
-        df['Date'] = pd.to_datetime(df['Date'], format='%d-%b-%y').dt.strftime('%Y-%m-%d')
-        df['Settlement Date'] = pd.to_datetime(df['Settlement Date'], format='%d-%b-%y').dt.strftime('%Y-%m-%d')
-        
-        # Add Transaction_Type
-        df['Transaction_Type'] = transaction_type
-        
-        return df
+    Yields:
+        DataFrame: Transactions with the OFF_MARKET_COLUMNS plus 'Transaction_Type', 'Buyer Code' and 'Seller Code'.
 
-    # Step 4: Clean and parse both sections
-    columns = ['Date', 'Settlement Date', 'Member Code', 'Symbol Code', 'Company', 'Turnover', 'Rate', 'Value']
-    broker_to_broker_df = parse_section(broker_to_broker_section, 'B2B')
-    institution_to_institution_df = parse_section(institution_to_institution_section, 'I2I')
+    Raises:
+        ValueError: If the section marker is not found (checked once the whole file has been read).
+    """
+    marker_date = OFF_MARKET_SECTION_MARKER.split(',')[0].strip()
+    in_i2i_section = False
+
+    for chunk in pd.read_csv(StringIO(csv_data), names=OFF_MARKET_COLUMNS, skip_blank_lines=True,
+                             dtype=str, chunksize=chunksize):
+        first_column = chunk['Date'].str.strip()
+
+        # Section of each row: everything from the marker line on is I2I
+        marker_rows = (first_column == marker_date).to_numpy().nonzero()[0]
+        section_i2i = pd.Series(in_i2i_section, index=chunk.index)
+        if len(marker_rows):
+            section_i2i.iloc[marker_rows[0]:] = True
+            in_i2i_section = True
+
+        # Keep only transaction rows (titles, headers and the marker have no valid date); parse each date once
+        dates = pd.to_datetime(first_column, format='%d-%b-%y', errors='coerce')
+        valid = dates.notna()
+        if not valid.any():
+            continue
+        chunk = chunk.loc[valid].copy()
+        section_i2i = section_i2i.loc[valid]
+
+        chunk['Date'] = dates.loc[valid].dt.strftime('%Y-%m-%d')
+        chunk['Settlement Date'] = pd.to_datetime(
+            chunk['Settlement Date'].str.strip(), format='%d-%b-%y', errors='coerce').dt.strftime('%Y-%m-%d')
+        chunk['Transaction_Type'] = section_i2i.map({False: 'B2B', True: 'I2I'})
+        for column in ('Turnover', 'Rate', 'Value'):
+            chunk[column] = clean_numeric_series(chunk[column])
+
+        # B2B member codes look like "MEMBER +XXX -YYY"; I2I rows carry one code used for both sides
+        member_code = chunk['Member Code'].astype('string')
+        b2b_codes = member_code.str.extract(r'MEMBER\s\+(\d+)\s\-(\d+)')
+        i2i_code = member_code.str.extract(r'(\d+)', expand=False)
+        chunk['Buyer Code'] = b2b_codes[0].where(~section_i2i, i2i_code).str.zfill(3)
+        chunk['Seller Code'] = b2b_codes[1].where(~section_i2i, i2i_code).str.zfill(3)
+        chunk[['Buyer Code', 'Seller Code']] = chunk[['Buyer Code', 'Seller Code']].astype(object).where(
+            chunk[['Buyer Code', 'Seller Code']].notna(), None)
+
+        yield chunk.dropna(subset=['Date', 'Symbol Code'])
+
+    if not in_i2i_section:
+        raise ValueError("Data format not recognized. Unable to split sections.")
 
-    # Step 5: Add member codes
-    def add_member_codes(df, is_broker_to_broker):
-        """
-        Adds buyer and seller codes for broker-to-broker transactions or treats member codes for institution-to-institution transactions.
-        """
-        if is_broker_to_broker:
-            # Assuming 'Member Code' format: "MEMBER +XXX -YYY"
-            df[['Buyer Code', 'Seller Code']] = df['Member Code'].str.extract(r'MEMBER\s\+(\d+)\s\-(\d+)')
-        else:
-            # For institution-to-institution transactions, Member Code is the same for both buyer and seller
-            df['Buyer Code'] = df['Member Code'].str.extract(r'(\d+)')
-            df['Seller Code'] = df['Member Code'].str.extract(r'(\d+)')
-        
-        # Ensure that the buyer and seller codes are properly padded with leading zeros
-        df['Buyer Code'] = df['Buyer Code'].apply(lambda x: str(x).zfill(3) if pd.notnull(x) else None)
-        df['Seller Code'] = df['Seller Code'].apply(lambda x: str(x).zfill(3) if pd.notnull(x) else None)
 
-        return df
+def fetch_psx_transaction_data(date):
+    """
+    Fetches and processes PSX broker-to-broker (B2B) and institution-to-institution (I2I) transactions for a given date.
 
-    # Apply member code extraction
-    broker_to_broker_df = add_member_codes(broker_to_broker_df, is_broker_to_broker=True)
-    institution_to_institution_df = add_member_codes(institution_to_institution_df, is_broker_to_broker=False)
+    Args:
+        date (str): The date in 'YYYY-MM-DD' format.
 
-    # Step 6: Combine the dataframes into a single one
-    combined_df = pd.concat([broker_to_broker_df, institution_to_institution_df], ignore_index=True)
+    Returns:
+        DataFrame: A single pandas DataFrame containing both B2B and I2I transactions with an additional 'Transaction_Type' field.
+    """
+    csv_data = fetch_psx_transaction_csv(date)
+    if csv_data is None:
+        return None
 
-    # Drop rows with missing essential fields
-    combined_df.dropna(subset=['Date', 'Symbol Code'], inplace=True)
+    try:
+        chunks = list(iter_psx_transaction_chunks(csv_data))
+    except ValueError as e:
+        logging.error(str(e))
+        return None
 
-    # Return the combined DataFrame
-    return combined_df
+    if not chunks:
+        return pd.DataFrame(columns=OFF_MARKET_COLUMNS + ['Transaction_Type', 'Buyer Code', 'Seller Code'])
+    return pd.concat(chunks, ignore_index=True)
 
 def fetch_psx_constituents(date=None):
     """
@@ -662,7 +708,6 @@ def fetch_psx_constituents(date=None):
     """
     try:
         from datetime import datetime
-        import requests
         import pandas as pd
         import logging
         from io import BytesIO
@@ -676,11 +721,12 @@ def fetch_psx_constituents(date=None):
             date = date_obj.strftime('%Y-%m-%d')
 
         # Construct the URL with the given date
-        url = PSX_CONSTITUENT_URL.format(date)
+        client = get_client()
+        url = client.url(PSX_CONSTITUENT_URL.format(date))
         logging.info(f"Fetching PSX data from {url}")
 
         # Download the Excel file
-        response = requests.get(url)
+        response = client.get(url, endpoint='constituents_xls', cache_date=date)
         response.raise_for_status()  # Ensure the request was successful
 
         # Load the Excel content into a Pandas DataFrame
@@ -728,7 +774,8 @@ def fetch_psx_historical(date):
     Returns:
         str: HTML content of the fetched data.
     """
-    url = "https://dps.psx.com.pk/historical"
+    client = get_client()
+    url = client.url(HISTORICAL_PATH)
 
     headers = {
         "accept": "text/html, */*; q=0.01",
@@ -751,7 +798,9 @@ def fetch_psx_historical(date):
 
     try:
         # Making the POST request
-        response = requests.post(url, headers=headers, data=data, timeout=60)
+        # Pages without data rows (not yet published, or an error page) are never cached
+        response = client.post(url, endpoint='historical', headers=headers, data=data, cache_date=date,
+                               cache_if=lambda r: bool(read_table_rows(r.text)[1]))
 
         # Logging the request details
         logger.info(f"POST Request to {url} with date={date}")
@@ -772,49 +821,28 @@ def fetch_psx_historical(date):
         logger.error(f"Request exception while fetching historical data for date: {date}, Error: {e}")
         raise Exception(f"Error: Unable to fetch data for date {date}, {e}")
 
-def parse_html_to_df(html_data):
+def parse_html_to_df(html_data, backend=None):
     """
     Parses HTML data into a pandas DataFrame.
 
     Args:
         html_data (str): HTML content containing the data table.
+        backend (str, optional): HTML parser backend ('lxml' or 'bs4'); see utils.html_parsing.
 
     Returns:
-        DataFrame: Parsed DataFrame with the data.
+        DataFrame: Parsed DataFrame with the data. A table without data rows gives an empty frame
+            with its header columns; no table at all gives a frame without columns.
     """
-    soup = BeautifulSoup(html_data, 'html.parser')
-
-    # Attempt to find the first table with class 'tbl'
-    table = soup.find('table', {'class': 'tbl'})
-
-    if not table:
-        logger.error("No table with class 'tbl' found in the HTML data.")
-        return pd.DataFrame()
-
-    rows = table.find_all('tr')
-
-    if not rows:
-        logger.error("No table rows found in the HTML data.")
-        return pd.DataFrame()
-
-    headers = [header.get_text().strip() for header in rows[0].find_all('th')]
+    # Header texts of the first header row and the text of every row with data cells
+    headers, table_data = read_table_rows(html_data, backend=backend)
 
     if not headers:
-        logger.error("No table headers found in the HTML data.")
+        logger.error("No table with class 'tbl' and a header row found in the HTML data.")
         return pd.DataFrame()
 
-    table_data = []
-
-    for row in rows[1:]:
-        cols = row.find_all('td')
-        if not cols:
-            continue  # Skip rows without columns
-        data = [col.get_text().strip() for col in cols]
-        table_data.append(data)
-
     if not table_data:
         logger.warning("No data rows found in the table.")
-        return pd.DataFrame()
+        return pd.DataFrame(columns=headers)
 
     df = pd.DataFrame(table_data, columns=headers)
 
@@ -1,6 +1,7 @@
 # utils/db_manager.py
 
 
+import argparse
 import sqlite3
 import logging
 from datetime import datetime, timedelta
@@ -12,12 +13,13 @@ from utils.data_fetcher import (
     get_listings_data,
     get_defaulters_list,
     fetch_psx_transaction_data,
+    fetch_psx_transaction_csv,
+    iter_psx_transaction_chunks,
     fetch_psx_constituents,
-    get_stock_data,
     parse_html_to_df,
-    fetch_psx_historical
-
-    
+    fetch_psx_historical,
+    stream_stock_data,
+    internet_trading_subscribers
 )
 
 # when running main.py
@@ -25,9 +27,16 @@ from utils.logger import setup_logging
 import asyncio
 import aiohttp
 
-from utils.helpers import get_last_working_day
+from utils.helpers import get_last_working_day, clean_ticker_frame, get_trading_days, last_completed_trading_day
+from utils.price_cache import refresh_price_cache
 
 import re
+import json
+import gzip
+import time
+import hashlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 
 
@@ -77,6 +86,7 @@ def initialize_db_and_tables(db_path='data/tick_data.db'):
         """)
 
         # Create the MarketWatch Table with updated 'listed_in' and without 'IS_INDEX'
+        # (schema migration 6 reshapes it to one row per symbol, with the indexes in IndexMembership)
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS MarketWatch (
                 SYMBOL TEXT,
@@ -152,6 +162,10 @@ def initialize_db_and_tables(db_path='data/tick_data.db'):
         conn.commit()
         logging.info(f"Database initialized with necessary tables at {db_path}.")
 
+        # Bring indexes and later schema changes up to date
+        migrate_schema(conn)
+        seed_broker_names(conn)
+
         # # Add Date and IS_INDEX columns if they don't exist
         # add_date_column(conn)
         # add_is_index_column(conn)
@@ -162,6 +176,642 @@ def initialize_db_and_tables(db_path='data/tick_data.db'):
         return None
 
 
+# ---- Schema migrations ---- #
+
+# Off-market flow rollups maintained from Transactions. `condition` is '1' to build them for the whole
+# table (migration) or 'Date = ?' to rebuild the date just ingested. Each Transactions row counts the
+# CSV lines merged into it (schema migration 7), so Trades sums them rather than counting rows.
+SYMBOL_FLOW_REBUILD = """
+    INSERT INTO TransactionSymbolDaily (Date, Symbol_Code, Transaction_Type, Trades, Turnover, Value)
+    SELECT Date, Symbol_Code, Transaction_Type, SUM(Trades), SUM(Turnover), SUM(Value)
+    FROM Transactions
+    WHERE {condition}
+    GROUP BY Date, Symbol_Code, Transaction_Type;
+"""
+
+# Every trade is a purchase for its buyer and a sale for its seller, so I2I trades net to zero
+BROKER_FLOW_REBUILD = """
+    INSERT INTO BrokerFlowDaily (Date, Symbol_Code, Broker_Code, Transaction_Type,
+                                 Bought_Volume, Sold_Volume, Bought_Value, Sold_Value)
+    SELECT Date, Symbol_Code, Broker_Code, Transaction_Type,
+           SUM(Bought_Volume), SUM(Sold_Volume), SUM(Bought_Value), SUM(Sold_Value)
+    FROM (
+        SELECT Date, Symbol_Code, Buyer_Code AS Broker_Code, Transaction_Type,
+               Turnover AS Bought_Volume, 0 AS Sold_Volume, Value AS Bought_Value, 0 AS Sold_Value
+        FROM Transactions
+        WHERE {condition} AND Buyer_Code IS NOT NULL
+        UNION ALL
+        SELECT Date, Symbol_Code, Seller_Code, Transaction_Type, 0, Turnover, 0, Value
+        FROM Transactions
+        WHERE {condition} AND Seller_Code IS NOT NULL
+    )
+    GROUP BY Date, Symbol_Code, Broker_Code, Transaction_Type;
+"""
+
+# MarketWatch keeps one row per symbol and IndexMembership one row per (symbol, index) (schema migration 6).
+MARKET_WATCH_SYMBOL_COLUMNS = (
+    'SYMBOL, ISIN, COMPANY, SECTOR, LDCP, OPEN, HIGH, LOW, CURRENT, CHANGE, "CHANGE (%)", VOLUME, DEFAULTER, '
+    'DEFAULTING_CLAUSE, PRICE, IDX_WT, FF_BASED_SHARES, FF_BASED_MCAP, ORD_SHARES, ORD_SHARES_MCAP, SYMBOL_SUFFIX'
+)
+
+# Collapse rows in the per-index layout (one row per symbol and LISTED_IN) into the normalized tables.
+# 'DEFAULT' placeholder rows are applied first, so a symbol's market data wins over them.
+MARKET_WATCH_COLLAPSE = """
+    INSERT OR REPLACE INTO {target} (""" + MARKET_WATCH_SYMBOL_COLUMNS + """)
+    SELECT """ + MARKET_WATCH_SYMBOL_COLUMNS + """ FROM {source}
+    WHERE SYMBOL IS NOT NULL
+    ORDER BY "LISTED_IN" = 'DEFAULT' DESC, rowid;
+"""
+INDEX_MEMBERSHIP_COLLAPSE = """
+    INSERT OR IGNORE INTO {target} (SYMBOL, INDEX_NAME)
+    SELECT SYMBOL, "LISTED_IN" FROM {source}
+    WHERE SYMBOL IS NOT NULL AND "LISTED_IN" IS NOT NULL AND "LISTED_IN" != ''
+    ORDER BY rowid;
+"""
+
+# Each migration is (version, description, statements). PRAGMA user_version records the last applied version.
+SCHEMA_MIGRATIONS = [
+    (1, "Secondary indexes for date lookups, index/sector filters and transaction searches", [
+        'CREATE INDEX IF NOT EXISTS idx_ticker_date ON Ticker(Date);',
+        'CREATE INDEX IF NOT EXISTS idx_marketwatch_listed_in_symbol ON MarketWatch(LISTED_IN, SYMBOL);',
+        'CREATE INDEX IF NOT EXISTS idx_marketwatch_sector ON MarketWatch(SECTOR);',
+        'CREATE INDEX IF NOT EXISTS idx_transactions_symbol_date ON Transactions(Symbol_Code, Date);',
+    ]),
+    (2, "IndicatorCache table for analysis results keyed on ticker, params hash and bar window", [
+        """
+        CREATE TABLE IF NOT EXISTS IndicatorCache (
+            Ticker TEXT NOT NULL,
+            ParamsHash TEXT NOT NULL,
+            FirstDate TEXT NOT NULL,
+            LastDate TEXT NOT NULL,
+            Summary TEXT NOT NULL,
+            Figure BLOB,
+            SizeBytes INTEGER NOT NULL,
+            LastAccess REAL NOT NULL,
+            PRIMARY KEY (Ticker, ParamsHash, FirstDate, LastDate)
+        );
+        """,
+        'CREATE INDEX IF NOT EXISTS idx_indicator_cache_last_access ON IndicatorCache(LastAccess);',
+    ]),
+    (3, "SyncLog checkpoint table recording the outcome of each date-wise sync per source", [
+        """
+        CREATE TABLE IF NOT EXISTS SyncLog (
+            Date TEXT NOT NULL,
+            Source TEXT NOT NULL,
+            Status TEXT NOT NULL,
+            Records INTEGER NOT NULL DEFAULT 0,
+            Message TEXT,
+            UpdatedAt TEXT NOT NULL,
+            PRIMARY KEY (Date, Source)
+        );
+        """,
+    ]),
+    (4, "SyncJobs table tracking background multi-date sync jobs", [
+        """
+        CREATE TABLE IF NOT EXISTS SyncJobs (
+            JobId INTEGER PRIMARY KEY AUTOINCREMENT,
+            Source TEXT NOT NULL,
+            Dates TEXT NOT NULL,
+            Status TEXT NOT NULL,
+            Total INTEGER NOT NULL DEFAULT 0,
+            Processed INTEGER NOT NULL DEFAULT 0,
+            Failed INTEGER NOT NULL DEFAULT 0,
+            Message TEXT,
+            CreatedAt TEXT NOT NULL,
+            UpdatedAt TEXT NOT NULL
+        );
+        """,
+    ]),
+    (5, "Off-market flow aggregates per symbol and per broker, and the Brokers name table", [
+        """
+        CREATE TABLE IF NOT EXISTS TransactionSymbolDaily (
+            Date TEXT NOT NULL,
+            Symbol_Code TEXT NOT NULL,
+            Transaction_Type TEXT NOT NULL,
+            Trades INTEGER NOT NULL,
+            Turnover INTEGER,
+            Value REAL,
+            PRIMARY KEY (Symbol_Code, Date, Transaction_Type)
+        );
+        """,
+        'CREATE INDEX IF NOT EXISTS idx_transaction_symbol_daily_date ON TransactionSymbolDaily(Date);',
+        """
+        CREATE TABLE IF NOT EXISTS BrokerFlowDaily (
+            Date TEXT NOT NULL,
+            Symbol_Code TEXT NOT NULL,
+            Broker_Code TEXT NOT NULL,
+            Transaction_Type TEXT NOT NULL,
+            Bought_Volume INTEGER NOT NULL DEFAULT 0,
+            Sold_Volume INTEGER NOT NULL DEFAULT 0,
+            Bought_Value REAL NOT NULL DEFAULT 0,
+            Sold_Value REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (Symbol_Code, Date, Broker_Code, Transaction_Type)
+        );
+        """,
+        'CREATE INDEX IF NOT EXISTS idx_broker_flow_daily_broker_date ON BrokerFlowDaily(Broker_Code, Date);',
+        'CREATE INDEX IF NOT EXISTS idx_broker_flow_daily_date ON BrokerFlowDaily(Date);',
+        """
+        CREATE TABLE IF NOT EXISTS Brokers (
+            Broker_Code TEXT PRIMARY KEY,
+            Name TEXT NOT NULL
+        );
+        """,
+        # TransactionSymbolDaily is filled by migration 7, once Transactions has its Trades column
+        BROKER_FLOW_REBUILD.format(condition='1'),
+    ]),
+    (6, "One MarketWatch row per symbol, IndexMembership table and MarketWatchByIndex compatibility view", [
+        """
+        CREATE TABLE IF NOT EXISTS IndexMembership (
+            SYMBOL TEXT NOT NULL,
+            INDEX_NAME TEXT NOT NULL,
+            PRIMARY KEY (SYMBOL, INDEX_NAME)
+        );
+        """,
+        'CREATE INDEX IF NOT EXISTS idx_index_membership_index_symbol ON IndexMembership(INDEX_NAME, SYMBOL);',
+        INDEX_MEMBERSHIP_COLLAPSE.format(target='IndexMembership', source='MarketWatch'),
+        """
+        CREATE TABLE MarketWatchSymbols (
+            SYMBOL TEXT PRIMARY KEY,
+            ISIN TEXT,
+            COMPANY TEXT,
+            SECTOR TEXT,
+            LDCP REAL,
+            OPEN REAL,
+            HIGH REAL,
+            LOW REAL,
+            CURRENT REAL,
+            CHANGE REAL,
+            "CHANGE (%)" REAL,
+            VOLUME INTEGER,
+            DEFAULTER BOOLEAN DEFAULT FALSE,
+            DEFAULTING_CLAUSE TEXT,
+            PRICE REAL,
+            IDX_WT REAL,
+            FF_BASED_SHARES INTEGER,
+            FF_BASED_MCAP REAL,
+            ORD_SHARES INTEGER,
+            ORD_SHARES_MCAP REAL,
+            SYMBOL_SUFFIX TEXT,
+            Date TEXT
+        );
+        """,
+        MARKET_WATCH_COLLAPSE.format(target='MarketWatchSymbols', source='MarketWatch'),
+        'DROP TABLE MarketWatch;',
+        'ALTER TABLE MarketWatchSymbols RENAME TO MarketWatch;',
+        'CREATE INDEX IF NOT EXISTS idx_marketwatch_sector ON MarketWatch(SECTOR);',
+        'CREATE INDEX IF NOT EXISTS idx_marketwatch_change_pct ON MarketWatch("CHANGE (%)");',
+        # The previous per-index layout, for readers that still expect a LISTED_IN column
+        """
+        CREATE VIEW IF NOT EXISTS MarketWatchByIndex AS
+        SELECT m.SYMBOL, m.ISIN, m.COMPANY, m.SECTOR, i.INDEX_NAME AS "LISTED_IN", m.LDCP, m.OPEN, m.HIGH,
+               m.LOW, m.CURRENT, m.CHANGE, m."CHANGE (%)", m.VOLUME, m.DEFAULTER, m.DEFAULTING_CLAUSE, m.PRICE,
+               m.IDX_WT, m.FF_BASED_SHARES, m.FF_BASED_MCAP, m.ORD_SHARES, m.ORD_SHARES_MCAP, m.SYMBOL_SUFFIX, m.Date
+        FROM IndexMembership i
+        JOIN MarketWatch m ON m.SYMBOL = i.SYMBOL;
+        """,
+    ]),
+    (7, "Transactions count the CSV lines merged into each row, and TransactionSymbolDaily sums them", [
+        # Rows stored before this migration are counted as one line each
+        'ALTER TABLE Transactions ADD COLUMN Trades INTEGER NOT NULL DEFAULT 1;',
+        'DELETE FROM TransactionSymbolDaily;',
+        SYMBOL_FLOW_REBUILD.format(condition='1'),
+    ]),
+]
+
+
+def get_schema_version(conn):
+    """
+    Returns the schema version stored in PRAGMA user_version.
+    """
+    return conn.execute("PRAGMA user_version;").fetchone()[0]
+
+
+def migrate_schema(conn):
+    """
+    Applies pending schema migrations in order, each one in its own transaction.
+
+    Args:
+        conn (sqlite3.Connection): SQLite database connection.
+
+    Returns:
+        int: The schema version after migrating.
+    """
+    current_version = get_schema_version(conn)
+    for version, description, statements in SCHEMA_MIGRATIONS:
+        if version <= current_version:
+            continue
+        try:
+            with conn:
+                for statement in statements:
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {int(version)};")
+            current_version = version
+            logging.info(f"Applied schema migration {version}: {description}.")
+        except sqlite3.Error as e:
+            logging.error(f"Schema migration {version} failed: {e}")
+            break
+    return current_version
+
+
+# ---- Query plan diagnostics ---- #
+
+# Queries issued by this module (and the analysis pages) with representative parameters,
+# checked with EXPLAIN QUERY PLAN by explain_queries() / `python -m utils.db_manager --explain`.
+DIAGNOSTIC_QUERIES = {
+    'is_data_present_for_date': (
+        'SELECT EXISTS(SELECT 1 FROM Ticker WHERE Date = ? LIMIT 1);', ('2024-01-02',)),
+    'get_latest_dates_by_ticker': (
+        'SELECT Ticker, MAX(Date) FROM Ticker GROUP BY Ticker;', ()),
+    'get_unique_tickers_from_db': (
+        'SELECT DISTINCT Ticker FROM Ticker;', ()),
+    'ticker_history': (
+        'SELECT * FROM Ticker WHERE Ticker = ? AND Date BETWEEN ? AND ? ORDER BY Date ASC;',
+        ('OGDC', '2024-01-01', '2024-12-31')),
+    'load_ticker_days': (
+        'SELECT Day, Open, High, Low, Close, Change, "Change (%)", Volume FROM TickerDays '
+        'WHERE Ticker = ? AND Day BETWEEN ? AND ? ORDER BY Day;', ('OGDC', 19723, 20088)),
+    'delete_ticker_history': (
+        'DELETE FROM Ticker WHERE Ticker = ?;', ('OGDC',)),
+    'get_tickers_by_index': (
+        'SELECT SYMBOL FROM IndexMembership WHERE INDEX_NAME = ?;', ('KSE100',)),
+    'get_all_indexes': (
+        'SELECT DISTINCT INDEX_NAME FROM IndexMembership;', ()),
+    'get_tickers_by_group': (
+        'SELECT SYMBOL FROM MarketWatch ORDER BY "CHANGE (%)" DESC LIMIT 50;', ()),
+    'get_corporate_action_symbols': (
+        "SELECT SYMBOL, SYMBOL_SUFFIX FROM MarketWatch WHERE SYMBOL_SUFFIX IN ('XD', 'XB', 'XR');", ()),
+    'tickers_by_sector': (
+        'SELECT SYMBOL FROM MarketWatch WHERE SECTOR = ?;', ('COMMERCIAL BANKS',)),
+    'listed_in_for_symbol': (
+        'SELECT INDEX_NAME FROM IndexMembership WHERE SYMBOL = ? ORDER BY rowid LIMIT 1;', ('OGDC',)),
+    'search_marketwatch_by_symbol': (
+        'SELECT SYMBOL FROM MarketWatch WHERE SYMBOL LIKE ? LIMIT 50;', ('%OG%',)),
+    'display_marketwatch_data': (
+        'SELECT * FROM MarketWatch ORDER BY Date DESC LIMIT 10;', ()),
+    'transactions_for_date': (
+        'SELECT * FROM Transactions WHERE Date = ?;', ('2024-01-02',)),
+    'transactions_between_dates': (
+        'SELECT * FROM Transactions WHERE Date BETWEEN ? AND ?;', ('2024-01-01', '2024-01-31')),
+    'transactions_for_symbol': (
+        'SELECT * FROM Transactions WHERE Symbol_Code = ? AND Date BETWEEN ? AND ?;',
+        ('OGDC', '2024-01-01', '2024-01-31')),
+    'get_top_net_buyers': (
+        'SELECT Broker_Code, SUM(Bought_Value) - SUM(Sold_Value) AS Net_Value FROM BrokerFlowDaily '
+        'WHERE Symbol_Code = ? AND Date BETWEEN ? AND ? GROUP BY Broker_Code ORDER BY Net_Value DESC LIMIT 10;',
+        ('LUCK', '2024-01-01', '2024-03-31')),
+    'get_symbol_transaction_summary': (
+        'SELECT Symbol_Code, SUM(Value) FROM TransactionSymbolDaily WHERE Date BETWEEN ? AND ? GROUP BY Symbol_Code;',
+        ('2024-01-01', '2024-03-31')),
+    'get_portfolio_by_name': (
+        'SELECT Portfolio_ID, Name, Stocks FROM Portfolios WHERE Name = ?;', ('Default',)),
+    'search_psx_constituents_by_symbol': (
+        'SELECT * FROM PSXConstituents WHERE SYMBOL = ?', ('OGDC',)),
+}
+
+
+def explain_queries(conn, queries=None):
+    """
+    Runs EXPLAIN QUERY PLAN for the diagnostic queries and logs plans that fall back to a full table scan.
+
+    Args:
+        conn (sqlite3.Connection): SQLite database connection.
+        queries (dict, optional): Mapping of name -> (sql, params). Defaults to DIAGNOSTIC_QUERIES.
+
+    Returns:
+        dict: Mapping of query name -> list of plan detail strings (or the error message).
+    """
+    queries = queries or DIAGNOSTIC_QUERIES
+    plans = {}
+    for name, (query, params) in queries.items():
+        try:
+            rows = conn.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+            plans[name] = [row[-1] for row in rows]
+        except sqlite3.OperationalError as e:
+            if 'no such table' in str(e):
+                # Optional tables (e.g. TickerDays) are only present once enabled
+                plans[name] = [f"SKIPPED: {e}"]
+                continue
+            plans[name] = [f"ERROR: {e}"]
+            logging.error(f"Could not explain query '{name}': {e}")
+            continue
+        except sqlite3.Error as e:
+            plans[name] = [f"ERROR: {e}"]
+            logging.error(f"Could not explain query '{name}': {e}")
+            continue
+
+        full_scans = [detail for detail in plans[name] if detail.startswith('SCAN ') and ' USING ' not in detail and 'CONSTANT ROW' not in detail]
+        if full_scans:
+            logging.warning(f"⚠️ Query '{name}' performs a full table scan: {full_scans}")
+    return plans
+
+
+# ---- Compact Ticker layout (TickerDays) ---- #
+
+# Optional layout: dates as integer days since 1970-01-01, clustered on (Ticker, Day) without a rowid.
+# Created by migrate_to_compact_layout(); once present, every Ticker write is mirrored into it.
+COMPACT_TICKER_TABLE = 'TickerDays'
+
+# julianday() of 1970-01-01, used to turn 'YYYY-MM-DD' into epoch days inside SQLite
+UNIX_EPOCH_JULIAN_DAY = 2440587.5
+
+TICKER_DAYS_UPSERT = f"""
+    INSERT OR REPLACE INTO {COMPACT_TICKER_TABLE}
+    (Ticker, Day, Open, High, Low, Close, Change, "Change (%)", Volume)
+    VALUES (?, CAST(julianday(?) - {UNIX_EPOCH_JULIAN_DAY} AS INTEGER), ?, ?, ?, ?, ?, ?, ?);
+"""
+
+
+def to_epoch_day(date_value):
+    """
+    Converts a date (string, datetime or date) into the number of days since 1970-01-01.
+    """
+    return int((pd.Timestamp(date_value).normalize() - pd.Timestamp('1970-01-01')).days)
+
+
+def compact_layout_enabled(conn):
+    """
+    Returns True if the TickerDays table exists.
+    """
+    cursor = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?;", (COMPACT_TICKER_TABLE,)
+    )
+    return cursor.fetchone() is not None
+
+
+def migrate_to_compact_layout(conn):
+    """
+    Creates the TickerDays table and copies the Ticker table into it in one transaction.
+    Running it again re-copies the Ticker table, so it can also be used to resynchronize the two.
+
+    Args:
+        conn (sqlite3.Connection): SQLite database connection.
+
+    Returns:
+        int: Number of rows in TickerDays after the migration, or -1 on failure.
+    """
+    try:
+        with conn:
+            conn.execute(f"""
+                CREATE TABLE IF NOT EXISTS {COMPACT_TICKER_TABLE} (
+                    Ticker TEXT NOT NULL,
+                    Day INTEGER NOT NULL,
+                    Open REAL,
+                    High REAL,
+                    Low REAL,
+                    Close REAL,
+                    Change REAL,
+                    "Change (%)" REAL,
+                    Volume INTEGER,
+                    PRIMARY KEY (Ticker, Day)
+                ) WITHOUT ROWID;
+            """)
+            conn.execute(f"""
+                INSERT OR REPLACE INTO {COMPACT_TICKER_TABLE}
+                (Ticker, Day, Open, High, Low, Close, Change, "Change (%)", Volume)
+                SELECT Ticker, CAST(julianday(Date) - {UNIX_EPOCH_JULIAN_DAY} AS INTEGER),
+                       Open, High, Low, Close, Change, "Change (%)", Volume
+                FROM Ticker
+                WHERE julianday(Date) IS NOT NULL;
+            """)
+        row_count = conn.execute(f"SELECT COUNT(*) FROM {COMPACT_TICKER_TABLE};").fetchone()[0]
+        logging.info(f"✅ Compact ticker layout ready with {row_count} rows.")
+        return row_count
+    except sqlite3.Error as e:
+        logging.error(f"Migration to the compact ticker layout failed: {e}")
+        return -1
+
+
+def load_ticker_days(conn, ticker, start=None, end=None):
+    """
+    Reads one ticker's history from TickerDays, without parsing date strings.
+
+    Args:
+        conn (sqlite3.Connection): SQLite database connection.
+        ticker (str): The ticker symbol.
+        start (str or datetime, optional): First date to include.
+        end (str or datetime, optional): Last date to include.
+
+    Returns:
+        pd.DataFrame: Open/High/Low/Close/Change/Change (%)/Volume indexed by a DatetimeIndex named 'Date'.
+    """
+    start_day = to_epoch_day(start) if start is not None else -2**31
+    end_day = to_epoch_day(end) if end is not None else 2**31
+    query = f"""
+        SELECT Day, Open, High, Low, Close, Change, "Change (%)", Volume
+        FROM {COMPACT_TICKER_TABLE}
+        WHERE Ticker = ? AND Day BETWEEN ? AND ?
+        ORDER BY Day;
+    """
+    try:
+        rows = conn.execute(query, (ticker, start_day, end_day)).fetchall()
+    except sqlite3.Error as e:
+        logging.error(f"Error loading compact history for ticker '{ticker}': {e}")
+        return pd.DataFrame()
+
+    df = pd.DataFrame(rows, columns=['Day', 'Open', 'High', 'Low', 'Close', 'Change', 'Change (%)', 'Volume'])
+    days = df.pop('Day').to_numpy(dtype='int64')
+    df.index = pd.DatetimeIndex(pd.to_datetime(days, unit='D'), name='Date').astype('datetime64[ns]')
+    return df
+
+
+# ---- Batch loading of ticker history ---- #
+
+TICKER_DTYPES = {
+    "Open": "float64",
+    "High": "float64",
+    "Low": "float64",
+    "Close": "float64",
+    "Change": "float64",
+    "Change (%)": "float64",
+}
+
+
+def load_tickers_data(conn, tickers, start=None, end=None, as_dict=True):
+    """
+    Loads the history of many tickers with one query, joining against a temporary table of the
+    requested symbols. Reads from TickerDays when the compact layout is enabled.
+    The CROSS JOIN keeps the symbol list as the outer loop, so each ticker is a primary-key range
+    search rather than a scan of the Date index.
+
+    Args:
+        conn (sqlite3.Connection): SQLite database connection.
+        tickers (iterable): Ticker symbols to load.
+        start (str or datetime, optional): First date to include.
+        end (str or datetime, optional): Last date to include.
+        as_dict (bool): If True, return a dict of per-ticker frames indexed by Date;
+            otherwise a single long-format frame with Ticker and Date columns.
+
+    Returns:
+        dict or pd.DataFrame: Loaded data (tickers without rows are left out of the dict).
+    """
+    tickers = list(dict.fromkeys(t.upper() for t in tickers))
+    columns = ['Ticker', 'Date'] + list(TICKER_DTYPES) + ['Volume']
+    empty = pd.DataFrame(columns=columns)
+    if not tickers:
+        return {} if as_dict else empty
+
+    compact = compact_layout_enabled(conn)
+    if compact:
+        query = f"""
+            SELECT t.Ticker, t.Day, t.Open, t.High, t.Low, t.Close, t.Change, t."Change (%)", t.Volume
+            FROM temp.LoadTickers s
+            CROSS JOIN {COMPACT_TICKER_TABLE} t ON t.Ticker = s.Ticker
+            WHERE t.Day BETWEEN ? AND ?
+            ORDER BY s.Ticker, t.Day;
+        """
+        params = (to_epoch_day(start) if start is not None else -2**31,
+                  to_epoch_day(end) if end is not None else 2**31)
+    else:
+        query = """
+            SELECT t.Ticker, t.Date, t.Open, t.High, t.Low, t.Close, t.Change, t."Change (%)", t.Volume
+            FROM temp.LoadTickers s
+            CROSS JOIN Ticker t ON t.Ticker = s.Ticker
+            WHERE t.Date BETWEEN ? AND ?
+            ORDER BY s.Ticker, t.Date;
+        """
+        params = (pd.Timestamp(start).strftime('%Y-%m-%d') if start is not None else '0000-00-00',
+                  pd.Timestamp(end).strftime('%Y-%m-%d') if end is not None else '9999-99-99')
+
+    try:
+        with conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS LoadTickers (Ticker TEXT PRIMARY KEY);")
+            conn.execute("DELETE FROM temp.LoadTickers;")
+            conn.executemany("INSERT INTO temp.LoadTickers (Ticker) VALUES (?);", [(t,) for t in tickers])
+        rows = conn.execute(query, params).fetchall()
+    except sqlite3.Error as e:
+        logging.error(f"Error loading data for {len(tickers)} tickers: {e}")
+        return {} if as_dict else empty
+
+    df = pd.DataFrame(rows, columns=columns)
+    if compact:
+        df['Date'] = pd.to_datetime(df['Date'].to_numpy(dtype='int64'), unit='D').astype('datetime64[ns]')
+    else:
+        df['Date'] = pd.to_datetime(df['Date'], format='%Y-%m-%d')
+
+    # Dtypes are set once for the whole batch; Volume stays float only if it has gaps
+    df = df.astype(TICKER_DTYPES)
+    df['Volume'] = pd.to_numeric(df['Volume'])
+    if not df['Volume'].isna().any():
+        df['Volume'] = df['Volume'].astype('int64')
+
+    logging.info(f"Loaded {len(df)} rows for {df['Ticker'].nunique()} of {len(tickers)} tickers in one query.")
+    if not as_dict:
+        return df
+    return {ticker: group.drop(columns='Ticker').set_index('Date')
+            for ticker, group in df.groupby('Ticker', sort=False)}
+
+
+# ---- Indicator result cache ---- #
+
+# Default bounds of the IndicatorCache table; least recently used entries are evicted first
+INDICATOR_CACHE_MAX_ENTRIES = 2000
+INDICATOR_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+
+def indicator_params_hash(params):
+    """
+    Returns a stable hash of an analysis parameter dictionary (independent of key order).
+    """
+    encoded = json.dumps(params, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def get_cached_indicator(conn, ticker, params_hash, first_date, last_date, with_figure=True):
+    """
+    Looks up a stored indicator result and marks it as recently used.
+
+    Args:
+        conn (sqlite3.Connection): SQLite database connection.
+        ticker (str): The ticker symbol.
+        params_hash (str): Hash from indicator_params_hash().
+        first_date (str): First bar date of the analysed window ('YYYY-MM-DD').
+        last_date (str): Last bar date of the analysed window ('YYYY-MM-DD').
+        with_figure (bool): Also return the stored figure JSON, if any.
+
+    Returns:
+        dict or None: {'summary': dict, 'figure': str or None} on a hit, None on a miss.
+    """
+    key = (ticker, params_hash, first_date, last_date)
+    try:
+        row = conn.execute(f"""
+            SELECT Summary, {'Figure' if with_figure else 'NULL'} FROM IndicatorCache
+            WHERE Ticker = ? AND ParamsHash = ? AND FirstDate = ? AND LastDate = ?;
+        """, key).fetchone()
+        if row is None:
+            return None
+        with conn:
+            conn.execute("""
+                UPDATE IndicatorCache SET LastAccess = ?
+                WHERE Ticker = ? AND ParamsHash = ? AND FirstDate = ? AND LastDate = ?;
+            """, (time.time(),) + key)
+    except sqlite3.Error as e:
+        logging.error(f"Error reading indicator cache for ticker '{ticker}': {e}")
+        return None
+
+    figure = gzip.decompress(row[1]).decode('utf-8') if row[1] is not None else None
+    return {'summary': json.loads(row[0]), 'figure': figure}
+
+
+def store_cached_indicator(conn, ticker, params_hash, first_date, last_date, summary, figure_json=None,
+                           max_entries=INDICATOR_CACHE_MAX_ENTRIES, max_bytes=INDICATOR_CACHE_MAX_BYTES):
+    """
+    Stores an indicator result (summary and optional figure JSON) and evicts least recently used entries.
+
+    Args:
+        conn (sqlite3.Connection): SQLite database connection.
+        ticker (str): The ticker symbol.
+        params_hash (str): Hash from indicator_params_hash().
+        first_date (str): First bar date of the analysed window ('YYYY-MM-DD').
+        last_date (str): Last bar date of the analysed window ('YYYY-MM-DD').
+        summary (dict): Indicator summary.
+        figure_json (str, optional): Serialized Plotly figure (fig.to_json()).
+        max_entries (int): Maximum number of cached results.
+        max_bytes (int): Maximum total size of the cached summaries and figures.
+
+    Returns:
+        bool: True if the result was stored, False otherwise.
+    """
+    summary_json = json.dumps(summary, default=float)
+    figure_blob = gzip.compress(figure_json.encode('utf-8')) if figure_json is not None else None
+    size_bytes = len(summary_json) + (len(figure_blob) if figure_blob is not None else 0)
+
+    try:
+        with conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO IndicatorCache
+                (Ticker, ParamsHash, FirstDate, LastDate, Summary, Figure, SizeBytes, LastAccess)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?);
+            """, (ticker, params_hash, first_date, last_date, summary_json, figure_blob, size_bytes, time.time()))
+
+            # LRU eviction: keep the most recently used entries within both bounds
+            conn.execute("""
+                DELETE FROM IndicatorCache WHERE rowid IN (
+                    SELECT rowid FROM (
+                        SELECT rowid,
+                               ROW_NUMBER() OVER (ORDER BY LastAccess DESC) AS position,
+                               SUM(SizeBytes) OVER (ORDER BY LastAccess DESC) AS running_bytes
+                        FROM IndicatorCache
+                    )
+                    WHERE position > ? OR running_bytes > ?
+                );
+            """, (max_entries, max_bytes))
+        return True
+    except sqlite3.Error as e:
+        logging.error(f"Error storing indicator cache for ticker '{ticker}': {e}")
+        return False
+
+
+def invalidate_indicator_cache(conn, tickers=None):
+    """
+    Deletes cached indicator results for the given tickers (all tickers if None).
+    Runs inside the caller's transaction when there is one.
+    """
+    if tickers is None:
+        conn.execute("DELETE FROM IndicatorCache;")
+    else:
+        conn.executemany("DELETE FROM IndicatorCache WHERE Ticker = ?;", [(t,) for t in tickers])
+
+
 def clean_date(date_str):
     """
     Cleans and formats the input date string to 'YYYY-MM-DD'.
@@ -218,8 +868,11 @@ def clean_ticker_table(conn):
     try:
         cursor = conn.cursor()
         
-        # Delete all rows from the Ticker table
+        # Delete all rows from the Ticker table (and its compact mirror, if enabled)
         cursor.execute("DELETE FROM Ticker;")
+        if compact_layout_enabled(conn):
+            cursor.execute(f"DELETE FROM {COMPACT_TICKER_TABLE};")
+        invalidate_indicator_cache(conn)
         
         # Reset the auto-incrementing primary key, if needed (in case there's an AUTOINCREMENT column)
         # Not necessary here since the primary key in the Ticker table is a composite key (Ticker, Date)
@@ -235,207 +888,164 @@ def clean_ticker_table(conn):
 
 
 
-def insert_market_watch_data_into_db(conn, date_to, batch_size=100):
+MARKET_WATCH_TABLE_COLUMNS = [
+    'SYMBOL', 'ISIN', 'COMPANY', 'SECTOR', 'LISTED_IN', 'LDCP', 'OPEN', 'HIGH', 'LOW', 'CURRENT',
+    'CHANGE', 'CHANGE (%)', 'VOLUME', 'DEFAULTER', 'DEFAULTING_CLAUSE', 'PRICE', 'IDX_WT',
+    'FF_BASED_SHARES', 'FF_BASED_MCAP', 'ORD_SHARES', 'ORD_SHARES_MCAP', 'SYMBOL_SUFFIX'
+]
+
+
+def fetch_market_watch_sources(date_to):
     """
-    Deletes old market watch data and inserts or updates new market watch data into the SQLite database in batches.
-    Fetches data for the specified date and ensures the database has the latest information, including defaulter status
-    and PSX constituent information.
+    Downloads the market watch, defaulters and PSX constituents concurrently, so the wall-clock
+    time is that of the slowest download.
 
     Args:
-        conn (sqlite3.Connection): SQLite database connection.
-        date_to (str): Date for synchronization in 'dd MMM yyyy' format (e.g., '15 Sep 2024').
-        batch_size (int): Number of records to insert per batch.
+        date_to (str): Constituents date in 'dd MMM yyyy' format (e.g., '15 Sep 2024').
 
     Returns:
-        tuple: (success, records_added) where 'success' is a boolean and 'records_added' is the count of records inserted/updated.
+        tuple: (market_data, defaulters_data, psx_data) as returned by the fetchers.
     """
-    try:
-        cursor = conn.cursor()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=3) as executor:
+        market_future = executor.submit(fetch_kse_market_watch)
+        defaulters_future = executor.submit(get_defaulters_list)
+        psx_future = executor.submit(fetch_psx_constituents, date_to)
+        market_data = market_future.result()
+        defaulters_data = defaulters_future.result()
+        psx_data = psx_future.result()
+    logger.info(f"Fetched market watch sources in {time.perf_counter() - start:.2f}s.")
+    return market_data, defaulters_data, psx_data
 
-        # ---- Step 1: Delete Previous Data ---- #
-        logger.info("Deleting previous MarketWatch data...")
-        cursor.execute("DELETE FROM MarketWatch")
-        conn.commit()
-        logger.info("Previous MarketWatch data deleted.")
 
-        # ---- Step 2: Fetch Market Watch Data ---- #
-        logger.info("Fetching market watch data...")
-        market_data = fetch_kse_market_watch()
+MARKET_WATCH_PRICE_FIELDS = ['LDCP', 'OPEN', 'HIGH', 'LOW', 'CURRENT', 'CHANGE', 'CHANGE (%)']
+PSX_CONSTITUENT_FIELDS = ['ISIN', 'COMPANY', 'PRICE', 'IDX_WT', 'FF_BASED_SHARES', 'FF_BASED_MCAP',
+                          'ORD_SHARES', 'ORD_SHARES_MCAP']
 
-        if not market_data:
-            logger.error("Failed to fetch market watch data.")
-            return False, 0
-        else:
-            logger.info(f"Fetched {len(market_data)} market watch records.")
 
-        # ---- Step 3: Fetch Defaulters Data ---- #
-        logger.info("Fetching defaulters data...")
-        defaulters_data = get_defaulters_list()
-        defaulters_dict = {d['SYMBOL']: d for d in defaulters_data} if defaulters_data else {}
+def build_market_watch_rows(market_data, defaulters_data, psx_data):
+    """
+    Builds MarketWatch rows (in MARKET_WATCH_TABLE_COLUMNS order) from the fetched sources in one pass.
+    Defaulters and PSX constituents are indexed by symbol up front, so each market record is joined with
+    O(1) lookups and fanned out to one row per index in LISTED_IN; defaulters missing from the market data
+    get a 'DEFAULT' row.
 
-        # ---- Step 4: Fetch PSX Constituents Data ---- #
-        logger.info(f"Fetching PSX constituents data for date: {date_to}...")
-        psx_data = fetch_psx_constituents(date_to)  # Pass the correctly formatted date
-        psx_constituents_dict = {d['SYMBOL']: d for d in psx_data} if psx_data else {}
-        logger.info(f"Number of PSX constituent records fetched: {len(psx_data)}")
+    Args:
+        market_data (list): Market watch records from fetch_kse_market_watch.
+        defaulters_data (list or None): Defaulter records from get_defaulters_list.
+        psx_data (list): PSX constituent records from fetch_psx_constituents.
 
-        if not psx_constituents_dict:
-            logger.warning("No PSX constituents data fetched. Fields like ISIN and COMPANY will be NULL.")
+    Returns:
+        list: Row tuples ready for insertion.
+    """
+    # Keyed indexes of the joined sources; later records win, as with dict(...) before
+    clauses = {d['SYMBOL']: d.get('DEFAULTING CLAUSE') for d in defaulters_data or []}
+    constituents = {d['SYMBOL']: tuple(d.get(field) for field in PSX_CONSTITUENT_FIELDS) for d in psx_data or []}
+    no_constituent = (None,) * len(PSX_CONSTITUENT_FIELDS)
+    market_symbols = set()
+
+    data_to_insert = []
+    for record in market_data:
+        symbol_original = record.get('SYMBOL')
+        market_symbols.add(symbol_original)
+        try:
+            prices = tuple(round(float(record[field]), 2) if record.get(field) else None
+                           for field in MARKET_WATCH_PRICE_FIELDS)
+            volume = int(record['VOLUME']) if record.get('VOLUME') else None
+        except (ValueError, KeyError) as e:
+            logger.error(f"Error parsing market watch data record: {record}, error: {e}")
+            continue
+
+        base_symbol, suffix = strip_symbol_suffix(symbol_original)
+        clause = clauses.get(base_symbol)
+        isin, company, *constituent = constituents.get(base_symbol, no_constituent)
+        values = (*prices, volume, clause is not None, clause, *constituent, suffix)
+
+        # Split the "LISTED_IN" field by comma and insert one row per index
+        listed_in = record.get('LISTED_IN')
+        for index in (listed_in.split(',') if listed_in else []):
+            data_to_insert.append((base_symbol, isin, company, record.get('SECTOR'), index.strip(), *values))
+
+    # Insert a new row for defaulters not in market data (their constituent data is keyed by the full symbol)
+    for symbol, clause in clauses.items():
+        if symbol not in market_symbols:
+            base_symbol, suffix = strip_symbol_suffix(symbol)
+            isin, company, *constituent = constituents.get(symbol, no_constituent)
+            data_to_insert.append((base_symbol, isin, company, None, "DEFAULT", *(None,) * 8, True, clause,
+                                   *constituent, suffix))
+
+    return data_to_insert
+
+
+def replace_market_watch(conn, rows):
+    """
+    Loads rows into a staging table and swaps them into MarketWatch and IndexMembership in a single
+    transaction, so readers see either the previous snapshot or the new one, never an empty or partial table.
 
-        # ---- Step 5: Merge and Prepare Data for Insertion ---- #
-        data_to_insert = []
-        for record in market_data:
-            try:
-                symbol_original = record.get('SYMBOL')
-                base_symbol, suffix = strip_symbol_suffix(symbol_original)
-
-                sector = record.get('SECTOR')
-                listed_in = record.get('LISTED_IN')  # This will be split into multiple rows
-                ldcp = round(float(record['LDCP']), 2) if record.get('LDCP') else None
-                open_ = round(float(record['OPEN']), 2) if record.get('OPEN') else None
-                high = round(float(record['HIGH']), 2) if record.get('HIGH') else None
-                low = round(float(record['LOW']), 2) if record.get('LOW') else None
-                current = round(float(record['CURRENT']), 2) if record.get('CURRENT') else None
-                change = round(float(record['CHANGE']), 2) if record.get('CHANGE') else None
-                change_p = round(float(record['CHANGE (%)']), 2) if record.get('CHANGE (%)') else None
-                volume = int(record['VOLUME']) if record.get('VOLUME') else None
-                defaulter = defaulters_dict.get(base_symbol, {}).get('DEFAULTING CLAUSE', None) is not None
-                defaulting_clause = defaulters_dict.get(base_symbol, {}).get('DEFAULTING CLAUSE', None)
-
-                # Fetch PSX constituent data
-                psx_record = psx_constituents_dict.get(base_symbol, {})
-                isin = psx_record.get('ISIN')  # New field
-                company = psx_record.get('COMPANY')  # New field
-                price = psx_record.get('PRICE')
-                idx_wt = psx_record.get('IDX_WT')
-                ff_based_shares = psx_record.get('FF_BASED_SHARES')
-                ff_based_mcap = psx_record.get('FF_BASED_MCAP')
-                ord_shares = psx_record.get('ORD_SHARES')
-                ord_shares_mcap = psx_record.get('ORD_SHARES_MCAP')
-
-                # Split the "LISTED_IN" field by comma and insert one row per index
-                listed_indices = listed_in.split(',') if listed_in else []
-                for index in listed_indices:
-                    index = index.strip()  # Remove any extra whitespace
-                    data_to_insert.append((
-                        base_symbol,          # SYMBOL without suffix
-                        isin,                 # ISIN
-                        company,              # COMPANY
-                        sector,
-                        index,
-                        ldcp, 
-                        open_, 
-                        high, 
-                        low, 
-                        current, 
-                        change, 
-                        change_p, 
-                        volume, 
-                        defaulter, 
-                        defaulting_clause, 
-                        price, 
-                        idx_wt, 
-                        ff_based_shares, 
-                        ff_based_mcap, 
-                        ord_shares, 
-                        ord_shares_mcap, 
-                        suffix                # SYMBOL_SUFFIX
-                    ))
-
-            except (ValueError, KeyError) as e:
-                logger.error(f"Error parsing market watch data record: {record}, error: {e}")
-                continue
+    Args:
+        conn (sqlite3.Connection): SQLite database connection.
+        rows (list): Row tuples in MARKET_WATCH_TABLE_COLUMNS order (one per symbol and index).
 
-        # ---- Step 6: Insert a New Row for Defaulters Not in Market Data ---- #
-        if defaulters_data:
-            for symbol, defaulter in defaulters_dict.items():
-                if symbol not in [record.get('SYMBOL') for record in market_data]:
-                    # Fetch PSX constituent data
-                    psx_record = psx_constituents_dict.get(symbol, {})
-                    isin = psx_record.get('ISIN')  # ISIN from PSXConstituents
-                    company = psx_record.get('COMPANY')  # COMPANY from PSXConstituents
-                    price = psx_record.get('PRICE')
-                    idx_wt = psx_record.get('IDX_WT')
-                    ff_based_shares = psx_record.get('FF_BASED_SHARES')
-                    ff_based_mcap = psx_record.get('FF_BASED_MCAP')
-                    ord_shares = psx_record.get('ORD_SHARES')
-                    ord_shares_mcap = psx_record.get('ORD_SHARES_MCAP')
-
-                    base_symbol, suffix = strip_symbol_suffix(symbol)
-
-                    data_to_insert.append((
-                        base_symbol,          # SYMBOL without suffix
-                        isin,                 # ISIN
-                        company,              # COMPANY
-                        None,                 # SECTOR (unknown)
-                        "DEFAULT",            # LISTED_IN
-                        None,                 # LDCP
-                        None,                 # OPEN
-                        None,                 # HIGH
-                        None,                 # LOW
-                        None,                 # CURRENT
-                        None,                 # CHANGE
-                        None,                 # CHANGE (%)
-                        None,                 # VOLUME
-                        True,                 # DEFAULTER
-                        defaulter['DEFAULTING CLAUSE'] if defaulter else None,  # DEFAULTING_CLAUSE
-                        price,
-                        idx_wt,
-                        ff_based_shares,
-                        ff_based_mcap,
-                        ord_shares,
-                        ord_shares_mcap,
-                        suffix                # SYMBOL_SUFFIX
-                    ))
-
-        # ---- Step 7: Insert Data in Batches ---- #
-        insert_query = """
-            INSERT INTO MarketWatch 
-            (SYMBOL, ISIN, COMPANY, SECTOR, "LISTED_IN", LDCP, OPEN, HIGH, LOW, CURRENT, 
-                CHANGE, "CHANGE (%)", VOLUME, DEFAULTER, DEFAULTING_CLAUSE, PRICE, IDX_WT, 
-                FF_BASED_SHARES, FF_BASED_MCAP, ORD_SHARES, ORD_SHARES_MCAP, SYMBOL_SUFFIX)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(SYMBOL, SECTOR, "LISTED_IN") 
-            DO UPDATE SET 
-                ISIN = excluded.ISIN,
-                COMPANY = excluded.COMPANY,
-                LDCP = excluded.LDCP,
-                OPEN = excluded.OPEN,
-                HIGH = excluded.HIGH,
-                LOW = excluded.LOW,
-                CURRENT = excluded.CURRENT,
-                CHANGE = excluded.CHANGE,
-                "CHANGE (%)" = excluded."CHANGE (%)",
-                VOLUME = excluded.VOLUME,
-                DEFAULTER = excluded.DEFAULTER,
-                DEFAULTING_CLAUSE = excluded.DEFAULTING_CLAUSE,
-                PRICE = excluded.PRICE,
-                IDX_WT = excluded.IDX_WT,
-                FF_BASED_SHARES = excluded.FF_BASED_SHARES,
-                FF_BASED_MCAP = excluded.FF_BASED_MCAP,
-                ORD_SHARES = excluded.ORD_SHARES,
-                ORD_SHARES_MCAP = excluded.ORD_SHARES_MCAP,
-                SYMBOL_SUFFIX = excluded.SYMBOL_SUFFIX;
-        """
+    Returns:
+        int: Number of symbols written to MarketWatch.
+    """
+    columns = ', '.join(f'"{column}"' for column in MARKET_WATCH_TABLE_COLUMNS)
+    try:
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS temp.MarketWatchStaging;")
+            conn.execute("CREATE TEMP TABLE MarketWatchStaging AS SELECT * FROM main.MarketWatchByIndex WHERE 0;")
+            conn.executemany(
+                f"INSERT INTO temp.MarketWatchStaging ({columns}) "
+                f"VALUES ({', '.join('?' for _ in MARKET_WATCH_TABLE_COLUMNS)});",
+                rows,
+            )
+            # Swap: one MarketWatch row per symbol and one IndexMembership row per listed index
+            conn.execute("DELETE FROM main.IndexMembership;")
+            conn.execute("DELETE FROM main.MarketWatch;")
+            conn.execute(INDEX_MEMBERSHIP_COLLAPSE.format(target='main.IndexMembership', source='temp.MarketWatchStaging'))
+            conn.execute(MARKET_WATCH_COLLAPSE.format(target='main.MarketWatch', source='temp.MarketWatchStaging'))
+            symbols = conn.execute("SELECT COUNT(*) FROM main.MarketWatch;").fetchone()[0]
+    finally:
+        conn.execute("DROP TABLE IF EXISTS temp.MarketWatchStaging;")
+    return symbols
+
+
+def insert_market_watch_data_into_db(conn, date_to):
+    """
+    Refreshes the MarketWatch table with the latest market watch data, including defaulter status
+    and PSX constituent information. The three sources are downloaded concurrently and the table
+    is replaced atomically; if the market watch download fails, the previous data is kept.
 
-        total_records = len(data_to_insert)
-        records_added = 0
+    Args:
+        conn (sqlite3.Connection): SQLite database connection.
+        date_to (str): Date for synchronization in 'dd MMM yyyy' format (e.g., '15 Sep 2024').
 
-        for i in range(0, total_records, batch_size):
-            batch = data_to_insert[i:i + batch_size]
-            logger.info(f"Inserting batch {i // batch_size + 1} with {len(batch)} records.")
-            cursor.executemany(insert_query, batch)
-            conn.commit()
+    Returns:
+        tuple: (success, records_added) where 'success' is a boolean and 'records_added' is the number of symbols written.
+    """
+    try:
+        # ---- Step 1: Fetch Market Watch, Defaulters and PSX Constituents Concurrently ---- #
+        logger.info(f"Fetching market watch, defaulters and PSX constituents data for date: {date_to}...")
+        market_data, defaulters_data, psx_data = fetch_market_watch_sources(date_to)
 
-            # Count records added or updated
-            records_added += cursor.rowcount
+        if not market_data:
+            logger.error("Failed to fetch market watch data. Keeping the previous MarketWatch data.")
+            return False, 0
+        logger.info(f"Fetched {len(market_data)} market watch records.")
+        logger.info(f"Number of PSX constituent records fetched: {len(psx_data)}")
+        if not psx_data:
+            logger.warning("No PSX constituents data fetched. Fields like ISIN and COMPANY will be NULL.")
 
-        logger.info(f"Successfully inserted/updated {records_added} records for MarketWatch data.")
+        # ---- Step 2: Merge and Prepare Data for Insertion ---- #
+        data_to_insert = build_market_watch_rows(market_data, defaulters_data, psx_data)
 
-        # ---- Step 8: Confirm Database Status ---- #
-        cursor.execute("SELECT COUNT(*) FROM MarketWatch;")
-        total_in_db = cursor.fetchone()[0]
-        logger.info(f"Total records in the MarketWatch table: {total_in_db}")
+        # ---- Step 3: Stage and Swap In One Transaction ---- #
+        records_added = replace_market_watch(conn, data_to_insert)
+        logger.info(f"Successfully replaced MarketWatch data with {records_added} symbols.")
+
+        # ---- Step 4: Confirm Database Status ---- #
+        total_in_db = conn.execute("SELECT COUNT(*) FROM IndexMembership;").fetchone()[0]
+        logger.info(f"Total index memberships in the IndexMembership table: {total_in_db}")
 
         return True, records_added
 
@@ -516,132 +1126,170 @@ def clean_numeric(value, field_name):
     
 
 # full and partial sync insert_ticker
-# Ensure the clean_date function is imported or defined in the same script
-# from utils.date_utils import clean_date
+
+# Column order of the Ticker table, shared by every writer
+TICKER_COLUMNS = ['Ticker', 'Date', 'Open', 'High', 'Low', 'Close', 'Change', 'Change (%)', 'Volume']
 
 
-def insert_ticker_data_into_db(conn, data, ticker, batch_size=100):
+def prepare_ticker_frame(data, ticker):
     """
-    Inserts the list of stock data into the SQLite database in batches.
-    Returns a tuple of (success, records_added, errors).
+    Cleans raw stock data records column-wise and converts them into Ticker table rows.
 
     Args:
-        conn (sqlite3.Connection): SQLite database connection.
         data (list): List of dictionaries containing ticker data.
         ticker (str): The ticker symbol.
-        batch_size (int): Number of records to insert per batch.
 
     Returns:
-        tuple: (success (bool), records_added (int), errors (list))
+        tuple: (frame (pd.DataFrame with the TICKER_COLUMNS columns), errors (list))
     """
     logger = logging.getLogger(__name__)
+    try:
+        frame, errors = clean_ticker_frame(data, ticker=ticker)
+    except Exception as e:
+        error_msg = f"Unexpected error while preparing records for ticker '{ticker}': {e}."
+        logger.exception(error_msg)
+        return pd.DataFrame(columns=TICKER_COLUMNS), [error_msg]
+
+    for error_msg in errors:
+        logger.error(error_msg)
+    logger.debug(f"Prepared {len(frame)}/{len(data)} records for ticker '{ticker}'.")
+    return frame, errors
+
+
+def apply_bulk_write_pragmas(conn):
+    """
+    Tunes the connection for bulk writes: WAL journaling lets readers keep working during
+    the write, and synchronous=NORMAL skips the per-commit fsync of the default FULL mode.
+    PRAGMA journal_mode cannot change inside a transaction, so this is a no-op if one is open.
+
+    Args:
+        conn (sqlite3.Connection): SQLite database connection.
+    """
+    if conn.in_transaction:
+        return
+    try:
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA synchronous=NORMAL;")
+    except sqlite3.Error as e:
+        logging.warning(f"Could not apply bulk write PRAGMAs: {e}")
+
+
+def _ticker_rows_from_frame(df):
+    """
+    Converts a DataFrame with the Ticker table columns into a list of plain Python tuples
+    (numpy scalars and missing values are not accepted by sqlite3).
+    """
+    frame = df[TICKER_COLUMNS].copy()
+    if pd.api.types.is_datetime64_any_dtype(frame['Date']):
+        frame['Date'] = frame['Date'].dt.strftime('%Y-%m-%d')
+    frame = frame.astype(object).where(frame.notna(), None)
+    return list(frame.itertuples(index=False, name=None))
+
+
+def bulk_upsert_ticker_data(conn, rows, replace_tickers=None, checkpoint=None):
+    """
+    Writes many tickers' rows into the Ticker table with one executemany inside a single transaction.
+
+    Args:
+        conn (sqlite3.Connection): SQLite database connection.
+        rows (pd.DataFrame or iterable): A DataFrame with the TICKER_COLUMNS columns, or an iterable
+            of tuples in TICKER_COLUMNS order.
+        replace_tickers (set, optional): Tickers whose stored history is deleted in the same
+            transaction before the new rows are written.
+        checkpoint (tuple, optional): (date, source) marked done in SyncLog in the same transaction,
+            so a checkpoint never exists without its rows. Without rows the date is only marked empty
+            if it is older than the last completed trading day; a later date may still be published.
+
+    Returns:
+        tuple: (success (bool), counts (dict of ticker -> rows written), errors (list))
+    """
     errors = []
-    records_added = 0
+    if isinstance(rows, pd.DataFrame):
+        rows = _ticker_rows_from_frame(rows)
+    else:
+        rows = list(rows)
+
+    if not rows:
+        if checkpoint and checkpoint[0] < last_completed_trading_day():
+            record_sync_status(conn, checkpoint[0], checkpoint[1], SYNC_STATUS_EMPTY)
+        return True, {}, errors
+
+    insert_query = """
+        INSERT OR REPLACE INTO Ticker 
+        (Ticker, Date, Open, High, Low, Close, Change, "Change (%)", Volume) 
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);
+    """
+
+    apply_bulk_write_pragmas(conn)
+    mirror_compact = compact_layout_enabled(conn)
     try:
-        cursor = conn.cursor()
-        insert_query = """
-            INSERT OR REPLACE INTO Ticker 
-            (Ticker, Date, Open, High, Low, Close, Change, "Change (%)", Volume) 
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);
-        """
+        with conn:
+            cursor = conn.cursor()
+            if replace_tickers:
+                cursor.executemany("DELETE FROM Ticker WHERE Ticker = ?;", [(t,) for t in replace_tickers])
+                if mirror_compact:
+                    cursor.executemany(f"DELETE FROM {COMPACT_TICKER_TABLE} WHERE Ticker = ?;",
+                                       [(t,) for t in replace_tickers])
+                logging.info(f"Cleared stored history for {len(replace_tickers)} tickers before full refetch.")
+            cursor.executemany(insert_query, rows)
+            if mirror_compact:
+                cursor.executemany(TICKER_DAYS_UPSERT, rows)
+            # Cached indicator results of the touched tickers no longer match their bars
+            invalidate_indicator_cache(conn, {row[0] for row in rows})
+            if checkpoint:
+                cursor.execute(SYNC_LOG_UPSERT, (checkpoint[0], checkpoint[1], SYNC_STATUS_DONE, len(rows), None,
+                                                 datetime.now().isoformat(timespec='seconds')))
+    except sqlite3.Error as e:
+        error_msg = f"Database insertion error during bulk upsert of {len(rows)} records: {e}."
+        logging.error(error_msg)
+        errors.append(error_msg)
+        return False, {}, errors
 
-        # Prepare data for insertion
-        data_to_insert = []
-        for idx, record in enumerate(data, start=1):
-            try:
-                logger.debug(f"Processing record {idx}/{len(data)} for ticker '{ticker}': {record}")
+    counts = dict(Counter(row[0] for row in rows))
+    logging.info(f"Bulk upserted {len(rows)} records for {len(counts)} tickers in one transaction.")
+    return True, counts, errors
 
-                # Clean and validate the date field
-                date_str = record.get('Date') or record.get('Date_')
-                formatted_date = clean_date(date_str)
-                if not formatted_date:
-                    error_msg = f"Data Preparation: Invalid or missing 'Date' field in record {idx} for ticker '{ticker}'. Skipping record."
-                    logger.error(error_msg)
-                    errors.append(error_msg)
-                    continue
 
-                # Log the formatted date
-                logger.debug(f"orignal date for record {idx}: {date_str}")
-
-                logger.debug(f"Formatted Date for record {idx}: {formatted_date}")
-
-                # Extract and clean numeric fields
-                open_ = clean_numeric(record.get('Open'), 'Open')
-                high = clean_numeric(record.get('High'), 'High')
-                low = clean_numeric(record.get('Low'), 'Low')
-                close = clean_numeric(record.get('Close'), 'Close')
-                change = clean_numeric(record.get('Change'), 'Change')
-                change_p = clean_numeric(record.get('Change (%)') or record.get('ChangeP'), 'Change (%)')
-                volume = clean_numeric(record.get('Volume'), 'Volume')
-
-                # Convert fields to appropriate data types
-                try:
-                    open_val = float(open_) if open_ is not None else None
-                    high_val = float(high) if high is not None else None
-                    low_val = float(low) if low is not None else None
-                    close_val = float(close) if close is not None else None
-                    change_val = float(change) if change is not None else None
-                    change_p_val = round(float(change_p), 2) if change_p is not None else None  # Round to two decimal places
-                    volume_val = int(float(volume)) if volume is not None else None  # Ensure volume is an integer
-                except (ValueError, TypeError) as ve:
-                    error_msg = (
-                        f"Data Preparation: Data type conversion error for ticker '{ticker}' on date '{formatted_date}'. "
-                        f"Failed to convert fields. Details: {ve}. "
-                        f"Cleaned data - Open: '{open_}', High: '{high}', Low: '{low}', "
-                        f"Close: '{close}', Change: '{change}', ChangeP: '{change_p}', Volume: '{volume}'. "
-                        f"Original record: {record}."
-                    )
-                    logger.error(error_msg)
-                    errors.append(error_msg)
-                    continue
+def insert_ticker_data_into_db(conn, data, ticker, batch_size=100, replace_existing=False):
+    """
+    Inserts the list of stock data for one ticker into the SQLite database.
+    Returns a tuple of (success, records_added, errors).
 
-                # Append the cleaned and converted data as a tuple
-                data_to_insert.append((ticker, formatted_date, open_val, high_val, low_val, close_val, change_val, change_p_val, volume_val))
+    Args:
+        conn (sqlite3.Connection): SQLite database connection.
+        data (list): List of dictionaries containing ticker data.
+        ticker (str): The ticker symbol.
+        batch_size (int): Kept for compatibility; all records are now written in one transaction.
+        replace_existing (bool): If True, the ticker's stored history is deleted before the new
+            records are written (only when there is at least one valid record to write).
 
-            except Exception as e:
-                error_msg = f"Unexpected error while processing record {idx} for ticker '{ticker}': {e}. Skipping record."
-                logger.exception(error_msg)
-                errors.append(error_msg)
-                continue
+    Returns:
+        tuple: (success (bool), records_added (int), errors (list))
+    """
+    logger = logging.getLogger(__name__)
+    try:
+        data_to_insert, errors = prepare_ticker_frame(data, ticker)
 
-        if not data_to_insert:
+        if data_to_insert.empty:
             warning_msg = f"No valid records to insert for ticker '{ticker}'."
             logger.warning(warning_msg)
             errors.append(warning_msg)
-            return False, records_added, errors
-
-        # Log the prepared data to be inserted
-        logger.debug(f"Data to be inserted for ticker '{ticker}': {data_to_insert}")
-
-        # Insert data in batches
-        total_records = len(data_to_insert)
-        logger.info(f"Starting database insertion for ticker '{ticker}' with {total_records} records.")
-
-        for i in range(0, total_records, batch_size):
-            batch = data_to_insert[i:i + batch_size]
-            try:
-                cursor.executemany(insert_query, batch)
-                conn.commit()
-                records_added += len(batch)  # Since executemany doesn't reliably return rowcount
-                logger.info(f"Inserted batch {i // batch_size + 1}: {len(batch)} records for ticker '{ticker}'.")
-            except sqlite3.Error as e:
-                error_msg = f"Database insertion error for ticker '{ticker}' in batch {i // batch_size + 1}: {e}."
-                logger.error(error_msg)
-                errors.append(error_msg)
-                continue
+            return False, 0, errors
 
-            # Log the first three inserted records in the first batch for verification
-            if i == 0 and len(batch) >= 3:
-                logger.debug(f"First 3 records inserted for ticker '{ticker}': {batch[:3]}")
+        logger.info(f"Starting database insertion for ticker '{ticker}' with {len(data_to_insert)} records.")
+        success, counts, insert_errors = bulk_upsert_ticker_data(
+            conn, data_to_insert, replace_tickers={ticker} if replace_existing else None
+        )
+        errors.extend(insert_errors)
+        records_added = counts.get(ticker, 0)
 
         logger.info(f"Successfully inserted/updated {records_added} records for ticker '{ticker}'.")
-        return True, records_added, errors
+        return success, records_added, errors
 
     except Exception as e:
         error_msg = f"Failed to insert data into database for ticker '{ticker}': {e}"
         logger.exception(error_msg)
-        errors.append(error_msg)
-        return False, records_added, errors
+        return False, 0, [error_msg]
 
 
 def partial_sync_ticker(conn: sqlite3.Connection, date_to: str, 
@@ -722,133 +1370,273 @@ def partial_sync_ticker(conn: sqlite3.Connection, date_to: str,
                 log_container.error(error_msg)
             return summary
 
-        # No 'Date' column in fetched data; set it manually
-        df['Date'] = date_to  # Assign the synchronization date to all records
+        # Step 4: Clean every column at once; the date comes from the request, not the page
+        frame, rejected = clean_ticker_frame(df, date=date_to)
+        errors = [f"Partial Sync: {message}" for message in rejected]
+        for error_msg in errors[:20]:
+            logger.error(error_msg)
+            if log_container:
+                log_container.error(error_msg)
+        if len(errors) > 20:
+            logger.error(f"Partial Sync: {len(errors) - 20} more rejected records not shown.")
 
-        # Rename 'SYMBOL' to 'Symbol_Code' to match database schema
-        df.rename(columns={'SYMBOL': 'Symbol_Code'}, inplace=True)
+        # A symbol listed twice keeps its first row, as the per-symbol lookup did
+        frame = frame.drop_duplicates(subset=['Ticker', 'Date'], keep='first')
+        logger.info(f"Prepared {len(frame)} of {len(df)} records for date: {date_to}")
+        if log_container:
+            log_container.write(f"🔍 Found {len(frame)} valid records to update.")
 
-        # Extract unique symbols from the fetched data
-        unique_symbols = df['Symbol_Code'].unique()
-        logger.info(f"Unique symbols fetched: {unique_symbols}")
+        # Step 5: Write the whole market for the date (and its SyncLog checkpoint) in one transaction
+        records_added_total = 0
+        checkpoint = (clean_date(date_to), SYNC_SOURCE_PSX_HISTORICAL) if not frame.empty else None
+        success, counts, insert_errors = bulk_upsert_ticker_data(conn, frame, checkpoint=checkpoint)
+        errors.extend(insert_errors)
+        if success:
+            records_added_total = sum(counts.values())
+            logger.info(f"Synchronized {len(counts)} tickers for {date_to} in one transaction.")
+            if log_container:
+                log_container.success(f"Synchronized {len(counts)} tickers. Records added: {records_added_total}")
+            refresh_price_cache(conn, tickers=counts.keys(), force_tickers=counts.keys())
+        if progress_bar and status_text:
+            progress_bar.progress(1.0)
+            status_text.text(f"Synchronizing tickers: {len(counts)}/{len(df)} completed.")
+        
+        # Final summary
+        summary['records_added'] = records_added_total
+        summary['errors'] = errors
+        summary['success'] = len(errors) == 0
+        summary['message'] = f"Partial synchronization completed with {records_added_total} records added."
+        if errors:
+            summary['message'] += f" Encountered errors with {len(errors)} tickers."
+        
+        logger.info(summary['message'])
         if log_container:
-            log_container.write(f"🔍 Found {len(unique_symbols)} unique symbols to update.")
+            log_container.write(summary['message'])
+        
+    except Exception as e:
+        error_msg = f"Unexpected error during partial synchronization: {e}"
+        summary['errors'].append(error_msg)
+        logger.exception(error_msg)
+        if log_container:
+            log_container.error(error_msg)
+    
+    return summary
+
+
+# ---- Sync checkpoints (SyncLog) and date-wise historical backfill ---- #
+
+SYNC_SOURCE_PSX_HISTORICAL = 'psx_historical'
+
+SYNC_STATUS_DONE = 'done'
+SYNC_STATUS_EMPTY = 'empty'  # A settled date the source had no rows for (e.g. an unscheduled market holiday)
+SYNC_STATUS_FAILED = 'failed'
+
+SYNC_LOG_UPSERT = """
+    INSERT OR REPLACE INTO SyncLog (Date, Source, Status, Records, Message, UpdatedAt)
+    VALUES (?, ?, ?, ?, ?, ?);
+"""
+
+
+def record_sync_status(conn, date, source, status, records=0, message=None):
+    """
+    Records the outcome of syncing one date from one source in the SyncLog table.
+
+    Args:
+        conn (sqlite3.Connection): SQLite database connection.
+        date (str): The synchronized date in 'YYYY-MM-DD' format.
+        source (str): Source identifier (e.g. SYNC_SOURCE_PSX_HISTORICAL).
+        status (str): One of SYNC_STATUS_DONE, SYNC_STATUS_EMPTY or SYNC_STATUS_FAILED.
+        records (int): Number of rows written.
+        message (str, optional): Error or informational message.
+    """
+    try:
+        with conn:
+            conn.execute(SYNC_LOG_UPSERT, (date, source, status, records, message,
+                                           datetime.now().isoformat(timespec='seconds')))
+    except sqlite3.Error as e:
+        logging.error(f"Failed to record sync status for {source} on {date}: {e}")
+
+
+def get_completed_sync_dates(conn, source, start_date=None, end_date=None):
+    """
+    Returns the dates a source has already been synchronized for (status done or empty).
+
+    Args:
+        conn (sqlite3.Connection): SQLite database connection.
+        source (str): Source identifier.
+        start_date (str, optional): First date to consider ('YYYY-MM-DD').
+        end_date (str, optional): Last date to consider ('YYYY-MM-DD').
+
+    Returns:
+        set: Dates in 'YYYY-MM-DD' format.
+    """
+    query = "SELECT Date FROM SyncLog WHERE Source = ? AND Status IN (?, ?)"
+    params = [source, SYNC_STATUS_DONE, SYNC_STATUS_EMPTY]
+    if start_date:
+        query += " AND Date >= ?"
+        params.append(start_date)
+    if end_date:
+        query += " AND Date <= ?"
+        params.append(end_date)
+    try:
+        return {row[0] for row in conn.execute(query, params)}
+    except sqlite3.Error as e:
+        logging.error(f"Failed to read SyncLog for {source}: {e}")
+        return set()
+
+
+def fetch_historical_day(date):
+    """
+    Fetches and cleans one date's PSX historical page. Runs in worker threads; it never touches the database.
+
+    Args:
+        date (str): Trading date in 'YYYY-MM-DD' format.
+
+    Returns:
+        tuple: (frame (pd.DataFrame of Ticker rows, empty if the table had no rows), rejected messages (list))
+
+    Raises:
+        ValueError: If the page has no data table (an error page rather than a day without trading).
+    """
+    html_data = fetch_psx_historical(date)
+    df = parse_html_to_df(html_data) if html_data else pd.DataFrame()
+    if df.columns.empty:
+        raise ValueError(f"the historical page for {date} has no data table")
+    if df.empty:
+        return pd.DataFrame(columns=TICKER_COLUMNS), []
+    return clean_ticker_frame(df, date=date)
+
+
+def backfill_historical(conn, start_date, end_date, max_workers=8, resume=True,
+                        progress_callback=None, log_container=None):
+    """
+    Rebuilds Ticker history date by date from the PSX historical pages: one request per trading day
+    for the whole market instead of one request per ticker window.
+
+    Args:
+        conn (sqlite3.Connection): SQLite database connection.
+        start_date (str or datetime): First date of the range.
+        end_date (str or datetime): Last date of the range.
+        max_workers (int): Number of concurrent page fetches.
+        resume (bool): Skip dates already checkpointed as done or empty.
+        progress_callback (callable, optional): Called as progress_callback(done, total, date).
+        log_container (streamlit.container, optional): Streamlit container for logs.
+
+    Returns:
+        dict: Summary as returned by sync_historical_dates.
+    """
+    return sync_historical_dates(conn, get_trading_days(start_date, end_date), max_workers=max_workers,
+                                 resume=resume, progress_callback=progress_callback, log_container=log_container)
+
+
+def sync_historical_dates(conn, dates, max_workers=8, resume=True, progress_callback=None, log_container=None):
+    """
+    Synchronizes the Ticker table for a list of dates from the PSX historical pages. Pages are fetched
+    and parsed concurrently; each day is written in its own transaction together with its SyncLog
+    checkpoint, so an interrupted run resumes where it stopped.
+
+    Args:
+        conn (sqlite3.Connection): SQLite database connection.
+        dates (list): Dates in 'YYYY-MM-DD' format.
+        max_workers (int): Number of concurrent page fetches.
+        resume (bool): Skip dates already checkpointed as done or empty.
+        progress_callback (callable, optional): Called as progress_callback(done, total, date).
+        log_container (streamlit.container, optional): Streamlit container for logs.
+
+    Returns:
+        dict: Summary with 'success', 'days_total', 'days_skipped', 'days_done', 'days_empty',
+            'records_added', 'rejected_records', 'message' and 'errors'.
+    """
+    summary = {
+        'success': False,
+        'days_total': 0,
+        'days_skipped': 0,
+        'days_done': 0,
+        'days_empty': 0,
+        'records_added': 0,
+        'rejected_records': 0,
+        'message': '',
+        'errors': []
+    }
 
-        # Step 4: Update the Ticker table for each symbol
-        records_added_total = 0
-        errors = []
-        total_symbols = len(unique_symbols)
-        
-        for idx, symbol in enumerate(unique_symbols, start=1):
+    trading_days = sorted(set(dates))
+    summary['days_total'] = len(trading_days)
+    if resume and trading_days:
+        completed = get_completed_sync_dates(conn, SYNC_SOURCE_PSX_HISTORICAL, trading_days[0], trading_days[-1])
+        pending = [day for day in trading_days if day not in completed]
+        summary['days_skipped'] = len(trading_days) - len(pending)
+    else:
+        pending = trading_days
+
+    logger.info(f"Synchronizing {len(pending)} trading days ({summary['days_skipped']} already synchronized) "
+                f"with {max_workers} workers.")
+    if log_container:
+        log_container.write(f"🔄 Synchronizing {len(pending)} trading days "
+                            f"({summary['days_skipped']} already synchronized).")
+
+    touched_tickers = set()
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {executor.submit(fetch_historical_day, day): day for day in pending}
+        for done, future in enumerate(as_completed(futures), start=1):
+            day = futures[future]
             try:
-                # Filter data for the current symbol and date
-                symbol_data = df[(df['Symbol_Code'] == symbol) & (df['Date'] == date_to)]
-                if symbol_data.empty:
-                    warning_msg = f"No data found for symbol '{symbol}' on date '{date_to}'."
-                    logger.warning(warning_msg)
-                    if log_container:
-                        log_container.warning(warning_msg)
-                    continue
-                
-                # Extract data for insertion
-                record = symbol_data.iloc[0]
-                ticker = symbol.upper()
-                date = record['Date']
-                
-                # Clean and convert data fields using clean_numeric and clean_date
-                try:
-                    open_ = clean_numeric(record['OPEN'], 'Open')
-                    high = clean_numeric(record['HIGH'], 'High')
-                    low = clean_numeric(record['LOW'], 'Low')
-                    close = clean_numeric(record['CLOSE'], 'Close')
-                    change = clean_numeric(record['CHANGE'], 'Change')
-                    change_p = clean_numeric(record['CHANGE (%)'], 'Change (%)')
-                    volume = clean_numeric(record['VOLUME'], 'Volume')
-                    
-                    # Convert to appropriate data types
-                    open_val = float(open_)
-                    high_val = float(high)
-                    low_val = float(low)
-                    close_val = float(close)
-                    change_val = float(change)
-                    change_p_val = round(float(change_p), 2)  # Round to two decimal places
-                    volume_val = int(float(volume))  # Ensure volume is an integer
-                except ValueError as ve:
-                    error_msg = f"Partial Sync: Data type conversion error for ticker '{ticker}': {ve}"
-                    errors.append(error_msg)
+                frame, rejected = future.result()
+            except Exception as e:
+                error_msg = f"Historical sync: failed to fetch data for {day}: {e}"
+                summary['errors'].append(error_msg)
+                logger.error(error_msg)
+                record_sync_status(conn, day, SYNC_SOURCE_PSX_HISTORICAL, SYNC_STATUS_FAILED, message=str(e))
+                if log_container:
+                    log_container.error(error_msg)
+            else:
+                summary['rejected_records'] += len(rejected)
+                if frame.empty and rejected:
+                    error_msg = f"Historical sync: all {len(rejected)} rows for {day} were rejected, e.g. {rejected[0]}"
+                    summary['errors'].append(error_msg)
                     logger.error(error_msg)
-                    if log_container:
-                        log_container.error(error_msg)
+                    record_sync_status(conn, day, SYNC_SOURCE_PSX_HISTORICAL, SYNC_STATUS_FAILED, message=error_msg)
+                    if progress_callback:
+                        progress_callback(done, len(pending), day)
                     continue
-                
-                # Prepare data for insertion
-                data_to_insert = [{
-                    'Date': date,
-                    'Open': open_,
-                    'High': high,
-                    'Low': low,
-                    'Close': close,
-                    'Change': change,
-                    'Change (%)': change_p,
-                    'Volume': volume
-                }]
-                
-                # Insert or update the Ticker table
-                success, records_added, insert_errors = insert_ticker_data_into_db(
-                    conn, 
-                    data=data_to_insert,
-                    ticker=ticker
-                )
-                
-                if success:
-                    records_added_total += records_added
-                    logger.info(f"Successfully synchronized data for ticker '{ticker}'. Records added: {records_added}")
-                    if log_container:
-                        log_container.success(f"Synchronized data for ticker '{ticker}'. Records added: {records_added}")
+                # Ticker rows and checkpoint for the day are committed together (all symbols, one transaction)
+                success, counts, insert_errors = bulk_upsert_ticker_data(
+                    conn, frame, checkpoint=(day, SYNC_SOURCE_PSX_HISTORICAL))
+                if success and counts:
+                    summary['days_done'] += 1
+                    summary['records_added'] += sum(counts.values())
+                    touched_tickers.update(counts)
+                elif success and day < last_completed_trading_day():
+                    summary['days_empty'] += 1
+                    logger.info(f"Historical sync: no trading data on {day}.")
+                elif success:
+                    # Not checkpointed as empty: PSX may not have published the day yet
+                    error_msg = f"Historical sync: no data published for {day} yet."
+                    summary['errors'].append(error_msg)
+                    logger.warning(error_msg)
+                    record_sync_status(conn, day, SYNC_SOURCE_PSX_HISTORICAL, SYNC_STATUS_FAILED, message=error_msg)
                 else:
-                    error_msg = f"Failed to synchronize data for ticker '{ticker}'."
-                    errors.append(error_msg)
-                    logger.error(error_msg)
-                    if log_container:
-                        log_container.error(error_msg)
-                
-                # Append any errors from the insert function
-                if insert_errors:
                     summary['errors'].extend(insert_errors)
-                
-                # Update progress bar
-                if progress_bar and status_text:
-                    progress = (idx / total_symbols) * 100
-                    progress_bar.progress(progress / 100)
-                    status_text.text(f"Synchronizing tickers: {idx}/{total_symbols} completed.")
-            
-            except Exception as e:
-                error_msg = f"Unexpected error for ticker '{symbol}': {e}"
-                errors.append(error_msg)
-                logger.exception(error_msg)
-                if log_container:
-                    log_container.error(error_msg)
-                continue
-        
-        # Final summary
-        summary['records_added'] = records_added_total
-        summary['errors'] = errors
-        summary['success'] = len(errors) == 0
-        summary['message'] = f"Partial synchronization completed with {records_added_total} records added."
-        if errors:
-            summary['message'] += f" Encountered errors with {len(errors)} tickers."
-        
-        logger.info(summary['message'])
-        if log_container:
-            log_container.write(summary['message'])
-        
-    except Exception as e:
-        error_msg = f"Unexpected error during partial synchronization: {e}"
-        summary['errors'].append(error_msg)
-        logger.exception(error_msg)
-        if log_container:
-            log_container.error(error_msg)
-    
+                    record_sync_status(conn, day, SYNC_SOURCE_PSX_HISTORICAL, SYNC_STATUS_FAILED,
+                                       message='; '.join(insert_errors))
+
+            if progress_callback:
+                progress_callback(done, len(pending), day)
+
+    if touched_tickers:
+        refresh_price_cache(conn, tickers=touched_tickers, force_tickers=touched_tickers)
+
+    summary['success'] = not summary['errors']
+    summary['message'] = (f"Historical sync completed: {summary['days_done']} days written, "
+                          f"{summary['days_empty']} without data, {summary['days_skipped']} skipped, "
+                          f"{summary['records_added']} records added.")
+    if summary['errors']:
+        summary['message'] += f" {len(summary['errors'])} days failed and will be retried on the next run."
+    if summary['rejected_records']:
+        summary['message'] += f" {summary['rejected_records']} malformed rows were rejected."
+
+    logger.info(summary['message'])
+    if log_container:
+        log_container.write(summary['message'])
     return summary
 
 
@@ -870,6 +1658,262 @@ def strip_symbol_suffix(symbol):
 
 
 
+# ---- Off-market transactions ingest ---- #
+
+SYNC_SOURCE_PSX_OMTS = 'psx_omts'
+
+# Trades repeated for the same date, symbol and broker pair are summed, keeping a volume-weighted rate
+# and the number of CSV lines merged into the row
+TRANSACTIONS_UPSERT = """
+    INSERT INTO Transactions (Date, Settlement_Date, Buyer_Code, Seller_Code, Symbol_Code, Company,
+                              Turnover, Rate, Value, Transaction_Type, Trades)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+    ON CONFLICT (Date, Symbol_Code, Buyer_Code, Seller_Code) DO UPDATE SET
+        Trades = Trades + 1,
+        Turnover = Turnover + excluded.Turnover,
+        Value = Value + excluded.Value,
+        Rate = (Value + excluded.Value) / NULLIF(Turnover + excluded.Turnover, 0);
+"""
+
+TRANSACTION_COLUMNS = ['Date', 'Settlement_Date', 'Buyer_Code', 'Seller_Code', 'Symbol_Code', 'Company',
+                       'Turnover', 'Rate', 'Value', 'Transaction_Type']
+
+
+def _transaction_rows(chunk):
+    """
+    Converts a chunk from iter_psx_transaction_chunks into Transactions table tuples.
+    """
+    frame = chunk.rename(columns={
+        'Settlement Date': 'Settlement_Date',
+        'Buyer Code': 'Buyer_Code',
+        'Seller Code': 'Seller_Code',
+        'Symbol Code': 'Symbol_Code',
+    })[TRANSACTION_COLUMNS].copy()
+    frame['Symbol_Code'] = frame['Symbol_Code'].str.strip()
+    frame['Company'] = frame['Company'].str.strip()
+    frame['Turnover'] = frame['Turnover'].round().astype('Int64')
+    frame = frame.astype(object).where(frame.notna(), None)
+    return list(frame.itertuples(index=False, name=None))
+
+
+def ingest_off_market_file(conn, date, csv_data, chunksize=5000):
+    """
+    Streams one day's off-market transactions CSV into the Transactions table. The day's previous
+    rows are replaced, and its flow aggregates and SyncLog checkpoint are updated in the same transaction.
+
+    Args:
+        conn (sqlite3.Connection): SQLite database connection.
+        date (str): The date of the file in 'YYYY-MM-DD' format.
+        csv_data (str): The CSV text.
+        chunksize (int): Number of CSV lines parsed and written per chunk.
+
+    Returns:
+        tuple: (success (bool), records written (int), error message or None)
+    """
+    records = 0
+    try:
+        with conn:
+            conn.execute("DELETE FROM Transactions WHERE Date = ?;", (date,))
+            for chunk in iter_psx_transaction_chunks(csv_data, chunksize=chunksize):
+                conn.executemany(TRANSACTIONS_UPSERT, _transaction_rows(chunk))
+            # Repeated lines are merged by the upsert, so count the rows actually stored
+            records = conn.execute("SELECT COUNT(*) FROM Transactions WHERE Date = ?;", (date,)).fetchone()[0]
+            refresh_transaction_aggregates(conn, date)
+            status = SYNC_STATUS_DONE if records else SYNC_STATUS_EMPTY
+            conn.execute(SYNC_LOG_UPSERT, (date, SYNC_SOURCE_PSX_OMTS, status, records, None,
+                                           datetime.now().isoformat(timespec='seconds')))
+    except (ValueError, pd.errors.ParserError, sqlite3.Error) as e:
+        error_msg = f"Off-market ingest failed for {date}: {e}"
+        logger.error(error_msg)
+        return False, 0, error_msg
+
+    logger.info(f"Ingested {records} off-market transactions for {date}.")
+    return True, records, None
+
+
+def sync_off_market_transactions(conn, start_date, end_date=None, max_workers=4, resume=True, chunksize=5000,
+                                 progress_callback=None, log_container=None):
+    """
+    Downloads the off-market transactions CSVs of a date range concurrently and ingests each file
+    in its own transaction. Dates already checkpointed in SyncLog are skipped when resuming.
+
+    Args:
+        conn (sqlite3.Connection): SQLite database connection.
+        start_date (str or datetime): First date of the range.
+        end_date (str or datetime, optional): Last date of the range. Defaults to start_date.
+        max_workers (int): Number of concurrent downloads.
+        resume (bool): Skip dates already checkpointed as done or empty.
+        chunksize (int): Number of CSV lines parsed and written per chunk.
+        progress_callback (callable, optional): Called as progress_callback(done, total, date).
+        log_container (streamlit.container, optional): Streamlit container for logs.
+
+    Returns:
+        dict: Summary with 'success', 'days_total', 'days_skipped', 'days_done', 'records_added', 'message' and 'errors'.
+    """
+    summary = {
+        'success': False,
+        'days_total': 0,
+        'days_skipped': 0,
+        'days_done': 0,
+        'records_added': 0,
+        'message': '',
+        'errors': []
+    }
+
+    trading_days = get_trading_days(start_date, end_date or start_date)
+    summary['days_total'] = len(trading_days)
+    pending = trading_days
+    if resume and trading_days:
+        completed = get_completed_sync_dates(conn, SYNC_SOURCE_PSX_OMTS, trading_days[0], trading_days[-1])
+        pending = [day for day in trading_days if day not in completed]
+        summary['days_skipped'] = len(trading_days) - len(pending)
+
+    if log_container:
+        log_container.write(f"🔄 Ingesting off-market transactions for {len(pending)} trading days.")
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        futures = {executor.submit(fetch_psx_transaction_csv, day): day for day in pending}
+        for done, future in enumerate(as_completed(futures), start=1):
+            day = futures[future]
+            try:
+                csv_data = future.result()
+            except Exception as e:
+                success, error_msg = False, f"Off-market ingest: failed to fetch the CSV for {day}: {e}"
+                logger.error(error_msg)
+            else:
+                if csv_data is None:
+                    success, error_msg = False, f"Off-market ingest: could not download the CSV for {day}."
+                else:
+                    success, records, error_msg = ingest_off_market_file(conn, day, csv_data, chunksize=chunksize)
+
+            if success:
+                summary['days_done'] += 1
+                summary['records_added'] += records
+            else:
+                summary['errors'].append(error_msg)
+                record_sync_status(conn, day, SYNC_SOURCE_PSX_OMTS, SYNC_STATUS_FAILED, message=error_msg)
+                if log_container:
+                    log_container.error(error_msg)
+            if progress_callback:
+                progress_callback(done, len(pending), day)
+
+    summary['success'] = not summary['errors']
+    summary['message'] = (f"Off-market ingest completed: {summary['days_done']} days, "
+                          f"{summary['records_added']} transactions, {summary['days_skipped']} days skipped.")
+    if summary['errors']:
+        summary['message'] += f" {len(summary['errors'])} days failed and will be retried on the next run."
+    logger.info(summary['message'])
+    if log_container:
+        log_container.write(summary['message'])
+    return summary
+
+
+# ---- Off-market flow aggregates ---- #
+
+def seed_broker_names(conn):
+    """
+    Loads the broker names from data_fetcher.internet_trading_subscribers into the Brokers table.
+
+    Args:
+        conn (sqlite3.Connection): SQLite database connection.
+
+    Returns:
+        int: Number of brokers written.
+    """
+    rows = list(internet_trading_subscribers.items())
+    try:
+        with conn:
+            conn.executemany("""
+                INSERT INTO Brokers (Broker_Code, Name) VALUES (?, ?)
+                ON CONFLICT (Broker_Code) DO UPDATE SET Name = excluded.Name;
+            """, rows)
+    except sqlite3.Error as e:
+        logging.error(f"Failed to seed broker names: {e}")
+        return 0
+    return len(rows)
+
+
+def refresh_transaction_aggregates(conn, date):
+    """
+    Rebuilds the TransactionSymbolDaily and BrokerFlowDaily rows of one date from Transactions.
+    It does not commit, so ingest can run it in the same transaction as the day's raw rows.
+
+    Args:
+        conn (sqlite3.Connection): SQLite database connection.
+        date (str): The date in 'YYYY-MM-DD' format.
+    """
+    conn.execute("DELETE FROM TransactionSymbolDaily WHERE Date = ?;", (date,))
+    conn.execute("DELETE FROM BrokerFlowDaily WHERE Date = ?;", (date,))
+    conn.execute(SYMBOL_FLOW_REBUILD.format(condition='Date = ?'), (date,))
+    conn.execute(BROKER_FLOW_REBUILD.format(condition='Date = ?'), (date, date))
+
+
+def get_top_net_buyers(conn, symbol, from_date, to_date, limit=10, transaction_type=None, ascending=False):
+    """
+    Ranks brokers by net off-market value (bought minus sold) in a symbol over a date range.
+
+    Args:
+        conn (sqlite3.Connection): SQLite database connection.
+        symbol (str): The symbol code, e.g. 'LUCK'.
+        from_date (str): Start date in 'YYYY-MM-DD' format.
+        to_date (str): End date in 'YYYY-MM-DD' format.
+        limit (int): Number of brokers returned.
+        transaction_type (str, optional): 'B2B' or 'I2I'; both when None.
+        ascending (bool): Rank the top net sellers instead.
+
+    Returns:
+        DataFrame: Broker_Code, Broker_Name, Bought_Volume, Sold_Volume, Bought_Value, Sold_Value and Net_Value.
+    """
+    query = f"""
+        SELECT f.Broker_Code, COALESCE(b.Name, f.Broker_Code) AS Broker_Name,
+               SUM(f.Bought_Volume) AS Bought_Volume, SUM(f.Sold_Volume) AS Sold_Volume,
+               SUM(f.Bought_Value) AS Bought_Value, SUM(f.Sold_Value) AS Sold_Value,
+               SUM(f.Bought_Value) - SUM(f.Sold_Value) AS Net_Value
+        FROM BrokerFlowDaily f
+        LEFT JOIN Brokers b ON b.Broker_Code = f.Broker_Code
+        WHERE f.Symbol_Code = ? AND f.Date BETWEEN ? AND ?
+        {"AND f.Transaction_Type = ?" if transaction_type else ""}
+        GROUP BY f.Broker_Code
+        ORDER BY Net_Value {"ASC" if ascending else "DESC"}
+        LIMIT ?;
+    """
+    params = [symbol, from_date, to_date] + ([transaction_type] if transaction_type else []) + [int(limit)]
+    try:
+        return pd.read_sql_query(query, conn, params=params)
+    except (sqlite3.Error, pd.errors.DatabaseError) as e:
+        logging.error(f"Failed to rank net buyers for {symbol}: {e}")
+        return pd.DataFrame()
+
+
+def get_symbol_transaction_summary(conn, from_date, to_date, transaction_type=None):
+    """
+    Returns the off-market trade count, volume and value per symbol over a date range, largest value first.
+
+    Args:
+        conn (sqlite3.Connection): SQLite database connection.
+        from_date (str): Start date in 'YYYY-MM-DD' format.
+        to_date (str): End date in 'YYYY-MM-DD' format.
+        transaction_type (str, optional): 'B2B' or 'I2I'; both when None.
+
+    Returns:
+        DataFrame: Symbol_Code, Trades, Turnover and Value.
+    """
+    query = f"""
+        SELECT Symbol_Code, SUM(Trades) AS Trades, SUM(Turnover) AS Turnover, SUM(Value) AS Value
+        FROM TransactionSymbolDaily
+        WHERE Date BETWEEN ? AND ?
+        {"AND Transaction_Type = ?" if transaction_type else ""}
+        GROUP BY Symbol_Code
+        ORDER BY Value DESC;
+    """
+    params = [from_date, to_date] + ([transaction_type] if transaction_type else [])
+    try:
+        return pd.read_sql_query(query, conn, params=params)
+    except (sqlite3.Error, pd.errors.DatabaseError) as e:
+        logging.error(f"Failed to summarize off-market transactions: {e}")
+        return pd.DataFrame()
+
+
 def get_psx_off_market_transactions(conn, from_date, to_date=None):
     """
     Retrieves PSX off-market transactions for a given date or date range from the database.
@@ -906,7 +1950,7 @@ def get_psx_off_market_transactions(conn, from_date, to_date=None):
     if rows:
         logging.info(f"Retrieved {len(rows)} records from Transactions table.")
         # Create a DataFrame to return the fetched data
-        columns = ['Date', 'Settlement_Date', 'Buyer_Code', 'Seller_Code', 'Symbol_Code', 'Company', 'Turnover', 'Rate', 'Value', 'Transaction_Type']
+        columns = ['Date', 'Settlement_Date', 'Buyer_Code', 'Seller_Code', 'Symbol_Code', 'Company', 'Turnover', 'Rate', 'Value', 'Transaction_Type', 'Trades']
         df = pd.DataFrame(rows, columns=columns)
         return df
     else:
@@ -1105,21 +2149,21 @@ def get_tickers_by_group(conn, group_type):
     if group_type == 'topers_today':
         # Tickers with the highest positive change today
         query = """
-            SELECT DISTINCT SYMBOL FROM MarketWatch
+            SELECT SYMBOL FROM MarketWatch
             ORDER BY "CHANGE (%)" DESC
             LIMIT 50;
         """
     elif group_type == 'decliners_today':
         # Tickers with the highest negative change today
         query = """
-            SELECT DISTINCT SYMBOL FROM MarketWatch
+            SELECT SYMBOL FROM MarketWatch
             ORDER BY "CHANGE (%)" ASC
             LIMIT 50;
         """
     elif group_type == 'advancers_today':
         # Tickers with significant positive movement today
         query = """
-            SELECT DISTINCT SYMBOL FROM MarketWatch
+            SELECT SYMBOL FROM MarketWatch
             ORDER BY "CHANGE (%)" DESC
             LIMIT 50;
         """
@@ -1139,10 +2183,10 @@ def get_tickers_by_group(conn, group_type):
 
 def get_all_indexes(conn):
     """
-    Retrieves all unique indexes from the MarketWatch table.
+    Retrieves all unique indexes from the IndexMembership table.
     """
     cursor = conn.cursor()
-    query = 'SELECT DISTINCT "LISTED_IN" FROM MarketWatch WHERE "LISTED_IN" IS NOT NULL AND "LISTED_IN" != "";'
+    query = 'SELECT DISTINCT INDEX_NAME FROM IndexMembership;'
     try:
         cursor.execute(query)
         results = cursor.fetchall()
@@ -1159,8 +2203,8 @@ def get_tickers_by_index(conn, index_name):
     """
     cursor = conn.cursor()
     query = """
-        SELECT DISTINCT SYMBOL FROM MarketWatch
-        WHERE "LISTED_IN" = ?;
+        SELECT SYMBOL FROM IndexMembership
+        WHERE INDEX_NAME = ?;
     """
     try:
         cursor.execute(query, (index_name,))
@@ -1243,7 +2287,7 @@ def search_marketwatch_by_symbol(conn, symbol_query):
         with conn:
             cursor = conn.cursor()
             query = """
-                SELECT DISTINCT SYMBOL
+                SELECT SYMBOL
                 FROM MarketWatch
                 WHERE SYMBOL LIKE ?
                 LIMIT 50;
@@ -1309,12 +2353,259 @@ def get_last_five_working_days(reference_date=None, num_days=5):
 
 
 
-def synchronize_database(conn, date_to, progress_bar, status_text, log_container):
+def get_latest_dates_by_ticker(conn):
+    """
+    Retrieves the most recent stored date for every ticker with a single grouped query.
+
+    Args:
+        conn (sqlite3.Connection): SQLite database connection.
+
+    Returns:
+        dict: Mapping of ticker symbol to its latest date in 'YYYY-MM-DD' format.
+    """
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT Ticker, MAX(Date) FROM Ticker GROUP BY Ticker;")
+        latest_dates = {row[0]: row[1] for row in cursor.fetchall() if row[1]}
+        logging.info(f"Retrieved latest dates for {len(latest_dates)} tickers.")
+        return latest_dates
+    except sqlite3.Error as e:
+        logging.error(f"Failed to retrieve latest dates from Ticker table: {e}")
+        return {}
+
+
+def get_corporate_action_symbols(conn):
+    """
+    Retrieves the symbols currently flagged in MarketWatch with a corporate action suffix
+    (XD, XB or XR as returned by strip_symbol_suffix), whose price history may have been re-adjusted.
+
+    Args:
+        conn (sqlite3.Connection): SQLite database connection.
+
+    Returns:
+        dict: Base symbol -> its XD/XB/XR suffix.
+    """
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT SYMBOL, SYMBOL_SUFFIX FROM MarketWatch
+            WHERE SYMBOL_SUFFIX IN ('XD', 'XB', 'XR');
+        """)
+        return {row[0].upper(): row[1] for row in cursor.fetchall() if row[0]}
+    except sqlite3.Error as e:
+        logging.error(f"Failed to retrieve corporate action symbols: {e}")
+        return {}
+
+
+# SyncLog source of a full refetch after a corporate action, per ticker and suffix ('corporate_action:OGDC:XD')
+SYNC_SOURCE_CORPORATE_ACTION = 'corporate_action'
+
+# A suffix stays on a symbol until its book closure, well within this many days
+CORPORATE_ACTION_REFETCH_DAYS = 30
+
+
+def corporate_action_source(ticker, suffix):
+    """
+    Returns the SyncLog source recording the refetch of a ticker for one corporate action suffix.
+    """
+    return f"{SYNC_SOURCE_CORPORATE_ACTION}:{ticker}:{suffix}"
+
+
+def get_recent_corporate_action_refetches(conn, since):
+    """
+    Returns the corporate action refetches recorded in SyncLog on or after a date.
+
+    Args:
+        conn (sqlite3.Connection): SQLite database connection.
+        since (str): First date to consider ('YYYY-MM-DD').
+
+    Returns:
+        set: SyncLog sources as built by corporate_action_source.
+    """
+    try:
+        rows = conn.execute("SELECT Source FROM SyncLog WHERE Source LIKE ? AND Status = ? AND Date >= ?;",
+                            (f"{SYNC_SOURCE_CORPORATE_ACTION}:%", SYNC_STATUS_DONE, since))
+        return {row[0] for row in rows}
+    except sqlite3.Error as e:
+        logging.error(f"Failed to read corporate action refetches from SyncLog: {e}")
+        return set()
+
+
+def build_ticker_windows(conn, tickers, date_to, full_from="01 Jan 2020", incremental=True):
+    """
+    Works out which date range to request for each ticker.
+
+    In incremental mode each ticker only asks for the days after its latest stored bar.
+    Tickers without stored data, and tickers with a corporate action suffix (history may have
+    been re-adjusted), fall back to a full refetch from `full_from`. A corporate action is only
+    refetched once: the refetch is recorded in SyncLog and skipped for CORPORATE_ACTION_REFETCH_DAYS.
+
+    Args:
+        conn (sqlite3.Connection): SQLite database connection.
+        tickers (list): List of ticker symbols.
+        date_to (str): End date in 'DD MMM YYYY' format.
+        full_from (str): Start date for a full refetch in 'DD MMM YYYY' format.
+        incremental (bool): If False, every ticker gets the full window.
+
+    Returns:
+        tuple: (ticker_windows (list of (ticker, date_from, date_to)), replace_tickers (dict of
+            ticker -> SyncLog source to record once its refetch is stored), up_to_date (list))
+    """
+    if not incremental:
+        return [(ticker, full_from, date_to) for ticker in tickers], {}, []
+
+    latest_dates = get_latest_dates_by_ticker(conn)
+    corporate_actions = get_corporate_action_symbols(conn)
+    end_date = datetime.strptime(date_to, '%d %b %Y')
+    refetched = get_recent_corporate_action_refetches(
+        conn, (end_date - timedelta(days=CORPORATE_ACTION_REFETCH_DAYS)).strftime('%Y-%m-%d'))
+
+    ticker_windows = []
+    replace_tickers = {}
+    up_to_date = []
+
+    for ticker in tickers:
+        latest = latest_dates.get(ticker)
+
+        source = corporate_action_source(ticker, corporate_actions[ticker]) if ticker in corporate_actions else None
+        if source and latest and source not in refetched:
+            ticker_windows.append((ticker, full_from, date_to))
+            replace_tickers[ticker] = source
+            continue
+
+        if not latest:
+            ticker_windows.append((ticker, full_from, date_to))
+            continue
+
+        next_day = datetime.strptime(latest, '%Y-%m-%d') + timedelta(days=1)
+        if next_day > end_date:
+            up_to_date.append(ticker)
+            continue
+
+        ticker_windows.append((ticker, next_day.strftime('%d %b %Y'), date_to))
+
+    logging.info(f"Incremental sync plan: {len(ticker_windows)} tickers to fetch "
+                 f"({len(replace_tickers)} full refetches after corporate actions), {len(up_to_date)} up to date.")
+    return ticker_windows, replace_tickers, up_to_date
+
+
+async def synchronize_tickers_async(conn, ticker_windows, progress_callback=None, log_container=None,
+                                    max_concurrency=16, rate_per_host=8.0, max_retries=3, replace_tickers=None,
+                                    flush_every=50):
+    """
+    Fetches ticker data concurrently and writes it to the Ticker table.
+    Downloads run on a bounded pool of aiohttp requests, while every database write happens
+    here on the event loop thread, so SQLite only ever sees a single writer.
+
+    Args:
+        conn (sqlite3.Connection): SQLite database connection.
+        ticker_windows (list): List of (ticker, date_from, date_to) tuples, dates in 'DD MMM YYYY' format.
+        progress_callback (callable, optional): Called as progress_callback(done, total, ticker) after each ticker.
+        log_container (streamlit.container, optional): Streamlit container for logs.
+        max_concurrency (int): Maximum number of requests in flight at once.
+        rate_per_host (float): Maximum number of requests started per second per host.
+        max_retries (int): Number of retries per ticker for transient failures.
+        replace_tickers (dict, optional): Tickers whose stored history is replaced by the fetched data
+            (full refetch after a corporate action) instead of being extended, mapped to the SyncLog
+            source recorded once the refetch is stored (see build_ticker_windows).
+        flush_every (int): Number of fetched tickers buffered before they are written in one transaction.
+
+    Returns:
+        tuple: (records_added_total (int), errors (list))
+    """
+    replace_tickers = replace_tickers or {}
+    total_tickers = len(ticker_windows)
+    records_added_total = 0
+    errors = []
+    done = 0
+
+    # Cleaned frames are buffered and written every `flush_every` tickers in one transaction
+    pending_frames = []
+    pending_tickers = []
+
+    def flush_pending():
+        nonlocal records_added_total
+        if not pending_tickers:
+            return
+
+        flush_replace = {t for t in pending_tickers if t in replace_tickers}
+        success, counts, insert_errors = bulk_upsert_ticker_data(
+            conn, pd.concat(pending_frames, ignore_index=True), replace_tickers=flush_replace
+        )
+        errors.extend(insert_errors)
+
+        for flushed_ticker in pending_tickers:
+            if success:
+                records_added = counts.get(flushed_ticker, 0)
+                records_added_total += records_added
+                if flushed_ticker in flush_replace:
+                    # The corporate action is handled; later syncs extend the history again
+                    record_sync_status(conn, datetime.now().strftime('%Y-%m-%d'), replace_tickers[flushed_ticker],
+                                       SYNC_STATUS_DONE, records=records_added)
+                logging.info(f"✅ Added {records_added} records for ticker '{flushed_ticker}'.")
+                if log_container:
+                    log_container.success(f"✅ Added {records_added} records for ticker '{flushed_ticker}'.")
+            else:
+                error_msg = f"❌ Failed to insert data for ticker '{flushed_ticker}'."
+                logging.error(error_msg)
+                errors.append(error_msg)
+                if log_container:
+                    log_container.error(error_msg)
+
+        pending_frames.clear()
+        pending_tickers.clear()
+
+    async for ticker, raw_data in stream_stock_data(ticker_windows,
+                                                    max_concurrency=max_concurrency,
+                                                    rate_per_host=rate_per_host,
+                                                    max_retries=max_retries):
+        done += 1
+
+        if raw_data:
+            logging.info(f"Fetched {len(raw_data)} records for ticker '{ticker}' ({done}/{total_tickers}).")
+            logging.debug(f"First 3 records for ticker '{ticker}': {raw_data[:3]}...")
+
+            frame, ticker_errors = prepare_ticker_frame(raw_data, ticker)
+            if ticker_errors:
+                errors.extend(ticker_errors)
+
+            if not frame.empty:
+                pending_frames.append(frame)
+                pending_tickers.append(ticker)
+            else:
+                error_msg = f"❌ No valid records to insert for ticker '{ticker}'."
+                logging.error(error_msg)
+                errors.append(error_msg)
+                if log_container:
+                    log_container.error(error_msg)
+        elif raw_data is not None:
+            # An empty window is normal for incremental windows (no new bars since the last sync)
+            logging.info(f"No new records for ticker '{ticker}' ({done}/{total_tickers}).")
+        else:
+            warning_msg = f"⚠️ No data fetched for ticker '{ticker}'. Skipping."
+            logging.warning(warning_msg)
+            errors.append(warning_msg)
+            if log_container:
+                log_container.warning(warning_msg)
+
+        if len(pending_tickers) >= flush_every:
+            flush_pending()
+
+        if progress_callback:
+            progress_callback(done, total_tickers, ticker)
+
+    flush_pending()
+
+    return records_added_total, errors
+
+
+def synchronize_database(conn, date_to, progress_bar, status_text, log_container, incremental=True):
     """
     Simplified synchronization of the database by performing the following tasks in order:
     1. Synchronizes PSX Constituents data.
     2. Inserts or updates Market Watch data.
-    3. Cleans and repopulates the Ticker table.
+    3. Populates the Ticker table. In incremental mode only the missing date range of each
+       ticker is fetched; otherwise the table is cleaned and fully repopulated.
     
     If synchronization for the specified date fails, it will attempt the previous working day,
     up to a maximum of 5 attempts.
@@ -1325,6 +2616,7 @@ def synchronize_database(conn, date_to, progress_bar, status_text, log_container
         progress_bar (streamlit.progress, optional): Streamlit progress bar object.
         status_text (streamlit.empty, optional): Streamlit empty object for status updates.
         log_container (streamlit.container, optional): Streamlit container for logs.
+        incremental (bool): Fetch only the dates missing per ticker instead of the full history.
     
     Returns:
         dict: Summary of synchronization results with detailed messages.
@@ -1395,7 +2687,7 @@ def synchronize_database(conn, date_to, progress_bar, status_text, log_container
         summary['market_watch']['success'] = success
         summary['market_watch']['records_added'] = records_added
         if success:
-            summary['market_watch']['message'] = f"✅ Synchronized Market Watch data with {records_added} records added/updated."
+            summary['market_watch']['message'] = f"✅ Synchronized Market Watch data for {records_added} symbols."
             logging.info(summary['market_watch']['message'])
             if log_container:
                 log_container.success(summary['market_watch']['message'])
@@ -1418,74 +2710,58 @@ def synchronize_database(conn, date_to, progress_bar, status_text, log_container
             progress_bar.progress(0.30)  # 30%
             status_text.text("Market Watch synchronization failed.")
 
-    # ---- Task 3: Clean and Populate Ticker Table ---- #
+    # ---- Task 3: Populate Ticker Table ---- #
     try:
         logging.info("Synchronizing tickers.")
         if log_container:
             log_container.write("🔄 Synchronizing tickers...")
 
-        # Clean the Ticker table
-        if clean_ticker_table(conn):
-            logging.info("Ticker table has been cleaned.")
-            if log_container:
-                log_container.write("🧹 Ticker table has been cleaned.")
-        else:
-            raise sqlite3.Error("Failed to clean the Ticker table.")
-
-        # Populate the Ticker table with new data
-        total_tickers = len(psx_data)
-        records_added_total = 0
-        errors = []
-
-        for idx, constituent in enumerate(psx_data, start=1):
-            ticker = constituent['SYMBOL'].upper()
-            logging.info(f"Populating ticker {ticker} ({idx}/{total_tickers})...")
-            if log_container:
-                log_container.write(f"🔄 Populating ticker '{ticker}' ({idx}/{total_tickers})...")
-
-            # Fetch stock data for the ticker
-            raw_data = get_stock_data(ticker, "01 Jan 2020", current_date_to)
-
-            # Log the raw data fetched
-            if raw_data:
-                logging.info(f"Fetched {len(raw_data)} records for ticker '{ticker}'.")
-                logging.debug(f"First 3 records for ticker '{ticker}': {raw_data[:3]}...")
-            else:
-                warning_msg = f"⚠️ No data fetched for ticker '{ticker}'. Skipping."
-                logging.warning(warning_msg)
-                errors.append(warning_msg)
-                if log_container:
-                    log_container.warning(warning_msg)
-                continue
+        tickers = [constituent['SYMBOL'].upper() for constituent in psx_data]
 
-            # Insert ticker data into the database using the unified function
-            success, records_added, ticker_errors = insert_ticker_data_into_db(conn, raw_data, ticker)
-            if success:
-                records_added_total += records_added
-                logging.info(f"✅ Added {records_added} records for ticker '{ticker}'.")
+        # A non-incremental run starts from an empty Ticker table
+        if not incremental:
+            if clean_ticker_table(conn):
+                logging.info("Ticker table has been cleaned.")
                 if log_container:
-                    log_container.success(f"✅ Added {records_added} records for ticker '{ticker}'.")
+                    log_container.write("🧹 Ticker table has been cleaned.")
             else:
-                error_msg = f"❌ Failed to insert data for ticker '{ticker}'."
-                logging.error(error_msg)
-                errors.append(error_msg)
-                if log_container:
-                    log_container.error(error_msg)
+                raise sqlite3.Error("Failed to clean the Ticker table.")
 
-            # Append any errors from the insert function
-            if ticker_errors:
-                errors.extend(ticker_errors)
+        # Work out the date window per ticker, then fetch all tickers concurrently
+        ticker_windows, replace_tickers, up_to_date = build_ticker_windows(
+            conn, tickers, current_date_to, incremental=incremental
+        )
+        if log_container:
+            log_container.write(
+                f"🔄 Fetching {len(ticker_windows)} tickers concurrently "
+                f"({len(up_to_date)} already up to date, {len(replace_tickers)} full refetches)..."
+            )
 
-            # Update progress
+        def update_ticker_progress(done, total, ticker):
             if progress_bar and status_text:
-                progress = 0.30 + (idx / total_tickers) * 0.70  # Progress from 30% to 100%
+                progress = 0.30 + (done / total) * 0.70  # Progress from 30% to 100%
                 progress = min(progress, 1.0)  # Ensure it doesn't exceed 100%
                 progress_bar.progress(progress)
-                status_text.text(f"Synchronizing tickers: {idx}/{total_tickers} completed.")
+                status_text.text(f"Synchronizing tickers: {done}/{total} completed (last: {ticker}).")
+
+        records_added_total, errors = asyncio.run(
+            synchronize_tickers_async(conn, ticker_windows,
+                                      progress_callback=update_ticker_progress,
+                                      log_container=log_container,
+                                      replace_tickers=replace_tickers)
+        )
+
+        if not ticker_windows and progress_bar and status_text:
+            progress_bar.progress(1.0)
+            status_text.text("All tickers are already up to date.")
+
+        # Rebuild the memory-mapped price cache files that no longer match the Ticker table
+        refresh_price_cache(conn, force_tickers=replace_tickers if incremental else tickers)
 
         # Finalize summary for tickers
         summary['tickers']['success'] = len(errors) == 0
         summary['tickers']['records_added'] = records_added_total
+        summary['tickers']['errors'] = errors
         if summary['tickers']['success']:
             summary['tickers']['message'] = f"✅ Ticker table populated with {summary['tickers']['records_added']} records successfully."
             logging.info(summary['tickers']['message'])
@@ -1661,8 +2937,69 @@ def main():
     6. Inserts market watch data and retrieves top advancers, decliners, and active stocks.
     7. Fetches listings and defaulters data, merges them, and logs the results.
     8. Closes the database connection after all operations are complete.
+
+    With --explain, prints the query plan of every entry in DIAGNOSTIC_QUERIES against --db instead.
+    With --migrate-compact, creates or refreshes the compact TickerDays table in --db.
+    With --backfill START END, rebuilds Ticker history date by date from the PSX historical pages.
+    With --ingest-transactions START END, loads the off-market transactions CSVs into Transactions.
     """
-    print("main")
+    arg_parser = argparse.ArgumentParser(description="Database utilities for the stock analysis app.")
+    arg_parser.add_argument('--db', default='data/tick_data.db', help="Path to the SQLite database file.")
+    arg_parser.add_argument('--explain', action='store_true',
+                            help="Print EXPLAIN QUERY PLAN for every diagnostic query.")
+    arg_parser.add_argument('--migrate-compact', action='store_true',
+                            help="Create (or refresh) the compact TickerDays table from the Ticker table.")
+    arg_parser.add_argument('--backfill', nargs=2, metavar=('START', 'END'),
+                            help="Backfill Ticker history from the PSX historical pages (YYYY-MM-DD dates).")
+    arg_parser.add_argument('--ingest-transactions', nargs=2, metavar=('START', 'END'),
+                            help="Ingest the off-market transactions CSVs of a date range (YYYY-MM-DD dates).")
+    arg_parser.add_argument('--workers', type=int, default=8,
+                            help="Concurrent downloads for --backfill and --ingest-transactions.")
+    arg_parser.add_argument('--no-resume', action='store_true',
+                            help="Refetch dates already recorded in SyncLog.")
+    args = arg_parser.parse_args()
+
+    if not (args.explain or args.migrate_compact or args.backfill or args.ingest_transactions):
+        print("main")
+        return
+
+    conn = initialize_db_and_tables(args.db)
+    if conn is None:
+        print(f"Could not open database at {args.db}.")
+        return
+    try:
+        if args.migrate_compact:
+            row_count = migrate_to_compact_layout(conn)
+            print(f"TickerDays rows: {row_count}")
+
+        if args.backfill:
+            summary = backfill_historical(
+                conn, args.backfill[0], args.backfill[1], max_workers=args.workers, resume=not args.no_resume,
+                progress_callback=lambda done, total, day: print(f"[{done}/{total}] {day}", flush=True),
+            )
+            print(summary['message'])
+            for error in summary['errors']:
+                print(f"    {error}")
+
+        if args.ingest_transactions:
+            summary = sync_off_market_transactions(
+                conn, args.ingest_transactions[0], args.ingest_transactions[1], max_workers=args.workers,
+                resume=not args.no_resume,
+                progress_callback=lambda done, total, day: print(f"[{done}/{total}] {day}", flush=True),
+            )
+            print(summary['message'])
+            for error in summary['errors']:
+                print(f"    {error}")
+
+        if args.explain:
+            print(f"Schema version: {get_schema_version(conn)}")
+            for name, plan in explain_queries(conn).items():
+                print(f"\n{name}:")
+                for detail in plan:
+                    print(f"    {detail}")
+    finally:
+        conn.close()
+
 # Ensure that the main function runs only when the script is executed directly
 if __name__ == "__main__":
     main()
\ No newline at end of file
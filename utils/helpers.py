@@ -1,7 +1,10 @@
 import pandas as pd
 import logging
+import holidays
 from datetime import datetime, timedelta
 
+from utils.response_cache import MARKET_TIMEZONE, MARKET_CLOSE_HOUR
+
 def format_date(date_input, output_format="%Y-%m-%d"):
     """
     Converts a date string to the desired format.
@@ -117,6 +120,58 @@ def get_last_five_working_days(reference_date=None, num_days=5):
     return [date.strftime('%Y-%m-%d') for date in last_five]
 
 
+def get_trading_days(start_date, end_date):
+    """
+    Lists the PSX trading days in a date range: weekdays that are not Pakistani public holidays.
+
+    Args:
+        start_date (datetime or str): First date of the range (inclusive).
+        end_date (datetime or str): Last date of the range (inclusive).
+
+    Returns:
+        list: Dates in 'YYYY-MM-DD' format, oldest first.
+    """
+    start = pd.Timestamp(start_date).normalize()
+    end = pd.Timestamp(end_date).normalize()
+    if end < start:
+        return []
+
+    pak_holidays = holidays.Pakistan(years=range(start.year, end.year + 1))
+    return [day.strftime('%Y-%m-%d') for day in pd.bdate_range(start, end) if day.date() not in pak_holidays]
+
+
+def last_completed_trading_day(now=None):
+    """
+    Returns the most recent trading day whose session has closed (5 PM Karachi time).
+    PSX data for days after it may not be published yet.
+
+    Args:
+        now (datetime, optional): Current time; defaults to now in the market timezone.
+
+    Returns:
+        str: The date in 'YYYY-MM-DD' format.
+    """
+    now = now or datetime.now(MARKET_TIMEZONE)
+    end = now.date() if now.hour >= MARKET_CLOSE_HOUR else now.date() - timedelta(days=1)
+    # Two weeks always contain a trading day, even around the Eid holidays
+    return get_trading_days(end - timedelta(days=14), end)[-1]
+
+
+
+# Date formats accepted by clean_date, in the order they are tried
+DATE_FORMATS = [
+    "%Y-%m-%dT%H:%M:%S",  # e.g., '2020-01-01T00:00:00'
+    "%Y-%m-%d %H:%M:%S",  # e.g., '2020-01-01 00:00:00'
+    "%Y-%m-%d",           # e.g., '2020-01-01'
+    "%d %b %Y",           # e.g., '15 Jan 2020'
+    "%d %B %Y",           # e.g., '15 January 2020'
+    "%m/%d/%Y",           # e.g., '01/15/2020'
+    "%d/%m/%Y",           # e.g., '15/01/2020'
+    "%d-%m-%Y",           # e.g., '15-01-2020'
+    "%B %d, %Y",          # e.g., 'January 15, 2020'
+    "%b %d, %Y",          # e.g., 'Jan 15, 2020'
+]
+
 
 def clean_date(date_str):
     """
@@ -133,21 +188,7 @@ def clean_date(date_str):
         logger.error(f"Invalid date input: {date_str}")
         return None
 
-    # Define possible date formats
-    date_formats = [
-        "%Y-%m-%dT%H:%M:%S",  # e.g., '2020-01-01T00:00:00'
-        "%Y-%m-%d %H:%M:%S",  # e.g., '2020-01-01 00:00:00'
-        "%Y-%m-%d",           # e.g., '2020-01-01'
-        "%d %b %Y",           # e.g., '15 Jan 2020'
-        "%d %B %Y",           # e.g., '15 January 2020'
-        "%m/%d/%Y",           # e.g., '01/15/2020'
-        "%d/%m/%Y",           # e.g., '15/01/2020'
-        "%d-%m-%Y",           # e.g., '15-01-2020'
-        "%B %d, %Y",          # e.g., 'January 15, 2020'
-        "%b %d, %Y",          # e.g., 'Jan 15, 2020'
-    ]
-
-    for fmt in date_formats:
+    for fmt in DATE_FORMATS:
         try:
             parsed_date = datetime.strptime(date_str.strip(), fmt)
             formatted_date = parsed_date.strftime("%Y-%m-%d")
@@ -158,4 +199,180 @@ def clean_date(date_str):
 
     # If none of the formats match, log an error
     logger.error(f"Unable to parse date: {date_str}")
-    return None
\ No newline at end of file
+    return None
+
+
+# ---- Vectorized (columnar) cleaning of raw ticker data ---- #
+
+# Source column names (Investors Lounge JSON and PSX historical HTML) for each Ticker table field
+TICKER_FIELD_ALIASES = {
+    'Ticker': ['Ticker', 'SYMBOL', 'Symbol_Code'],
+    'Date': ['Date', 'Date_', 'DATE'],
+    'Open': ['Open', 'OPEN'],
+    'High': ['High', 'HIGH'],
+    'Low': ['Low', 'LOW'],
+    'Close': ['Close', 'CLOSE'],
+    'Change': ['Change', 'CHANGE'],
+    'Change (%)': ['Change (%)', 'ChangeP', 'CHANGE (%)'],
+    'Volume': ['Volume', 'VOLUME'],
+}
+
+TICKER_NUMERIC_FIELDS = ['Open', 'High', 'Low', 'Close', 'Change', 'Change (%)', 'Volume']
+
+
+def detect_date_format(values, formats=DATE_FORMATS, sample_size=20):
+    """
+    Detects the date format of a batch by testing a small sample against each known format.
+
+    Args:
+        values (pd.Series): Date strings.
+        formats (list): Candidate strptime formats, tried in order.
+        sample_size (int): Number of non-empty values to test.
+
+    Returns:
+        str or None: The first format that parses the whole sample, or None.
+    """
+    sample = values.dropna().astype(str).str.strip()
+    sample = sample[sample != ''].head(sample_size)
+    if sample.empty:
+        return None
+
+    for fmt in formats:
+        if pd.to_datetime(sample, format=fmt, errors='coerce').notna().all():
+            return fmt
+    return None
+
+
+def parse_date_series(values, formats=DATE_FORMATS):
+    """
+    Parses a Series of date strings, detecting the format once for the batch.
+    Values that do not match the detected format are retried against the other formats,
+    one vectorized pass per format, so mixed batches still parse.
+
+    Args:
+        values (pd.Series): Date strings.
+        formats (list): Candidate strptime formats.
+
+    Returns:
+        pd.Series: datetime64 values, NaT where no format matched.
+    """
+    text = values.astype('string').str.strip()
+    detected = detect_date_format(text, formats)
+    ordered = ([detected] if detected else []) + [fmt for fmt in formats if fmt != detected]
+
+    parsed = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    for fmt in ordered:
+        remaining = parsed.isna() & text.notna()
+        if not remaining.any():
+            break
+        parsed[remaining] = pd.to_datetime(text[remaining], format=fmt, errors='coerce')
+
+    logging.debug(f"Parsed {parsed.notna().sum()}/{len(parsed)} dates (detected format: {detected}).")
+    return parsed.dt.normalize()
+
+
+def clean_numeric_series(values):
+    """
+    Vectorized counterpart of clean_numeric: strips commas, percentage signs, currency symbols
+    and whitespace, turns '(1,234)' into -1234 and converts to float64.
+
+    Args:
+        values (pd.Series): Raw numeric values (strings or numbers).
+
+    Returns:
+        pd.Series: float64 values, NaN where the value is missing or not numeric.
+    """
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype('float64')
+
+    text = values.astype('string').str.strip()
+    negative = text.str.startswith('(') & text.str.endswith(')')
+    text = text.str.replace(r'[,%\s$£€()]', '', regex=True)
+    text = text.mask(negative.fillna(False), '-' + text)
+    return pd.to_numeric(text, errors='coerce').astype('float64')
+
+
+def _pick_column(frame, field):
+    """
+    Returns the first source column present in the frame for a Ticker table field, or None.
+    """
+    for alias in TICKER_FIELD_ALIASES[field]:
+        if alias in frame.columns:
+            return frame[alias]
+    return None
+
+
+def clean_ticker_frame(data, ticker=None, date=None):
+    """
+    Turns a raw Investors Lounge JSON payload or a parse_html_to_df frame into typed Ticker rows
+    with column-wise pandas operations instead of per-record cleaning.
+
+    Args:
+        data (list or pd.DataFrame): List of record dictionaries or a DataFrame.
+        ticker (str, optional): Ticker for every row; otherwise taken from the SYMBOL/Ticker column.
+        date (str, optional): Date for every row (any format in DATE_FORMATS); otherwise taken from the data.
+
+    Returns:
+        tuple:
+            - pd.DataFrame: Columns Ticker, Date (datetime64), Open/High/Low/Close/Change/Change (%) (float64)
+              and Volume (int64), containing only valid rows.
+            - list: One message per rejected row, with the reason it was rejected.
+    """
+    columns = ['Ticker', 'Date'] + TICKER_NUMERIC_FIELDS
+    frame = data if isinstance(data, pd.DataFrame) else pd.DataFrame(list(data))
+    if frame.empty:
+        return pd.DataFrame(columns=columns), []
+
+    frame = frame.reset_index(drop=True)
+    cleaned = pd.DataFrame(index=frame.index)
+
+    # Ticker
+    if ticker is not None:
+        cleaned['Ticker'] = ticker.upper()
+    else:
+        symbols = _pick_column(frame, 'Ticker')
+        cleaned['Ticker'] = symbols.astype('string').str.strip().str.upper() if symbols is not None else pd.NA
+
+    # Date (format detected once per batch)
+    if date is not None:
+        raw_dates = pd.Series(date, index=frame.index)
+    else:
+        raw_dates = _pick_column(frame, 'Date')
+        if raw_dates is None:
+            raw_dates = pd.Series(pd.NA, index=frame.index)
+    cleaned['Date'] = parse_date_series(raw_dates)
+
+    # Numeric fields
+    for field in TICKER_NUMERIC_FIELDS:
+        raw_values = _pick_column(frame, field)
+        cleaned[field] = clean_numeric_series(raw_values) if raw_values is not None else float('nan')
+    cleaned['Change (%)'] = cleaned['Change (%)'].round(2)
+
+    # Collect rejected rows with the reason, as the per-record cleaning did
+    bad_ticker = cleaned['Ticker'].isna()
+    bad_date = cleaned['Date'].isna()
+    bad_numeric = cleaned[TICKER_NUMERIC_FIELDS].isna()
+    rejected_mask = bad_ticker | bad_date | bad_numeric.any(axis=1)
+
+    rejected = []
+    for idx in frame.index[rejected_mask]:
+        row_ticker = cleaned.at[idx, 'Ticker']
+        if bad_ticker[idx]:
+            reason = "Missing 'SYMBOL' field"
+        elif bad_date[idx]:
+            reason = "Invalid or missing 'Date' field"
+        else:
+            failed = [field for field in TICKER_NUMERIC_FIELDS if bad_numeric.at[idx, field]]
+            reason = f"Data type conversion error for fields {failed}"
+        rejected.append(
+            f"Data Preparation: {reason} in record {idx + 1} for ticker '{row_ticker}'. "
+            f"Skipping record. Original record: {frame.loc[idx].to_dict()}."
+        )
+
+    cleaned = cleaned[~rejected_mask]
+    cleaned['Volume'] = cleaned['Volume'].astype('int64')
+    cleaned['Ticker'] = cleaned['Ticker'].astype(object)
+
+    if rejected:
+        logging.warning(f"Rejected {len(rejected)} of {len(frame)} records during cleaning.")
+    return cleaned[columns].reset_index(drop=True), rejected
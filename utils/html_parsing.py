@@ -0,0 +1,145 @@
+# utils/html_parsing.py
+
+import logging
+
+import pandas as pd
+from bs4 import BeautifulSoup
+
+from utils.helpers import clean_numeric_series
+
+try:
+    import lxml.html
+    LXML_AVAILABLE = True
+except ImportError:  # lxml is optional; parsing falls back to BeautifulSoup's html.parser
+    lxml = None
+    LXML_AVAILABLE = False
+
+
+# 'lxml' parses with libxml2 and walks the tree with XPath; 'bs4' is the pure-Python fallback
+DEFAULT_BACKEND = 'lxml' if LXML_AVAILABLE else 'bs4'
+HTML_BACKENDS = ('lxml', 'bs4')
+
+_CLASS_XPATH = 'contains(concat(" ", normalize-space(@class), " "), " {} ")'
+
+
+def _rows_lxml(html, table_class, tag_columns):
+    try:
+        try:
+            document = lxml.html.fromstring(html)
+        except ValueError:  # str input with an XML encoding declaration
+            document = lxml.html.fromstring(html.encode('utf-8'))
+    except (lxml.etree.ParserError, ValueError):
+        return [], []
+
+    tables = document.xpath(f'//table[{_CLASS_XPATH.format(table_class)}]')
+    if not tables:
+        return [], []
+
+    headers, rows = [], []
+    tag_xpath = f'.//div[{_CLASS_XPATH.format("tag")}]'
+    for tr in tables[0].iter('tr'):
+        cells = tr.xpath('./td')
+        if not cells:
+            if not headers:
+                headers = [th.text_content().strip() for th in tr.xpath('./th')]
+            continue
+        rows.append([
+            [tag.text_content().strip() for tag in cell.xpath(tag_xpath)] if i in tag_columns
+            else cell.text_content().strip()
+            for i, cell in enumerate(cells)
+        ])
+    return headers, rows
+
+
+def _rows_bs4(html, table_class, tag_columns):
+    soup = BeautifulSoup(html, 'html.parser')
+    table = soup.find('table', {'class': table_class})
+    if not table:
+        return [], []
+
+    headers, rows = [], []
+    for tr in table.find_all('tr'):
+        cells = tr.find_all('td')
+        if not cells:
+            if not headers:
+                headers = [th.get_text().strip() for th in tr.find_all('th')]
+            continue
+        rows.append([
+            [tag.text.strip() for tag in cell.find_all('div', class_='tag')] if i in tag_columns
+            else cell.get_text().strip()
+            for i, cell in enumerate(cells)
+        ])
+    return headers, rows
+
+
+def read_table_rows(html, table_class='tbl', tag_columns=(), backend=None):
+    """
+    Extracts the header and body rows of the first table with the given class.
+
+    Args:
+        html (str): Page or fragment HTML.
+        table_class (str): CSS class of the table to read.
+        tag_columns (iterable): Positions of cells whose value is the list of their
+            <div class="tag"> texts (e.g. the LISTED_IN column of the listings pages).
+        backend (str, optional): 'lxml' or 'bs4'. Defaults to DEFAULT_BACKEND.
+
+    Returns:
+        tuple: (headers, rows) where headers are the <th> texts of the first header row and
+            rows are lists of stripped cell texts, one per <tr> that has <td> cells.
+    """
+    backend = backend or DEFAULT_BACKEND
+    if backend not in HTML_BACKENDS:
+        raise ValueError(f"Unknown HTML parser backend '{backend}'. Expected one of {HTML_BACKENDS}.")
+    if not html:
+        return [], []
+
+    tag_columns = set(tag_columns)
+    if backend == 'lxml' and LXML_AVAILABLE:
+        return _rows_lxml(html, table_class, tag_columns)
+    return _rows_bs4(html, table_class, tag_columns)
+
+
+def rows_to_frame(rows, columns, min_cells=None):
+    """
+    Builds a DataFrame from positional table rows, keeping the first len(columns) cells of each row.
+
+    Args:
+        rows (list): Rows returned by read_table_rows.
+        columns (list): Column names for the leading cells.
+        min_cells (int, optional): Rows with fewer cells are skipped. Defaults to len(columns).
+
+    Returns:
+        pd.DataFrame: One row per kept table row.
+    """
+    min_cells = len(columns) if min_cells is None else min_cells
+    kept = [row[:len(columns)] for row in rows if len(row) >= min_cells]
+    return pd.DataFrame(kept, columns=columns)
+
+
+def convert_numeric_columns(frame, float_columns=(), int_columns=(), label='table'):
+    """
+    Converts text columns to numbers in bulk, dropping rows where any of them is not numeric.
+
+    Args:
+        frame (pd.DataFrame): Frame of cell texts.
+        float_columns (iterable): Columns converted to float64.
+        int_columns (iterable): Columns converted to int64.
+        label (str): Name used in the log message for dropped rows.
+
+    Returns:
+        pd.DataFrame: A converted copy without the unparseable rows.
+    """
+    frame = frame.copy()
+    columns = list(float_columns) + list(int_columns)
+    for column in columns:
+        frame[column] = clean_numeric_series(frame[column])
+
+    invalid = frame[columns].isna().any(axis=1)
+    if invalid.any():
+        logging.warning(f"Dropped {int(invalid.sum())} {label} rows with non-numeric values: "
+                        f"{frame.loc[invalid].iloc[:, 0].tolist()[:10]}")
+        frame = frame.loc[~invalid]
+
+    for column in int_columns:
+        frame[column] = frame[column].astype('int64')
+    return frame
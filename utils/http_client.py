@@ -0,0 +1,198 @@
+# utils/http_client.py
+
+import logging
+import threading
+from collections import OrderedDict
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils.response_cache import ResponseCache, as_trading_date
+
+
+PSX_BASE_URL = "https://dps.psx.com.pk"
+
+# (connect, read) timeouts in seconds per endpoint; unknown endpoints use DEFAULT_TIMEOUT
+DEFAULT_TIMEOUT = (10, 60)
+ENDPOINT_TIMEOUTS = {
+    'market_watch': (5, 30),
+    'listings': (5, 30),
+    'defaulters': (5, 30),
+    'historical': (5, 60),
+    'omts_csv': (5, 60),
+    'constituents_xls': (5, 60),
+    'indices': (5, 30),
+    'timeseries': (5, 30),
+    'symbols': (5, 30),
+    'investors_lounge': (10, 60),
+}
+
+DEFAULT_HEADERS = {
+    "Accept-Encoding": "gzip, deflate",  # requests decodes compressed bodies transparently
+    "Connection": "keep-alive",
+}
+
+# Number of responses kept for conditional GET revalidation
+MAX_VALIDATED_RESPONSES = 64
+
+
+class HttpClient:
+    """
+    Shared HTTP client for the PSX fetchers: one pooled keep-alive session, per-endpoint timeouts,
+    retries for idempotent requests and ETag/Last-Modified conditional GETs.
+
+    Relative paths ('/market-watch') are resolved against `base_url`, so tests can point the
+    fetchers at a local stub server; absolute URLs are used as given. Requests made with a
+    `cache_date` go through the optional on-disk ResponseCache.
+    """
+
+    def __init__(self, base_url=PSX_BASE_URL, timeouts=None, pool_size=16, max_retries=2, backoff_factor=0.5,
+                 response_cache=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeouts = {**ENDPOINT_TIMEOUTS, **(timeouts or {})}
+        self.response_cache = response_cache
+        self._validated = OrderedDict()  # url -> (etag, last_modified, response)
+        self._lock = threading.Lock()
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET', 'HEAD']),  # POSTs are never replayed
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def url(self, path):
+        """
+        Returns the absolute URL for a path relative to the base URL (absolute URLs pass through).
+        """
+        if path.startswith(('http://', 'https://')):
+            return path
+        return urljoin(f"{self.base_url}/", path.lstrip('/'))
+
+    def timeout(self, endpoint):
+        """
+        Returns the (connect, read) timeout for an endpoint name.
+        """
+        return self.timeouts.get(endpoint, DEFAULT_TIMEOUT)
+
+    def request(self, method, path, endpoint=None, conditional=False, cache_date=None, cache_if=None, **kwargs):
+        """
+        Sends a request through the pooled session.
+
+        Args:
+            method (str): HTTP method.
+            path (str): Path relative to the base URL, or an absolute URL.
+            endpoint (str, optional): Endpoint name used to pick the timeout.
+            conditional (bool): For GETs, revalidate a previously seen response with
+                If-None-Match / If-Modified-Since and reuse it on 304 Not Modified.
+            cache_date (str or date, optional): Trading date the response describes. When set and
+                the client has a response cache, the raw response is served from / stored to disk.
+            cache_if (callable, optional): Predicate a fetched response must pass to be stored.
+            **kwargs: Passed to requests.Session.request (headers, data, json, params, ...).
+
+        Returns:
+            requests.Response: The response (the stored one if the server answered 304).
+
+        Raises:
+            requests.exceptions.RequestException: On connection errors and timeouts, and
+                ReplayMiss for uncached requests in replay mode.
+        """
+        url = self.url(path)
+        kwargs.setdefault('timeout', self.timeout(endpoint))
+
+        data_date = as_trading_date(cache_date) if cache_date is not None else None
+        if self.response_cache is not None and data_date is not None:
+            return self.response_cache.fetch(
+                lambda: self._send(method, url, conditional, **kwargs), method, url, data_date,
+                params=kwargs.get('params'), data=kwargs.get('data') or kwargs.get('json'), cache_if=cache_if,
+            )
+        return self._send(method, url, conditional, **kwargs)
+
+    def _send(self, method, url, conditional, **kwargs):
+        conditional = conditional and method.upper() == 'GET'
+
+        cached = None
+        if conditional:
+            with self._lock:
+                cached = self._validated.get(url)
+            if cached:
+                etag, last_modified, _ = cached
+                headers = dict(kwargs.pop('headers', None) or {})
+                if etag:
+                    headers['If-None-Match'] = etag
+                if last_modified:
+                    headers['If-Modified-Since'] = last_modified
+                kwargs['headers'] = headers
+
+        response = self.session.request(method, url, **kwargs)
+
+        if conditional:
+            if response.status_code == 304 and cached:
+                logging.debug(f"Not modified, reusing cached response for {url}")
+                with self._lock:
+                    self._validated.move_to_end(url)
+                return cached[2]
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            if response.ok and (etag or last_modified):
+                _ = response.content  # Read the body now so the stored response can be reused
+                with self._lock:
+                    self._validated[url] = (etag, last_modified, response)
+                    self._validated.move_to_end(url)
+                    while len(self._validated) > MAX_VALIDATED_RESPONSES:
+                        self._validated.popitem(last=False)
+
+        return response
+
+    def get(self, path, endpoint=None, conditional=False, cache_date=None, cache_if=None, **kwargs):
+        return self.request('GET', path, endpoint=endpoint, conditional=conditional, cache_date=cache_date,
+                            cache_if=cache_if, **kwargs)
+
+    def post(self, path, endpoint=None, cache_date=None, cache_if=None, **kwargs):
+        return self.request('POST', path, endpoint=endpoint, cache_date=cache_date, cache_if=cache_if, **kwargs)
+
+    def close(self):
+        """
+        Closes the pooled connections.
+        """
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Returns the process-wide HTTP client, creating it on first use.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient(response_cache=ResponseCache())
+        return _client
+
+
+def set_client(client):
+    """
+    Replaces the process-wide HTTP client (e.g. with one pointed at a local stub server).
+
+    Args:
+        client (HttpClient or None): The new client; None resets to a default client on next use.
+
+    Returns:
+        HttpClient or None: The previous client.
+    """
+    global _client
+    with _client_lock:
+        previous, _client = _client, client
+    return previous
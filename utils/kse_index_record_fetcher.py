@@ -1,3 +1,7 @@
+import requests
+
+from utils.http_client import get_client
+
 
 def get_kse_index_historical_data(index_symbol):
     """
@@ -22,7 +26,7 @@ def get_kse_index_historical_data(index_symbol):
             ]
         }
     """
-    url = f"https://dps.psx.com.pk/timeseries/eod/{index_symbol}"
+    url = f"/timeseries/eod/{index_symbol}"
 
     headers = {
         "Accept": "application/json, text/javascript, */*; q=0.01",
@@ -37,7 +41,7 @@ def get_kse_index_historical_data(index_symbol):
     }
 
     try:
-        response = requests.get(url, headers=headers, timeout=60)
+        response = get_client().get(url, endpoint='timeseries', headers=headers)
         response.raise_for_status()
     except requests.exceptions.RequestException as e:
         logging.error(f"HTTP Request failed for index historical data '{index_symbol}': {e}")
@@ -127,7 +131,7 @@ def get_kse_ticker_detail(index_symbol):
             ...
         ]
     """
-    url = f"https://dps.psx.com.pk/indices/{index_symbol}"
+    url = f"/indices/{index_symbol}"
 
     headers = {
         "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
@@ -145,7 +149,7 @@ def get_kse_ticker_detail(index_symbol):
     }
 
     try:
-        response = requests.get(url, headers=headers, timeout=60)
+        response = get_client().get(url, endpoint='indices', headers=headers)
         response.raise_for_status()
     except requests.exceptions.RequestException as e:
         logging.error(f"HTTP Request failed for index constituents '{index_symbol}': {e}")
@@ -240,7 +244,7 @@ def get_kse_ticker_detail(index_symbol):
             ...
         ]
     """
-    url = f"https://dps.psx.com.pk/indices/{index_symbol}"
+    url = f"/indices/{index_symbol}"
 
     headers = {
         "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
@@ -258,7 +262,7 @@ def get_kse_ticker_detail(index_symbol):
     }
 
     try:
-        response = requests.get(url, headers=headers, timeout=60)
+        response = get_client().get(url, endpoint='indices', headers=headers)
         response.raise_for_status()
     except requests.exceptions.RequestException as e:
         logging.error(f"HTTP Request failed for index constituents '{index_symbol}': {e}")
@@ -343,7 +347,7 @@ def get_kse_index_historical_data(index_symbol):
             ]
         }
     """
-    url = f"https://dps.psx.com.pk/timeseries/eod/{index_symbol}"
+    url = f"/timeseries/eod/{index_symbol}"
 
     headers = {
         "Accept": "application/json, text/javascript, */*; q=0.01",
@@ -358,7 +362,7 @@ def get_kse_index_historical_data(index_symbol):
     }
 
     try:
-        response = requests.get(url, headers=headers, timeout=60)
+        response = get_client().get(url, endpoint='timeseries', headers=headers)
         response.raise_for_status()
     except requests.exceptions.RequestException as e:
         logging.error(f"HTTP Request failed for index historical data '{index_symbol}': {e}")
@@ -486,7 +490,7 @@ def get_kse_symbols():
             ...
         ]
     """
-    url = "https://dps.psx.com.pk/symbols"
+    url = "/symbols"
 
     headers = {
         "Accept": "application/json, text/javascript, */*; q=0.01",
@@ -501,7 +505,7 @@ def get_kse_symbols():
     }
 
     try:
-        response = requests.get(url, headers=headers, timeout=60)
+        response = get_client().get(url, endpoint='symbols', headers=headers)
         response.raise_for_status()
     except requests.exceptions.RequestException as e:
         logging.error(f"HTTP Request failed for index symbols: {e}")
@@ -560,7 +564,7 @@ def get_stock_data(ticker, date_from, date_to):
     }
     
     try:
-        response = requests.post(url, headers=headers, json=payload, timeout=60)
+        response = get_client().post(url, endpoint='investors_lounge', headers=headers, json=payload)
         response.raise_for_status()
     except requests.exceptions.RequestException as e:
         logging.error(f"HTTP Request failed for ticker '{ticker}': {e}")
@@ -579,68 +583,8 @@ def get_stock_data(ticker, date_from, date_to):
     
 
 
-async def synchronize_tickers_async(conn, tickers, summary, progress_callback=None):
-    """
-    Asynchronously synchronizes tickers.
-
-    Args:
-        conn (sqlite3.Connection): SQLite database connection.
-        tickers (list): List of ticker symbols.
-        summary (dict): Summary dictionary to update.
-        progress_callback (callable): Optional callback to update progress.
-    """
-    total_tickers = len(tickers)
-    data_total_added = 0
-    errors = []
-
-    async with aiohttp.ClientSession() as session:
-        tasks = []
-        for idx, ticker in enumerate(tickers, start=1):
-            latest_date = get_latest_date_for_ticker(conn, ticker)
-            # Convert latest_date to 'DD MMM YYYY' format
-            if latest_date:
-                latest_date_obj = datetime.strptime(latest_date, "%Y-%m-%d")
-                date_from = latest_date_obj.strftime("%d %b %Y")
-            else:
-                # Define a default start date if no records exist
-                date_from = "01 Jan 2000"
-            date_to = datetime.today().strftime("%d %b %Y")
-
-            task = asyncio.ensure_future(
-                async_get_stock_data(session, ticker, date_from, date_to)
-            )
-            tasks.append((ticker, task, idx, total_tickers))
-
-        for ticker, task, idx, total in tasks:
-            data = await task
-            if data:
-                # Insert data into the database using a ThreadPoolExecutor to avoid blocking
-                loop = asyncio.get_event_loop()
-                with ThreadPoolExecutor() as pool:
-                    success, records_added = await loop.run_in_executor(
-                        pool, insert_ticker_data_into_db, conn, data, ticker
-                    )
-                if success:
-                    data_total_added += records_added
-                    logging.info(f"Added {records_added} new records for ticker '{ticker}'.")
-                else:
-                    error_msg = f"Failed to insert data for ticker '{ticker}'."
-                    errors.append(error_msg)
-                    logging.error(error_msg)
-            else:
-                logging.info(f"No new data fetched for ticker '{ticker}'.")
-
-            # Update progress if callback is provided
-            if progress_callback:
-                progress_callback(idx, total)
-
-    summary['tickers']['success'] = True
-    summary['tickers']['records_added'] = data_total_added
-    summary['tickers']['message'] = f"Successfully synchronized tickers with {data_total_added} new records added."
-    if errors:
-        summary['tickers']['message'] += f" Encountered errors with {len(errors)} tickers."
-        summary['tickers']['errors'] = errors
-
+# The async ticker synchronization now lives in utils/db_manager.synchronize_tickers_async,
+# built on utils/data_fetcher.stream_stock_data (shared aiohttp pool, rate limiting, retries).
 
 
 
@@ -708,7 +652,7 @@ def merge_data(market_data, listings_data, defaulters_data):
 
 def get_stocks_by_index(conn):
     """
-    Retrieves a comma-separated list of stocks for each index from the MarketWatch table.
+    Retrieves a comma-separated list of stocks for each index from the IndexMembership table.
 
     Args:
         conn (sqlite3.Connection): SQLite database connection.
@@ -720,10 +664,10 @@ def get_stocks_by_index(conn):
         cursor = conn.cursor()
         # SQL query to get distinct symbols for each index
         query = """
-            SELECT "LISTED_IN", GROUP_CONCAT(DISTINCT SYMBOL, ', ') as symbols
-            FROM MarketWatch
-            GROUP BY "LISTED_IN"
-            ORDER BY "LISTED_IN";
+            SELECT INDEX_NAME, GROUP_CONCAT(SYMBOL, ', ') as symbols
+            FROM IndexMembership
+            GROUP BY INDEX_NAME
+            ORDER BY INDEX_NAME;
         """
         cursor.execute(query)
         rows = cursor.fetchall()
@@ -786,7 +730,7 @@ def get_top_advancers(conn):
         cursor = conn.cursor()
         query = """
             SELECT SYMBOL, SECTOR, "LISTED_IN", "CHANGE (%)", CURRENT, VOLUME
-            FROM MarketWatch
+            FROM MarketWatchByIndex
             ORDER BY "CHANGE (%)" DESC
             LIMIT 10;
         """
@@ -824,7 +768,7 @@ def get_top_decliners(conn):
         cursor = conn.cursor()
         query = """
             SELECT SYMBOL, SECTOR, "LISTED_IN", "CHANGE (%)", CURRENT, VOLUME
-            FROM MarketWatch
+            FROM MarketWatchByIndex
             ORDER BY "CHANGE (%)" ASC
             LIMIT 10;
         """
@@ -862,7 +806,7 @@ def get_top_active(conn):
         cursor = conn.cursor()
         query = """
             SELECT SYMBOL, SECTOR, "LISTED_IN", VOLUME, CURRENT, "CHANGE (%)"
-            FROM MarketWatch
+            FROM MarketWatchByIndex
             ORDER BY VOLUME DESC
             LIMIT 10;
         """
@@ -1265,7 +1209,7 @@ def get_stock_data(ticker, date_from, date_to):
 
 
     try:
-        response = requests.post(url, headers=headers, json=payload, timeout=60)
+        response = get_client().post(url, endpoint='investors_lounge', headers=headers, json=payload)
         response.raise_for_status()
     except requests.exceptions.RequestException as e:
         logging.error(f"HTTP Request failed for ticker '{ticker}': {e}")
@@ -0,0 +1,186 @@
+# utils/price_cache.py
+
+import os
+import logging
+import sqlite3
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    PYARROW_AVAILABLE = True
+except ImportError:  # pyarrow is optional; analysis falls back to SQLite reads
+    pa = None
+    feather = None
+    PYARROW_AVAILABLE = False
+
+
+# Per-ticker Arrow IPC (Feather v2) files of OHLCV bars. SQLite stays the system of record;
+# these files are rebuilt from it after every sync and memory-mapped by the analysis pages.
+PRICE_CACHE_DIR = os.path.join('data', 'price_cache')
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Change', 'Change (%)', 'Volume']
+
+# Bind parameters per "IN (...)" query, below SQLite's default variable limit
+_SQL_CHUNK_SIZE = 500
+
+
+def cache_path(ticker, cache_dir=PRICE_CACHE_DIR):
+    """
+    Returns the cache file path for a ticker.
+    """
+    return os.path.join(cache_dir, f"{ticker.upper()}.arrow")
+
+
+def write_ticker_cache(ticker, df, cache_dir=PRICE_CACHE_DIR):
+    """
+    Writes one ticker's bars to an uncompressed Arrow IPC file so it can be memory-mapped on read.
+
+    Args:
+        ticker (str): The ticker symbol.
+        df (pd.DataFrame): Bars with a 'Date' column or DatetimeIndex and the PRICE_COLUMNS columns.
+        cache_dir (str): Directory holding the cache files.
+
+    Returns:
+        bool: True if the file was written, False otherwise.
+    """
+    if not PYARROW_AVAILABLE:
+        return False
+
+    try:
+        frame = df.reset_index() if 'Date' not in df.columns else df
+        frame = frame[['Date'] + PRICE_COLUMNS].copy()
+        frame['Date'] = pd.to_datetime(frame['Date'])
+        frame = frame.sort_values('Date').astype({
+            "Open": "float64", "High": "float64", "Low": "float64", "Close": "float64",
+            "Change": "float64", "Change (%)": "float64", "Volume": "int64",
+        })
+
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        last_date = frame['Date'].iloc[-1].strftime('%Y-%m-%d') if not frame.empty else ''
+        table = table.replace_schema_metadata({'ticker': ticker.upper(), 'last_date': last_date})
+
+        os.makedirs(cache_dir, exist_ok=True)
+        path = cache_path(ticker, cache_dir)
+        tmp_path = f"{path}.tmp"
+        feather.write_feather(table, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, path)  # Readers never see a half-written file
+        return True
+    except Exception as e:
+        logging.error(f"Failed to write price cache for ticker '{ticker}': {e}")
+        return False
+
+
+def cached_last_date(ticker, cache_dir=PRICE_CACHE_DIR):
+    """
+    Returns the last bar date ('YYYY-MM-DD') recorded in a ticker's cache file, or None if there is no usable file.
+    """
+    if not PYARROW_AVAILABLE:
+        return None
+    path = cache_path(ticker, cache_dir)
+    if not os.path.exists(path):
+        return None
+    try:
+        metadata = feather.read_table(path, memory_map=True).schema.metadata or {}
+        return metadata.get(b'last_date', b'').decode() or None
+    except Exception as e:
+        logging.warning(f"Unreadable price cache for ticker '{ticker}': {e}")
+        return None
+
+
+def read_ticker_cache(ticker, start=None, end=None, expected_last_date=None, cache_dir=PRICE_CACHE_DIR):
+    """
+    Reads a ticker's bars from its memory-mapped cache file, slicing the date window before conversion.
+
+    Args:
+        ticker (str): The ticker symbol.
+        start (str or datetime, optional): First date to include.
+        end (str or datetime, optional): Last date to include.
+        expected_last_date (str, optional): Latest date stored in SQLite; a cache that does not match is ignored.
+            Without it the file cannot be validated, so it is treated as a miss.
+        cache_dir (str): Directory holding the cache files.
+
+    Returns:
+        pd.DataFrame or None: PRICE_COLUMNS indexed by 'Date', or None on a cache miss.
+    """
+    if not PYARROW_AVAILABLE or not expected_last_date:
+        return None
+    path = cache_path(ticker, cache_dir)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        table = feather.read_table(path, memory_map=True)
+        metadata = table.schema.metadata or {}
+        if metadata.get(b'last_date', b'').decode() != expected_last_date:
+            logging.info(f"Price cache for ticker '{ticker}' is stale; falling back to the database.")
+            return None
+
+        # Dates are sorted, so the window is a contiguous slice found by binary search
+        dates = table.column('Date').to_numpy()
+        lo = np.searchsorted(dates, np.datetime64(pd.Timestamp(start).normalize()), side='left') if start is not None else 0
+        hi = np.searchsorted(dates, np.datetime64(pd.Timestamp(end).normalize()), side='right') if end is not None else len(dates)
+
+        df = table.slice(lo, max(hi - lo, 0)).to_pandas(split_blocks=True)
+        return df.set_index('Date')
+    except Exception as e:
+        logging.warning(f"Failed to read price cache for ticker '{ticker}': {e}")
+        return None
+
+
+def refresh_price_cache(conn, tickers=None, force_tickers=None, cache_dir=PRICE_CACHE_DIR):
+    """
+    Rewrites the cache files of tickers whose file is missing or older than the Ticker table.
+
+    Args:
+        conn (sqlite3.Connection): SQLite database connection.
+        tickers (iterable, optional): Tickers to consider. Defaults to every ticker in the database.
+        force_tickers (iterable, optional): Tickers rewritten even if their last date matches
+            (e.g. history replaced or the latest bar re-synced).
+        cache_dir (str): Directory holding the cache files.
+
+    Returns:
+        dict: Summary with 'written', 'skipped' and 'errors'.
+    """
+    summary = {'written': 0, 'skipped': 0, 'errors': []}
+    if not PYARROW_AVAILABLE:
+        logging.info("pyarrow is not installed; skipping the price cache refresh.")
+        return summary
+
+    try:
+        latest_dates = dict(conn.execute("SELECT Ticker, MAX(Date) FROM Ticker GROUP BY Ticker;").fetchall())
+    except sqlite3.Error as e:
+        summary['errors'].append(f"Price cache: could not read latest dates: {e}")
+        logging.error(summary['errors'][-1])
+        return summary
+
+    force_tickers = {t.upper() for t in (force_tickers or [])}
+    candidates = latest_dates.keys() if tickers is None else [t.upper() for t in tickers if t.upper() in latest_dates]
+    stale = [t for t in candidates
+             if t in force_tickers or cached_last_date(t, cache_dir) != latest_dates[t]]
+    summary['skipped'] = len(candidates) - len(stale)
+
+    query_template = """
+        SELECT Ticker, Date, Open, High, Low, Close, Change, "Change (%)", Volume
+        FROM Ticker WHERE Ticker IN ({placeholders})
+        ORDER BY Ticker, Date;
+    """
+    for i in range(0, len(stale), _SQL_CHUNK_SIZE):
+        chunk = stale[i:i + _SQL_CHUNK_SIZE]
+        try:
+            query = query_template.format(placeholders=', '.join('?' * len(chunk)))
+            frame = pd.read_sql_query(query, conn, params=chunk)
+        except Exception as e:
+            summary['errors'].append(f"Price cache: could not read history for {len(chunk)} tickers: {e}")
+            logging.error(summary['errors'][-1])
+            continue
+
+        for ticker, ticker_df in frame.groupby('Ticker', sort=False):
+            if write_ticker_cache(ticker, ticker_df, cache_dir):
+                summary['written'] += 1
+            else:
+                summary['errors'].append(f"Price cache: failed to write ticker '{ticker}'.")
+
+    logging.info(f"Price cache refreshed: {summary['written']} written, {summary['skipped']} up to date.")
+    return summary
@@ -0,0 +1,202 @@
+# utils/response_cache.py
+
+import os
+import json
+import gzip
+import time
+import hashlib
+import logging
+from datetime import date, datetime, time as dt_time
+
+import pytz
+import requests
+
+
+# Raw PSX responses, gzip-compressed and named by the hash of the request that produced them
+RESPONSE_CACHE_DIR = os.path.join('data', 'response_cache')
+
+# Set PSX_REPLAY=1 to serve every cacheable request from disk and never touch the network
+REPLAY_ENV_VAR = 'PSX_REPLAY'
+
+# Files for the current trading day can still change, so they are refetched after this many seconds
+TODAY_TTL_SECONDS = 15 * 60
+
+MARKET_TIMEZONE = pytz.timezone("Asia/Karachi")
+
+# A day's files are final once they were fetched after this local hour (the app's 5 PM cut-off)
+MARKET_CLOSE_HOUR = 17
+
+# Response headers kept with a cached body
+_KEPT_HEADERS = ('Content-Type', 'ETag', 'Last-Modified')
+
+
+class ReplayMiss(requests.exceptions.ConnectionError):
+    """
+    Raised in replay mode when a request has no cached response. It subclasses ConnectionError
+    so the fetchers' existing RequestException handling treats it like an unreachable host.
+    """
+
+
+def cache_key(method, url, params=None, data=None):
+    """
+    Returns the content address of a request: a SHA-256 of its method, URL and parameters.
+    """
+    canonical = json.dumps(
+        {'method': method.upper(), 'url': url, 'params': params or {}, 'data': data or {}},
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def market_close(data_date):
+    """
+    Returns the moment a trading date's files become final, as a timestamp.
+    """
+    return MARKET_TIMEZONE.localize(datetime.combine(data_date, dt_time(MARKET_CLOSE_HOUR))).timestamp()
+
+
+def ttl_for(data_date, stored_at):
+    """
+    Returns how long a response for a trading date stays fresh.
+
+    Args:
+        data_date (datetime.date): The trading date the response describes.
+        stored_at (float): When the response was fetched, as a timestamp.
+
+    Returns:
+        int or None: Seconds until the entry expires, or None if it never expires (fetched
+            after the date's market close).
+    """
+    if stored_at >= market_close(data_date):
+        return None
+    return TODAY_TTL_SECONDS
+
+
+class ResponseCache:
+    """
+    On-disk cache of raw response bodies keyed by request content.
+    Responses fetched after their date's market close are stored forever; anything fetched
+    earlier (mid-session, or before PSX published the day) expires after TODAY_TTL_SECONDS.
+    """
+
+    def __init__(self, cache_dir=RESPONSE_CACHE_DIR, replay=None):
+        self.cache_dir = cache_dir
+        self.replay = os.environ.get(REPLAY_ENV_VAR) == '1' if replay is None else replay
+
+    def _paths(self, key):
+        folder = os.path.join(self.cache_dir, key[:2])
+        return os.path.join(folder, f"{key}.gz"), os.path.join(folder, f"{key}.json")
+
+    def get(self, key, data_date):
+        """
+        Returns the cached (body, metadata) for a key, or None if missing or expired.
+        Expiry is ignored in replay mode.
+        """
+        body_path, meta_path = self._paths(key)
+        if not (os.path.exists(body_path) and os.path.exists(meta_path)):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+            if not self.replay:
+                ttl = ttl_for(data_date, metadata['stored_at'])
+                if ttl is not None and time.time() - metadata['stored_at'] > ttl:
+                    return None
+            with gzip.open(body_path, 'rb') as f:
+                return f.read(), metadata
+        except (OSError, ValueError, KeyError) as e:
+            logging.warning(f"Ignoring unreadable response cache entry {key}: {e}")
+            return None
+
+    def put(self, key, response, data_date):
+        """
+        Stores a successful response body. The metadata file is written last, so an entry
+        is only visible once its body is complete.
+        """
+        body_path, meta_path = self._paths(key)
+        metadata = {
+            'url': response.url,
+            'status': response.status_code,
+            'headers': {h: response.headers[h] for h in _KEPT_HEADERS if h in response.headers},
+            'encoding': response.encoding,
+            'data_date': data_date.isoformat(),
+            'stored_at': time.time(),
+        }
+        try:
+            os.makedirs(os.path.dirname(body_path), exist_ok=True)
+            with gzip.open(f"{body_path}.tmp", 'wb') as f:
+                f.write(response.content)
+            os.replace(f"{body_path}.tmp", body_path)
+            with open(f"{meta_path}.tmp", 'w', encoding='utf-8') as f:
+                json.dump(metadata, f)
+            os.replace(f"{meta_path}.tmp", meta_path)
+        except OSError as e:
+            logging.warning(f"Failed to store response cache entry for {response.url}: {e}")
+
+    def fetch(self, send, method, url, data_date, params=None, data=None, cache_if=None):
+        """
+        Serves a request from the cache, or sends it and caches a successful response.
+
+        Args:
+            send (callable): Called with no arguments to perform the request on a miss.
+            method (str): HTTP method.
+            url (str): Absolute request URL.
+            data_date (datetime.date): Trading date the response describes (drives the TTL).
+            params (dict, optional): Query parameters, part of the cache key.
+            data (dict, optional): Form data, part of the cache key.
+            cache_if (callable, optional): Called with a successful response; it is only
+                stored if this returns True (e.g. to skip pages without data).
+
+        Returns:
+            requests.Response: The live or reconstructed response.
+
+        Raises:
+            ReplayMiss: In replay mode, if the request is not cached.
+        """
+        key = cache_key(method, url, params, data)
+        cached = self.get(key, data_date)
+        if cached is not None:
+            body, metadata = cached
+            logging.debug(f"Response cache hit for {url} ({data_date})")
+            return _build_response(url, body, metadata)
+
+        if self.replay:
+            raise ReplayMiss(f"Replay mode: no cached response for {method.upper()} {url} ({data_date}).")
+
+        response = send()
+        if response.status_code == 200 and (cache_if is None or cache_if(response)):
+            self.put(key, response, data_date)
+        return response
+
+
+def _build_response(url, body, metadata):
+    """
+    Rebuilds a requests.Response from a cached body so callers cannot tell it from a live one.
+    """
+    response = requests.Response()
+    response.status_code = metadata.get('status', 200)
+    response._content = body
+    response.headers.update(metadata.get('headers', {}))
+    response.encoding = metadata.get('encoding')
+    response.url = metadata.get('url', url)
+    response.reason = 'OK'
+    return response
+
+
+def as_trading_date(value):
+    """
+    Converts a date, datetime or date string ('2024-10-15', '15 Oct 2024', '15-Oct-2024') to a date.
+
+    Returns:
+        datetime.date or None: The date, or None if the value cannot be parsed.
+    """
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    for fmt in ('%Y-%m-%d', '%d %b %Y', '%d-%b-%Y', '%d-%b-%y'):
+        try:
+            return datetime.strptime(str(value).strip(), fmt).date()
+        except ValueError:
+            continue
+    return None
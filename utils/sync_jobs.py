@@ -0,0 +1,179 @@
+# utils/sync_jobs.py
+
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+
+from utils.db_manager import (
+    initialize_db_and_tables,
+    sync_historical_dates,
+    SYNC_SOURCE_PSX_HISTORICAL
+)
+
+
+JOB_STATUS_RUNNING = 'running'
+JOB_STATUS_COMPLETED = 'completed'
+JOB_STATUS_FAILED = 'failed'            # Finished, but some dates failed (they are retried on resume)
+JOB_STATUS_INTERRUPTED = 'interrupted'  # The process running the job stopped before it finished
+
+# Threads of the jobs started by this process, by JobId
+_running_jobs = {}
+_running_jobs_lock = threading.Lock()
+
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def _update_job(conn, job_id, **fields):
+    assignments = ', '.join(f"{column} = ?" for column in fields)
+    with conn:
+        conn.execute(f"UPDATE SyncJobs SET {assignments}, UpdatedAt = ? WHERE JobId = ?;",
+                     (*fields.values(), _now(), job_id))
+
+
+def _row_to_job(row):
+    job_id, source, dates, status, total, processed, failed, message, created_at, updated_at = row
+    return {
+        'job_id': job_id,
+        'source': source,
+        'dates': json.loads(dates),
+        'status': status,
+        'total': total,
+        'processed': processed,
+        'failed': failed,
+        'message': message,
+        'created_at': created_at,
+        'updated_at': updated_at,
+        'alive': is_job_alive(job_id),
+    }
+
+
+def is_job_alive(job_id):
+    """
+    Returns True if the job's worker thread is running in this process.
+    """
+    with _running_jobs_lock:
+        thread = _running_jobs.get(job_id)
+    return thread is not None and thread.is_alive()
+
+
+def mark_interrupted_jobs(conn):
+    """
+    Marks jobs left 'running' by a process that stopped (crash or restart) as interrupted.
+
+    Returns:
+        int: Number of jobs marked.
+    """
+    rows = conn.execute("SELECT JobId FROM SyncJobs WHERE Status = ?;", (JOB_STATUS_RUNNING,)).fetchall()
+    stale = [job_id for (job_id,) in rows if not is_job_alive(job_id)]
+    for job_id in stale:
+        _update_job(conn, job_id, Status=JOB_STATUS_INTERRUPTED,
+                    Message="The sync stopped before finishing; resume it to continue.")
+    if stale:
+        logging.warning(f"Marked {len(stale)} sync jobs as interrupted: {stale}")
+    return len(stale)
+
+
+def get_sync_job(conn, job_id):
+    """
+    Returns a job's state as a dictionary, or None if it does not exist.
+    """
+    row = conn.execute("SELECT * FROM SyncJobs WHERE JobId = ?;", (job_id,)).fetchone()
+    return _row_to_job(row) if row else None
+
+
+def get_latest_sync_job(conn):
+    """
+    Returns the most recently created job, or None if no job was ever started.
+    """
+    row = conn.execute("SELECT * FROM SyncJobs ORDER BY JobId DESC LIMIT 1;").fetchone()
+    return _row_to_job(row) if row else None
+
+
+def _run_job(db_path, job_id, dates, max_workers, resume):
+    """
+    Worker thread body: runs the multi-date sync on its own connection and records progress.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        def on_progress(done, total, day):
+            _update_job(conn, job_id, Processed=done, Total=total)
+
+        summary = sync_historical_dates(conn, dates, max_workers=max_workers, resume=resume,
+                                        progress_callback=on_progress)
+        status = JOB_STATUS_COMPLETED if summary['success'] else JOB_STATUS_FAILED
+        pending = summary['days_total'] - summary['days_skipped']
+        _update_job(conn, job_id, Status=status, Total=pending, Processed=pending,
+                    Failed=len(summary['errors']), Message=summary['message'])
+    except Exception as e:
+        logging.exception(f"Sync job {job_id} failed: {e}")
+        try:
+            _update_job(conn, job_id, Status=JOB_STATUS_FAILED, Message=f"Unexpected error: {e}")
+        except sqlite3.Error:
+            pass
+    finally:
+        conn.close()
+        with _running_jobs_lock:
+            _running_jobs.pop(job_id, None)
+
+
+def start_sync_job(db_path, dates, max_workers=4, resume=True):
+    """
+    Starts a background job that synchronizes the given dates from the PSX historical pages.
+    Per-date outcomes go to SyncLog, so dates finished by an earlier (possibly crashed) run are skipped.
+
+    Args:
+        db_path (str): Path to the SQLite database file (the job opens its own connection).
+        dates (list): Dates in 'YYYY-MM-DD' format.
+        max_workers (int): Number of concurrent page fetches.
+        resume (bool): Skip dates already checkpointed in SyncLog. Pass False to fetch every date again.
+
+    Returns:
+        int or None: The JobId, or None if the job could not be created.
+    """
+    dates = sorted(set(dates))
+    conn = initialize_db_and_tables(db_path)
+    if conn is None:
+        return None
+    try:
+        with conn:
+            cursor = conn.execute(
+                "INSERT INTO SyncJobs (Source, Dates, Status, Total, CreatedAt, UpdatedAt) VALUES (?, ?, ?, ?, ?, ?);",
+                (SYNC_SOURCE_PSX_HISTORICAL, json.dumps(dates), JOB_STATUS_RUNNING, len(dates), _now(), _now()),
+            )
+        job_id = cursor.lastrowid
+    except sqlite3.Error as e:
+        logging.error(f"Failed to create sync job: {e}")
+        return None
+    finally:
+        conn.close()
+
+    thread = threading.Thread(target=_run_job, args=(db_path, job_id, dates, max_workers, resume),
+                              name=f"sync-job-{job_id}", daemon=True)
+    with _running_jobs_lock:
+        _running_jobs[job_id] = thread
+    thread.start()
+    logging.info(f"Started sync job {job_id} for {len(dates)} dates.")
+    return job_id
+
+
+def resume_sync_job(db_path, job_id, max_workers=4):
+    """
+    Starts a new job for the dates of an earlier one; dates it already finished are skipped.
+
+    Returns:
+        int or None: The new JobId, or None if the job does not exist or is still running.
+    """
+    if is_job_alive(job_id):
+        return None
+    conn = sqlite3.connect(db_path)
+    try:
+        job = get_sync_job(conn, job_id)
+    finally:
+        conn.close()
+    if job is None:
+        return None
+    return start_sync_job(db_path, job['dates'], max_workers=max_workers)